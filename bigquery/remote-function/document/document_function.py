@@ -13,6 +13,8 @@
 # limitations under the License.
 
 # [START bigquery_remote_function_document]
+from concurrent import futures
+import threading
 import urllib.request
 
 import flask
@@ -23,12 +25,51 @@ from google.cloud import documentai
 _PROJECT_ID = "YOUR_PROJECT_ID"
 _LOCATION = "us"  # Change to "eu"
 _PROCESSOR_ID = "YOUR_PROCESSOR_ID"
+_MAX_WORKERS = 16  # Number of documents processed concurrently
+
+# The client is created once per instance and reused across requests.
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> documentai.DocumentProcessorServiceClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = documentai.DocumentProcessorServiceClient(
+                client_options=ClientOptions(
+                    api_endpoint=f"{_LOCATION}-documentai.googleapis.com"
+                )
+            )
+    return _client
+
+
+def _process_call(
+    client: documentai.DocumentProcessorServiceClient,
+    processor_name: str,
+    call: list,
+) -> dict:
+    try:
+        content = urllib.request.urlopen(call[0]).read()
+        content_type = call[1]
+        results = client.process_document(
+            {
+                "name": processor_name,
+                "raw_document": {"content": content, "mime_type": content_type},
+            }
+        )
+        return {"text": results.document.text}
+    except Exception as e:  # Check error message if GoogleAPIException
+        return {"error": {"message": str(e)}}
 
 
 @functions_framework.http
 def document_ocr(request: flask.Request) -> flask.Response:
     """BigQuery remote function to process document using Document AI OCR.
 
+    Documents are downloaded and processed concurrently. Rows that fail get an
+    "error" in their reply instead of failing the whole request.
+
     For complete Document AI use cases:
     https://cloud.google.com/document-ai/docs/samples/documentai-process-ocr-document
 
@@ -41,26 +82,17 @@ def document_ocr(request: flask.Request) -> flask.Response:
         https://cloud.google.com/bigquery/docs/reference/standard-sql/remote-functions#output_format
     """
     try:
-        client = documentai.DocumentProcessorServiceClient(
-            client_options=ClientOptions(
-                api_endpoint=f"{_LOCATION}-documentai.googleapis.com"
-            )
-        )
+        client = _get_client()
         processor_name = client.processor_path(_PROJECT_ID, _LOCATION, _PROCESSOR_ID)
         calls = request.get_json()["calls"]
-        replies = []
-        for call in calls:
-            content = urllib.request.urlopen(call[0]).read()
-            content_type = call[1]
-            results = client.process_document(
-                {
-                    "name": processor_name,
-                    "raw_document": {"content": content, "mime_type": content_type},
-                }
+        with futures.ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+            replies = list(
+                executor.map(
+                    lambda call: _process_call(client, processor_name, call), calls
+                )
             )
-            replies.append({"text": results.document.text})
         return flask.make_response(flask.jsonify({"replies": replies}))
-    except Exception as e:  # Check error message if GoogleAPIException
+    except Exception as e:
         return flask.make_response(flask.jsonify({"errorMessage": str(e)}), 400)
 
 
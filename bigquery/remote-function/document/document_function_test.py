@@ -34,12 +34,25 @@ _BIGQUERY_RESPONSE_JSON = {
 }
 
 
+def _urlopen(url: str) -> mock.Mock:
+    return mock.Mock(read=mock.Mock(return_value=url.encode()))
+
+
+def _process_document(request: dict) -> documentai.ProcessResponse:
+    # Rows are processed concurrently, so the response depends on the content.
+    name = request["raw_document"]["content"].decode().rsplit("/", 1)[-1]
+    if name == "banana":
+        raise Exception("API error")
+    return documentai.ProcessResponse({"document": {"text": name}})
+
+
 # Create a fake "app" for generating test request contexts.
 @pytest.fixture(scope="module")
 def app() -> flask.Flask:
     return flask.Flask(__name__)
 
 
+@mock.patch("document_function._client", None)
 @mock.patch("document_function.urllib.request")
 @mock.patch("document_function.documentai")
 def test_document_function(
@@ -47,12 +60,15 @@ def test_document_function(
     mock_request: object,
     app: flask.Flask,
 ) -> None:
-    mock_request.urlopen = mock.Mock(read=mock.Mock(return_value=b"filedata"))
+    mock_request.urlopen = mock.Mock(
+        side_effect=lambda url: mock.Mock(
+            read=mock.Mock(return_value=url.rsplit("/", 1)[-1].encode())
+        )
+    )
     process_document_mock = mock.Mock(
-        side_effect=[
-            documentai.ProcessResponse({"document": {"text": "apple"}}),
-            documentai.ProcessResponse({"document": {"text": "banana"}}),
-        ]
+        side_effect=lambda request: documentai.ProcessResponse(
+            {"document": {"text": request["raw_document"]["content"].decode()}}
+        )
     )
     mock_documentai.DocumentProcessorServiceClient = mock.Mock(
         return_value=mock.Mock(process_document=process_document_mock)
@@ -63,19 +79,37 @@ def test_document_function(
         assert response.get_json() == _BIGQUERY_RESPONSE_JSON
 
 
+@mock.patch("document_function._client", None)
 @mock.patch("document_function.urllib.request")
 @mock.patch("document_function.documentai")
-def test_document_function_error(
+def test_document_function_row_errors(
     mock_documentai: object,
     mock_request: object,
     app: flask.Flask,
 ) -> None:
-    mock_request.urlopen = mock.Mock(read=mock.Mock(return_value=b"filedata"))
-    process_document_mock = mock.Mock(side_effect=Exception("API error"))
+    mock_request.urlopen = _urlopen
+    process_document_mock = mock.Mock(side_effect=_process_document)
     mock_documentai.DocumentProcessorServiceClient = mock.Mock(
         return_value=mock.Mock(process_document=process_document_mock)
     )
+    with app.test_request_context(json=_BIGQUERY_REQUEST_JSON):
+        response = document_function.document_ocr(flask.request)
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "replies": [{"text": "apple"}, {"error": {"message": "API error"}}]
+        }
+
+
+@mock.patch("document_function._client", None)
+@mock.patch("document_function.documentai")
+def test_document_function_error(
+    mock_documentai: object,
+    app: flask.Flask,
+) -> None:
+    mock_documentai.DocumentProcessorServiceClient = mock.Mock(
+        side_effect=Exception("Auth error")
+    )
     with app.test_request_context(json=_BIGQUERY_REQUEST_JSON):
         response = document_function.document_ocr(flask.request)
         assert response.status_code == 400
-        assert "API error" in str(response.get_data())
+        assert "Auth error" in str(response.get_data())
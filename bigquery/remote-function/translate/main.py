@@ -15,16 +15,104 @@
 # [START bigquery_remote_function_translation]
 from __future__ import annotations
 
+import collections
+from concurrent import futures
+import hashlib
+import threading
+import time
 
 import flask
 import functions_framework
 from google.api_core.retry import Retry
 from google.cloud import translate
 
+# Limits of a single translate_text request, see
+# https://cloud.google.com/translate/quotas#content
+MAX_CHUNK_CODEPOINTS = 30_000
+MAX_CHUNK_TEXTS = 1024
+# Number of chunks translated concurrently
+MAX_WORKERS = 8
+
 # Construct a Translation Client object
 translate_client = translate.TranslationServiceClient()
 
 
+class TranslationCache:
+    """In-memory LRU cache of translations, with an expiration time.
+
+    Entries are keyed by target language and text hash. To share the cache
+    across instances, replace `translation_cache` with an object that has
+    the same `get_many` and `set_many` methods, like `RedisTranslationCache`.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 3600) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: collections.OrderedDict[str, tuple[float, str]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Returns the cached translations of the given keys."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires, translated = entry
+                if expires < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = translated
+        return found
+
+    def set_many(self, translations: dict[str, str]) -> None:
+        """Caches translations, evicting the least recently used ones."""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, translated in translations.items():
+                self._entries[key] = (expires, translated)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class RedisTranslationCache:
+    """Translation cache in Redis, like Memorystore, shared across instances.
+
+    Args:
+        redis_client: a `redis.Redis` client.
+        ttl: the expiration time of the entries, in seconds.
+    """
+
+    def __init__(self, redis_client: object, ttl: int = 86400) -> None:
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Returns the cached translations of the given keys."""
+        values = self.redis_client.mget(keys) if keys else []
+        return {
+            key: value.decode() if isinstance(value, bytes) else value
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    def set_many(self, translations: dict[str, str]) -> None:
+        """Caches translations with an expiration time."""
+        pipeline = self.redis_client.pipeline()
+        for key, translated in translations.items():
+            pipeline.set(key, translated, ex=self.ttl)
+        pipeline.execute()
+
+
+translation_cache = TranslationCache()
+
+
 # Register an HTTP function with the Functions Framework
 @functions_framework.http
 def handle_translation(request: flask.Request) -> flask.Response:
@@ -84,11 +172,37 @@ def extract_project_from_caller(job: str) -> str:
     return path[4] if len(path) > 4 else None
 
 
+def cache_key(text: str, target_language_code: str) -> str:
+    """Returns the cache key of a text translated to a language."""
+    text_hash = hashlib.sha256(text.encode()).hexdigest()
+    return f"translate:{target_language_code}:{text_hash}"
+
+
+def split_chunks(texts: list[str]) -> list[list[str]]:
+    """Splits texts into chunks that fit in a single translate_text request."""
+    chunks: list[list[str]] = []
+    chunk_size = 0
+    for text in texts:
+        if (
+            not chunks
+            or len(chunks[-1]) >= MAX_CHUNK_TEXTS
+            or chunk_size + len(text) > MAX_CHUNK_CODEPOINTS
+        ):
+            chunks.append([])
+            chunk_size = 0
+        chunks[-1].append(text)
+        chunk_size += len(text)
+    return chunks
+
+
 def translate_text(
     calls: list[str], project: str, target_language_code: str
 ) -> list[str]:
     """Translates the input text to specified language using Translation API.
 
+    Each distinct text is translated once, and only if it is not cached.
+    The remaining texts are split into chunks translated concurrently.
+
     Args:
         calls: a list of input text to translate.
         project: the project where the translate service will be used.
@@ -102,18 +216,35 @@ def translate_text(
     """
     location = "<your location>"
     parent = f"projects/{project}/locations/{location}"
-    # Call the Translation API, passing a list of values and the target language
-    response = translate_client.translate_text(
-        request={
-            "parent": parent,
-            "contents": calls,
-            "target_language_code": target_language_code,
-            "mime_type": "text/plain",
-        },
-        retry=Retry(),
-    )
-    # Convert the translated value to a list and return it
-    return [translation.translated_text for translation in response.translations]
+
+    # Look up the distinct texts in the cache
+    keys = {text: cache_key(text, target_language_code) for text in calls}
+    cached = translation_cache.get_many(list(keys.values()))
+    translated = {text: cached[key] for text, key in keys.items() if key in cached}
+    missing = [text for text in keys if text not in translated]
+
+    def translate_chunk(chunk: list[str]) -> list[str]:
+        # Call the Translation API, passing a list of values and the target language
+        response = translate_client.translate_text(
+            request={
+                "parent": parent,
+                "contents": chunk,
+                "target_language_code": target_language_code,
+                "mime_type": "text/plain",
+            },
+            retry=Retry(),
+        )
+        return [translation.translated_text for translation in response.translations]
+
+    chunks = split_chunks(missing)
+    with futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for chunk, results in zip(chunks, executor.map(translate_chunk, chunks)):
+            translated.update(zip(chunk, results))
+    if missing:
+        translation_cache.set_many({keys[text]: translated[text] for text in missing})
+
+    # Return the translations in the order of the input rows
+    return [translated[text] for text in calls]
 
 
 # [END bigquery_remote_function_translation]
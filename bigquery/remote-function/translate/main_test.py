@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from collections.abc import Iterator
 from unittest import mock
 
 
@@ -25,6 +26,27 @@ def app() -> flask.Flask:
     return flask.Flask(__name__)
 
 
+# Start every test with an empty translation cache.
+@pytest.fixture(autouse=True)
+def translation_cache() -> Iterator[object]:
+    import main
+
+    with mock.patch("main.translation_cache", main.TranslationCache()) as cache:
+        yield cache
+
+
+def fake_translate_text(
+    request: dict, retry: object
+) -> translate.TranslateTextResponse:
+    return translate.TranslateTextResponse(
+        {
+            "translations": [
+                {"translated_text": text.upper()} for text in request["contents"]
+            ]
+        }
+    )
+
+
 @mock.patch("main.translate_client")
 def test_main(mock_translate: object, app: flask.Flask) -> None:
     import main
@@ -75,3 +97,55 @@ def test_translate_client_error(mock_translate: object, app: flask.Flask) -> Non
         assert response.status_code == 400
         assert "errorMessage" in response.get_json()
         assert response.get_json()["errorMessage"].endswith("API error")
+
+
+@mock.patch("main.translate_client")
+def test_translate_text_deduplicates_and_caches(mock_translate: object) -> None:
+    import main
+
+    mock_translate.translate_text.side_effect = fake_translate_text
+
+    assert main.translate_text(["a", "b", "a"], "test-project", "es") == ["A", "B", "A"]
+    assert mock_translate.translate_text.call_count == 1
+    assert mock_translate.translate_text.call_args[1]["request"]["contents"] == [
+        "a",
+        "b",
+    ]
+
+    # Only the texts that are not cached are translated.
+    assert main.translate_text(["b", "c"], "test-project", "es") == ["B", "C"]
+    assert mock_translate.translate_text.call_args[1]["request"]["contents"] == ["c"]
+
+    # Cache entries are per target language.
+    main.translate_text(["a"], "test-project", "fr")
+    assert mock_translate.translate_text.call_count == 3
+
+
+@mock.patch("main.MAX_CHUNK_CODEPOINTS", 5)
+@mock.patch("main.MAX_CHUNK_TEXTS", 2)
+@mock.patch("main.translate_client")
+def test_translate_text_chunks(mock_translate: object) -> None:
+    import main
+
+    mock_translate.translate_text.side_effect = fake_translate_text
+    texts = ["aaa", "bb", "c", "d", "eeeeee", "f"]
+
+    assert main.split_chunks(texts) == [["aaa", "bb"], ["c", "d"], ["eeeeee"], ["f"]]
+    assert main.translate_text(texts, "test-project", "es") == [
+        text.upper() for text in texts
+    ]
+    assert mock_translate.translate_text.call_count == 4
+
+
+def test_translation_cache_lru_and_ttl() -> None:
+    import main
+
+    cache = main.TranslationCache(max_size=2, ttl=60)
+    with mock.patch("main.time.monotonic", return_value=0):
+        cache.set_many({"a": "A", "b": "B"})
+        assert cache.get_many(["a"]) == {"a": "A"}
+        cache.set_many({"c": "C"})
+        # "b" is the least recently used entry.
+        assert cache.get_many(["a", "b", "c"]) == {"a": "A", "c": "C"}
+    with mock.patch("main.time.monotonic", return_value=61):
+        assert cache.get_many(["a", "c"]) == {}
@@ -13,16 +13,71 @@
 # limitations under the License.
 
 # [START bigquery_remote_function_vision]
+from __future__ import annotations
+
+from concurrent import futures
+import threading
 import urllib.request
 
 import flask
 import functions_framework
 from google.cloud import vision
 
+_MAX_WORKERS = 16  # Number of concurrent downloads and API requests
+_BATCH_SIZE = 16  # Maximum number of images per batch_annotate_images request
+_BATCH_BYTES = 8 * 1024 * 1024  # Maximum bytes of images per request
+
+# The client is created once per instance and reused across requests.
+_client = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> vision.ImageAnnotatorClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = vision.ImageAnnotatorClient()
+    return _client
+
+
+def _error(e: Exception) -> dict:
+    return {"error": {"message": str(e)}}
+
+
+def _download(url: str) -> bytes | Exception:
+    try:
+        return urllib.request.urlopen(url).read()
+    except Exception as e:
+        return e
+
+
+def _annotate_batch(
+    client: vision.ImageAnnotatorClient, contents: list[bytes]
+) -> list[dict]:
+    try:
+        response = client.batch_annotate_images(
+            requests=[
+                {
+                    "image": {"content": content},
+                    "features": [{"type_": vision.Feature.Type.LABEL_DETECTION}],
+                }
+                for content in contents
+            ]
+        )
+    except Exception as e:
+        return [_error(e)] * len(contents)
+    return [vision.AnnotateImageResponse.to_dict(r) for r in response.responses]
+
 
 @functions_framework.http
 def label_detection(request: flask.Request) -> flask.Response:
     """BigQuery remote function to label input images.
+
+    Images are downloaded concurrently and, as they arrive, grouped into
+    batches of up to `_BATCH_SIZE` images and `_BATCH_BYTES` bytes that are
+    labeled while the other images are still downloading. Rows that fail get
+    an "error" in their reply instead of failing the whole request.
+
     Args:
         request: HTTP request from BigQuery
         https://cloud.google.com/bigquery/docs/reference/standard-sql/remote-functions#input_format
@@ -31,13 +86,48 @@ def label_detection(request: flask.Request) -> flask.Response:
         https://cloud.google.com/bigquery/docs/reference/standard-sql/remote-functions#output_format
     """
     try:
-        client = vision.ImageAnnotatorClient()
+        client = _get_client()
         calls = request.get_json()["calls"]
-        replies = []
-        for call in calls:
-            content = urllib.request.urlopen(call[0]).read()
-            results = client.label_detection({"content": content})
-            replies.append(vision.AnnotateImageResponse.to_dict(results))
+        replies: list[dict | None] = [None] * len(calls)
+        with futures.ThreadPoolExecutor(
+            max_workers=_MAX_WORKERS
+        ) as downloads, futures.ThreadPoolExecutor(
+            max_workers=_MAX_WORKERS
+        ) as annotations:
+            downloading = {
+                downloads.submit(_download, call[0]): i for i, call in enumerate(calls)
+            }
+            labeling: dict[futures.Future, list[int]] = {}
+            batch: dict[int, bytes] = {}
+            batch_bytes = 0
+
+            def label_batch() -> None:
+                future = annotations.submit(
+                    _annotate_batch, client, list(batch.values())
+                )
+                labeling[future] = list(batch)
+
+            for future in futures.as_completed(downloading):
+                i = downloading.pop(future)
+                content = future.result()
+                if isinstance(content, Exception):
+                    replies[i] = _error(content)
+                    continue
+                # An image larger than _BATCH_BYTES is labeled on its own.
+                if batch and (
+                    len(batch) == _BATCH_SIZE
+                    or batch_bytes + len(content) > _BATCH_BYTES
+                ):
+                    label_batch()
+                    batch, batch_bytes = {}, 0
+                batch[i] = content
+                batch_bytes += len(content)
+            if batch:
+                label_batch()
+
+            for future, indexes in labeling.items():
+                for i, reply in zip(indexes, future.result()):
+                    replies[i] = reply
         return flask.make_response(flask.jsonify({"replies": replies}))
     except Exception as e:
         return flask.make_response(flask.jsonify({"errorMessage": str(e)}), 400)
@@ -27,24 +27,25 @@ def app() -> flask.Flask:
     return flask.Flask(__name__)
 
 
+@mock.patch("vision_function._client", None)
 @mock.patch("vision_function.urllib.request")
 @mock.patch("vision_function.vision")
 def test_vision_function(
     mock_vision: object, mock_request: object, app: flask.Flask
 ) -> None:
-    mock_request.urlopen = mock.Mock(read=mock.Mock(return_value=b"filedata"))
-    label_detection_mock = mock.Mock(
-        side_effect=[
-            vision.AnnotateImageResponse(
-                {"label_annotations": [{"description": "apple"}]}
-            ),
-            vision.AnnotateImageResponse(
-                {"label_annotations": [{"description": "banana"}]}
-            ),
-        ]
+    mock_request.urlopen.return_value.read.return_value = b"filedata"
+    batch_annotate_images_mock = mock.Mock(
+        return_value=vision.BatchAnnotateImagesResponse(
+            {
+                "responses": [
+                    {"label_annotations": [{"description": "apple"}]},
+                    {"label_annotations": [{"description": "banana"}]},
+                ]
+            }
+        )
     )
     mock_vision.ImageAnnotatorClient = mock.Mock(
-        return_value=mock.Mock(label_detection=label_detection_mock)
+        return_value=mock.Mock(batch_annotate_images=batch_annotate_images_mock)
     )
     mock_vision.AnnotateImageResponse = vision.AnnotateImageResponse
     with app.test_request_context(
@@ -60,26 +61,96 @@ def test_vision_function(
         assert len(response.get_json()["replies"]) == 2
         assert "apple" in str(response.get_json()["replies"][0])
         assert "banana" in str(response.get_json()["replies"][1])
+        batch_annotate_images_mock.assert_called_once()
 
 
+@mock.patch("vision_function._client", None)
 @mock.patch("vision_function.urllib.request")
 @mock.patch("vision_function.vision")
-def test_vision_function_error(
+def test_vision_function_row_errors(
     mock_vision: object, mock_request: object, app: flask.Flask
 ) -> None:
-    mock_request.urlopen = mock.Mock(read=mock.Mock(return_value=b"filedata"))
-    label_detection_mock = mock.Mock(side_effect=Exception("API error"))
+    def urlopen(url: str) -> mock.Mock:
+        if url.endswith("missing"):
+            raise Exception("Not found")
+        return mock.Mock(read=mock.Mock(return_value=b"filedata"))
+
+    mock_request.urlopen = urlopen
+    batch_annotate_images_mock = mock.Mock(side_effect=Exception("API error"))
     mock_vision.ImageAnnotatorClient = mock.Mock(
-        return_value=mock.Mock(label_detection=label_detection_mock)
+        return_value=mock.Mock(batch_annotate_images=batch_annotate_images_mock)
     )
     with app.test_request_context(
         json={
             "calls": [
-                ["https://storage.googleapis.com/bucket/apple"],
+                ["https://storage.googleapis.com/bucket/missing"],
                 ["https://storage.googleapis.com/bucket/banana"],
             ]
         }
+    ):
+        response = vision_function.label_detection(flask.request)
+        assert response.status_code == 200
+        assert response.get_json()["replies"] == [
+            {"error": {"message": "Not found"}},
+            {"error": {"message": "API error"}},
+        ]
+
+
+@mock.patch("vision_function._client", None)
+@mock.patch("vision_function._BATCH_BYTES", 20)
+@mock.patch("vision_function.urllib.request")
+@mock.patch("vision_function.vision")
+def test_vision_function_batch_bytes(
+    mock_vision: object, mock_request: object, app: flask.Flask
+) -> None:
+    def urlopen(url: str) -> mock.Mock:
+        # The "large" image alone is over the bytes of a batch.
+        size = 30 if url.endswith("large") else 8
+        return mock.Mock(read=mock.Mock(return_value=url[-1].encode() * size))
+
+    def batch_annotate_images(requests: list[dict]) -> object:
+        return vision.BatchAnnotateImagesResponse(
+            {
+                "responses": [
+                    {
+                        "label_annotations": [
+                            {"description": request["image"]["content"][:1].decode()}
+                        ]
+                    }
+                    for request in requests
+                ]
+            }
+        )
+
+    mock_request.urlopen = urlopen
+    batch_annotate_images_mock = mock.Mock(side_effect=batch_annotate_images)
+    mock_vision.ImageAnnotatorClient = mock.Mock(
+        return_value=mock.Mock(batch_annotate_images=batch_annotate_images_mock)
+    )
+    mock_vision.AnnotateImageResponse = vision.AnnotateImageResponse
+    names = ["1", "2", "3", "large", "5", "6"]
+    with app.test_request_context(
+        json={"calls": [[f"https://storage.googleapis.com/bucket/{n}"] for n in names]}
+    ):
+        response = vision_function.label_detection(flask.request)
+        assert response.status_code == 200
+        descriptions = [
+            reply["label_annotations"][0]["description"]
+            for reply in response.get_json()["replies"]
+        ]
+        assert descriptions == ["1", "2", "3", "e", "5", "6"]
+        for call in batch_annotate_images_mock.call_args_list:
+            contents = [r["image"]["content"] for r in call.kwargs["requests"]]
+            assert len(contents) == 1 or sum(len(c) for c in contents) <= 20
+
+
+@mock.patch("vision_function._client", None)
+@mock.patch("vision_function.vision")
+def test_vision_function_error(mock_vision: object, app: flask.Flask) -> None:
+    mock_vision.ImageAnnotatorClient = mock.Mock(side_effect=Exception("Auth error"))
+    with app.test_request_context(
+        json={"calls": [["https://storage.googleapis.com/bucket/apple"]]}
     ):
         response = vision_function.label_detection(flask.request)
         assert response.status_code == 400
-        assert "API error" in str(response.get_data())
+        assert "Auth error" in str(response.get_data())
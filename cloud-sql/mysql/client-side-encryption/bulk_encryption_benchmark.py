@@ -0,0 +1,120 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the rows/s of per-row and bulk envelope encryption.
+
+Cloud KMS is replaced by a local fake, which wraps keys with a local AEAD
+after sleeping for the latency of a Cloud KMS request, and counts them.
+
+    python bulk_encryption_benchmark.py --rows 2000 --kms-latency 0.02
+"""
+
+import threading
+import time
+from typing import Callable
+
+from tink import aead
+from tink import core
+
+from snippets.cached_env_aead import CachedKmsEnvelopeAead
+from snippets.encrypt_and_insert_data import encrypt_votes
+from snippets.query_and_decrypt_data import decrypt_rows
+
+
+class FakeKmsAead(aead.Aead):
+    def __init__(self, latency: float) -> None:
+        key_data = core.Registry.new_key_data(aead.aead_key_templates.AES256_GCM)
+        self.local_aead = core.Registry.primitive(key_data, aead.Aead)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _request(self) -> None:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def encrypt(self, plaintext: bytes, associated_data: bytes) -> bytes:
+        self._request()
+        return self.local_aead.encrypt(plaintext, associated_data)
+
+    def decrypt(self, ciphertext: bytes, associated_data: bytes) -> bytes:
+        self._request()
+        return self.local_aead.decrypt(ciphertext, associated_data)
+
+
+def benchmark(name: str, kms: FakeKmsAead, run: Callable[[], list]) -> list:
+    kms.requests = 0
+    start = time.perf_counter()
+    results = run()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<32} {len(results) / elapsed:>10.0f} rows/s "
+        f"kms requests={kms.requests}"
+    )
+    return results
+
+
+def decrypt_sequentially(env_aead: aead.Aead, rows: list[tuple]) -> list[tuple]:
+    # The previous implementation, one row after the other.
+    return [
+        (team, env_aead.decrypt(email, team.encode()).decode(), time_cast)
+        for team, time_cast, email in rows
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--kms-latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    aead.register()
+    key_template = aead.aead_key_templates.AES256_GCM
+    kms = FakeKmsAead(args.kms_latency)
+    env_aead = aead.KmsEnvelopeAead(key_template, kms)
+    cached_env_aead = CachedKmsEnvelopeAead(key_template, kms)
+
+    votes = [
+        ("TABS" if n % 2 else "SPACES", f"voter{n}@example.com")
+        for n in range(args.rows)
+    ]
+
+    def to_rows(params: list[dict]) -> list[tuple]:
+        return [(p["team"], p["time_cast"], p["voter_email"]) for p in params]
+
+    rows = to_rows(
+        benchmark("encrypt per row", kms, lambda: encrypt_votes(env_aead, votes))
+    )
+    cached_rows = to_rows(
+        benchmark(
+            "encrypt with cached DEK",
+            kms,
+            lambda: encrypt_votes(cached_env_aead, votes),
+        )
+    )
+    benchmark("decrypt sequentially", kms, lambda: decrypt_sequentially(env_aead, rows))
+    benchmark(
+        "decrypt per row in a pool",
+        kms,
+        lambda: decrypt_rows(env_aead, rows, args.workers),
+    )
+    benchmark(
+        "decrypt cached DEK in a pool",
+        kms,
+        lambda: decrypt_rows(cached_env_aead, cached_rows, args.workers),
+    )
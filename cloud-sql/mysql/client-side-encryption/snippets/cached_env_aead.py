@@ -0,0 +1,139 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import logging
+import struct
+import threading
+import time
+
+import tink
+from tink import aead
+from tink import core
+from tink.integration import gcpkms
+from tink.proto import tink_pb2
+
+logger = logging.getLogger(__name__)
+
+# Same layout as the ciphertexts of tink.aead.KmsEnvelopeAead: the length of
+# the encrypted DEK as 4 big endian bytes, the encrypted DEK, then the payload.
+DEK_LEN_BYTES = aead.KmsEnvelopeAead.DEK_LEN_BYTES
+
+
+class CachedKmsEnvelopeAead(aead.Aead):
+    """
+    Envelope AEAD that encrypts many rows under the same data encryption key.
+
+    Unlike KmsEnvelopeAead, which wraps a new DEK through Cloud KMS for every
+    encryption, the DEK is reused until it is `max_age` seconds old or has
+    encrypted `max_uses` rows. Unwrapped DEKs are also kept to decrypt the rows
+    sharing them without calling Cloud KMS again. The ciphertexts can still be
+    decrypted by KmsEnvelopeAead, and the other way around.
+    """
+
+    def __init__(
+        self,
+        key_template: tink_pb2.KeyTemplate,
+        remote_aead: aead.Aead,
+        max_age: float = 300.0,
+        max_uses: int = 100_000,
+        max_cached_deks: int = 1000,
+    ) -> None:
+        self.key_template = key_template
+        self.remote_aead = remote_aead
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.max_cached_deks = max_cached_deks
+        self._lock = threading.Lock()
+        self._dek_header = b""
+        self._dek_aead = None
+        self._dek_expiry = 0.0
+        self._dek_uses = 0
+        self._decrypt_deks: collections.OrderedDict[bytes, aead.Aead] = (
+            collections.OrderedDict()
+        )
+
+    def _rotate_dek(self) -> None:
+        dek = core.Registry.new_key_data(self.key_template)
+        encrypted_dek = self.remote_aead.encrypt(dek.value, b"")
+        self._dek_header = struct.pack(">I", len(encrypted_dek)) + encrypted_dek
+        self._dek_aead = core.Registry.primitive(dek, aead.Aead)
+        self._dek_expiry = time.monotonic() + self.max_age
+        self._dek_uses = 0
+
+    def encrypt(self, plaintext: bytes, associated_data: bytes) -> bytes:
+        with self._lock:
+            if (
+                self._dek_aead is None
+                or self._dek_uses >= self.max_uses
+                or time.monotonic() >= self._dek_expiry
+            ):
+                self._rotate_dek()
+            self._dek_uses += 1
+            header, dek_aead = self._dek_header, self._dek_aead
+        return header + dek_aead.encrypt(plaintext, associated_data)
+
+    def _get_decrypt_dek(self, encrypted_dek: bytes) -> aead.Aead:
+        with self._lock:
+            dek_aead = self._decrypt_deks.get(encrypted_dek)
+            if dek_aead is not None:
+                self._decrypt_deks.move_to_end(encrypted_dek)
+                return dek_aead
+
+        # Unwrap the DEK outside of the lock, so that rows encrypted with
+        # different DEKs are unwrapped concurrently.
+        dek = tink_pb2.KeyData(
+            type_url=self.key_template.type_url,
+            value=self.remote_aead.decrypt(encrypted_dek, b""),
+            key_material_type=tink_pb2.KeyData.SYMMETRIC,
+        )
+        dek_aead = core.Registry.primitive(dek, aead.Aead)
+        with self._lock:
+            self._decrypt_deks[encrypted_dek] = dek_aead
+            if len(self._decrypt_deks) > self.max_cached_deks:
+                self._decrypt_deks.popitem(last=False)
+        return dek_aead
+
+    def decrypt(self, ciphertext: bytes, associated_data: bytes) -> bytes:
+        if len(ciphertext) < DEK_LEN_BYTES:
+            raise tink.TinkError("Ciphertext too short")
+        dek_len = struct.unpack(">I", ciphertext[:DEK_LEN_BYTES])[0]
+        if dek_len > len(ciphertext) - DEK_LEN_BYTES:
+            raise tink.TinkError("Invalid encrypted DEK length")
+        encrypted_dek = ciphertext[DEK_LEN_BYTES : DEK_LEN_BYTES + dek_len]
+        dek_aead = self._get_decrypt_dek(encrypted_dek)
+        return dek_aead.decrypt(ciphertext[DEK_LEN_BYTES + dek_len :], associated_data)
+
+
+def init_tink_cached_env_aead(
+    key_uri: str,
+    credentials: str,
+    max_age: float = 300.0,
+    max_uses: int = 100_000,
+) -> CachedKmsEnvelopeAead:
+    """
+    Initiates an envelope AEAD object for bulk encryption, which reuses its
+    data encryption key for up to `max_age` seconds and `max_uses` rows.
+    """
+    aead.register()
+
+    try:
+        gcp_client = gcpkms.GcpKmsClient(key_uri, credentials)
+        gcp_aead = gcp_client.get_aead(key_uri)
+    except tink.TinkError as e:
+        logger.error("Error initializing GCP client: %s", e)
+        raise e
+
+    key_template = aead.aead_key_templates.AES256_GCM
+    return CachedKmsEnvelopeAead(key_template, gcp_aead, max_age, max_uses)
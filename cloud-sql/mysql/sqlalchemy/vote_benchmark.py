@@ -0,0 +1,102 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the vote throughput of single-row inserts and the buffered store.
+
+The benchmark connects to the database configured with the same environment
+variables as the app, and casts real votes into its `votes` table.
+
+    python vote_benchmark.py --threads 16 --votes 500
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import time
+from typing import Callable
+
+import sqlalchemy
+
+import app
+
+
+def insert_vote(db: sqlalchemy.engine.base.Engine) -> Callable[[], None]:
+    # The previous implementation, one INSERT and commit for every vote.
+    stmt = sqlalchemy.text(
+        "INSERT INTO votes (time_cast, candidate) VALUES (:time_cast, :candidate)"
+    )
+
+    def cast() -> None:
+        time_cast = datetime.datetime.now(tz=datetime.timezone.utc)
+        with db.connect() as conn:
+            conn.execute(stmt, parameters={"time_cast": time_cast, "candidate": "TABS"})
+            conn.commit()
+
+    return cast
+
+
+def buffer_vote(db: sqlalchemy.engine.base.Engine) -> Callable[[], None]:
+    store = app.get_vote_store(db)
+
+    def cast() -> None:
+        time_cast = datetime.datetime.now(tz=datetime.timezone.utc)
+        # Back off while the buffer is full, as a client would on a 503.
+        while not store.add_vote(time_cast, "TABS"):
+            time.sleep(0.01)
+
+    return cast
+
+
+def benchmark(
+    name: str,
+    cast: Callable[[], None],
+    flush: Callable[[], None],
+    threads: int,
+    votes: int,
+) -> None:
+    def cast_votes(_: int) -> list[float]:
+        latencies = []
+        for _ in range(votes):
+            start = time.perf_counter()
+            cast()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = sorted(sum(executor.map(cast_votes, range(threads)), []))
+    flush()
+    elapsed = time.perf_counter() - start
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(
+        f"{name:<10} {len(latencies) / elapsed:>10.0f} votes/s "
+        f"p50={p50:.2f}ms p99={p99:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--votes", type=int, default=500, help="votes per thread")
+    args = parser.parse_args()
+
+    db = app.init_connection_pool()
+    app.migrate_db(db)
+    benchmark("insert", insert_vote(db), lambda: None, args.threads, args.votes)
+    store = app.get_vote_store(db)
+    benchmark("buffered", buffer_vote(db), store.flush, args.threads, args.votes)
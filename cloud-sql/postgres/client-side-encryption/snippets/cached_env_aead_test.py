@@ -0,0 +1,77 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import pytest
+from tink import aead
+from tink import core
+
+from snippets.cached_env_aead import CachedKmsEnvelopeAead
+from snippets.query_and_decrypt_data import decrypt_rows
+
+
+@pytest.fixture(name="remote_aead")
+def setup_remote_aead() -> mock.Mock:
+    aead.register()
+    key_data = core.Registry.new_key_data(aead.aead_key_templates.AES256_GCM)
+    local_aead = core.Registry.primitive(key_data, aead.Aead)
+    # Stands in for the Cloud KMS AEAD, counting the requests made to it.
+    yield mock.Mock(wraps=local_aead)
+
+
+def test_reuses_dek_up_to_max_uses(remote_aead: mock.Mock) -> None:
+    key_template = aead.aead_key_templates.AES256_GCM
+    env_aead = CachedKmsEnvelopeAead(key_template, remote_aead, max_uses=10)
+
+    ciphertexts = [env_aead.encrypt(b"hello@example.com", b"TABS") for _ in range(25)]
+
+    assert remote_aead.encrypt.call_count == 3
+    encrypted_deks = {c[4 : 4 + int.from_bytes(c[:4], "big")] for c in ciphertexts}
+    assert len(encrypted_deks) == 3
+
+    # Ciphertexts are compatible with KmsEnvelopeAead, both ways.
+    kms_env_aead = aead.KmsEnvelopeAead(key_template, remote_aead)
+    for ciphertext in ciphertexts:
+        assert env_aead.decrypt(ciphertext, b"TABS") == b"hello@example.com"
+        assert kms_env_aead.decrypt(ciphertext, b"TABS") == b"hello@example.com"
+    ciphertext = kms_env_aead.encrypt(b"hello@example.com", b"TABS")
+    assert env_aead.decrypt(ciphertext, b"TABS") == b"hello@example.com"
+
+
+def test_rotates_expired_dek(remote_aead: mock.Mock) -> None:
+    key_template = aead.aead_key_templates.AES256_GCM
+    env_aead = CachedKmsEnvelopeAead(key_template, remote_aead, max_age=60)
+
+    with mock.patch("time.monotonic", return_value=1000.0):
+        env_aead.encrypt(b"hello@example.com", b"TABS")
+        env_aead.encrypt(b"hello@example.com", b"TABS")
+    with mock.patch("time.monotonic", return_value=1060.0):
+        env_aead.encrypt(b"hello@example.com", b"TABS")
+
+    assert remote_aead.encrypt.call_count == 2
+
+
+def test_decrypt_rows(remote_aead: mock.Mock) -> None:
+    key_template = aead.aead_key_templates.AES256_GCM
+    env_aead = CachedKmsEnvelopeAead(key_template, remote_aead)
+    emails = [f"voter{n}@example.com" for n in range(50)]
+    rows = [
+        ("TABS", n, env_aead.encrypt(email.encode(), b"TABS"))
+        for n, email in enumerate(emails)
+    ]
+
+    output = decrypt_rows(env_aead, rows, max_workers=4)
+
+    assert output == [("TABS", email, n) for n, email in enumerate(emails)]
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+
 # [START cloud_sql_postgres_cse_query]
 import os
 
@@ -106,5 +109,46 @@ def query_and_decrypt_data(
 
 # [END cloud_sql_postgres_cse_query]
 
+
+def decrypt_rows(
+    env_aead: tink.aead.Aead,
+    rows: list[tuple],
+    max_workers: int = 8,
+) -> list[tuple[str, str, datetime.datetime]]:
+    """
+    Decrypts the (team, time_cast, voter_email) rows of a result set in a pool of
+    threads, so that the Cloud KMS requests unwrapping their keys overlap.
+    """
+
+    def decrypt_row(row: tuple) -> tuple[str, str, datetime.datetime]:
+        # Postgres pads CHAR fields with spaces. These will need to be removed before
+        # decrypting.
+        team = row[0].rstrip()
+        email = env_aead.decrypt(row[2], team.encode()).decode()
+        return team, email, row[1]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(decrypt_row, rows))
+
+
+def query_and_decrypt_votes(
+    db: sqlalchemy.engine.base.Engine,
+    env_aead: tink.aead.Aead,
+    table_name: str,
+    limit: int = 1000,
+    max_workers: int = 8,
+) -> list[tuple[str, str, datetime.datetime]]:
+    """
+    Retrieves the most recent votes from the database and decrypts them in bulk.
+    """
+    stmt = sqlalchemy.text(
+        f"SELECT team, time_cast, voter_email FROM {table_name} "
+        "ORDER BY time_cast DESC LIMIT :limit"
+    )
+    with db.connect() as conn:
+        rows = conn.execute(stmt, {"limit": limit}).fetchall()
+    return decrypt_rows(env_aead, rows, max_workers)
+
+
 if __name__ == "__main__":
     main()
@@ -99,5 +99,48 @@ def encrypt_and_insert_data(
 
 # [END cloud_sql_sqlserver_cse_insert]
 
+
+def encrypt_votes(env_aead: tink.aead.Aead, votes: list[tuple[str, str]]) -> list[dict]:
+    """
+    Encrypts the email addresses of (team, email) votes, and returns the
+    parameters of their INSERT statement.
+    """
+    time_cast = datetime.datetime.now(tz=datetime.timezone.utc)
+    params = []
+    for team, email in votes:
+        # Verify that the team is one of the allowed options
+        if team != "TABS" and team != "SPACES":
+            raise ValueError(f"Invalid team specified: {team}")
+        encrypted_email = env_aead.encrypt(email.encode(), team.encode())
+        params.append(
+            {"time_cast": time_cast, "team": team, "voter_email": encrypted_email}
+        )
+    return params
+
+
+def encrypt_and_insert_votes(
+    db: sqlalchemy.engine.base.Engine,
+    env_aead: tink.aead.Aead,
+    table_name: str,
+    votes: list[tuple[str, str]],
+) -> int:
+    """
+    Inserts many (team, email) votes into the database in a single transaction.
+
+    Pass a CachedKmsEnvelopeAead as `env_aead`, so that the votes are encrypted
+    without a Cloud KMS request for each of them.
+    """
+    params = encrypt_votes(env_aead, votes)
+    stmt = sqlalchemy.text(
+        f"INSERT INTO {table_name} (time_cast, team, voter_email)"
+        " VALUES (:time_cast, :team, CONVERT(varbinary(max), :voter_email, 0))"
+    )
+    # Passing a list of parameters runs the statement with executemany().
+    with db.begin() as conn:
+        conn.execute(stmt, params)
+    print(f"{len(params)} votes successfully cast!")
+    return len(params)
+
+
 if __name__ == "__main__":
     main()
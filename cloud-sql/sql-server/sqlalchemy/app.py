@@ -14,9 +14,12 @@
 
 from __future__ import annotations
 
+import atexit
 import datetime
 import logging
 import os
+import threading
+import time
 
 from flask import Flask, render_template, request, Response
 import sqlalchemy
@@ -33,6 +36,23 @@ app = Flask(__name__)
 
 logger = logging.getLogger()
 
+# When BUFFER_VOTES is set, votes are buffered in memory and written to the
+# database in batches, when VOTE_FLUSH_SIZE votes are buffered or every
+# VOTE_FLUSH_INTERVAL seconds. At most VOTE_BUFFER_LIMIT votes are buffered.
+BUFFER_VOTES = bool(os.environ.get("BUFFER_VOTES"))
+VOTE_BUFFER_LIMIT = int(os.environ.get("VOTE_BUFFER_LIMIT", 10_000))
+VOTE_FLUSH_SIZE = int(os.environ.get("VOTE_FLUSH_SIZE", 100))
+VOTE_FLUSH_INTERVAL = float(os.environ.get("VOTE_FLUSH_INTERVAL", 1.0))
+# Maximum number of votes per INSERT statement.
+VOTE_INSERT_ROWS = 500
+# Vote tallies are counted again in the database every TALLY_TTL seconds,
+# to include the votes cast on other instances.
+TALLY_TTL = float(os.environ.get("TALLY_TTL", 60))
+
+votes_table = sqlalchemy.table(
+    "votes", sqlalchemy.column("time_cast"), sqlalchemy.column("candidate")
+)
+
 
 def init_connection_pool() -> sqlalchemy.engine.base.Engine:
     # use a TCP socket when INSTANCE_HOST (e.g. 127.0.0.1) is defined
@@ -93,7 +113,7 @@ def cast_vote() -> Response:
     return save_vote(db, team)
 
 
-def get_index_context(db: sqlalchemy.engine.base.Engine) -> dict:
+def query_index_context(db: sqlalchemy.engine.base.Engine) -> dict:
     votes = []
     with db.connect() as conn:
         # Execute the query and fetch all results
@@ -120,6 +140,155 @@ def get_index_context(db: sqlalchemy.engine.base.Engine) -> dict:
     }
 
 
+class VoteStore:
+    """Buffers the votes cast, and keeps the vote tallies in memory.
+
+    A background thread writes the buffered votes with multi-row inserts, then
+    updates the tallies, so that page views don't need to query the database.
+
+    Votes are acknowledged before they are written: the votes still buffered
+    are lost if the instance is stopped abruptly, or if its CPU is throttled
+    between requests until it is shut down. At most `max_pending` votes are
+    buffered, including the batch being written, after which votes are
+    rejected until the database catches up.
+    """
+
+    def __init__(
+        self,
+        db: sqlalchemy.engine.base.Engine,
+        flush_size: int = VOTE_FLUSH_SIZE,
+        flush_interval: float = VOTE_FLUSH_INTERVAL,
+        tally_ttl: float = TALLY_TTL,
+        max_pending: int = VOTE_BUFFER_LIMIT,
+    ) -> None:
+        self.db = db
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.tally_ttl = tally_ttl
+        self.max_pending = max_pending
+        self._pending: list[dict] = []
+        # Number of votes taken from the buffer by the flush in progress.
+        self._flushing = 0
+        self._pending_changed = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._context: dict | None = None
+        self._context_time = 0.0
+        self._context_lock = threading.Lock()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        # Write the remaining votes when the instance shuts down.
+        atexit.register(self.flush)
+
+    def add_vote(self, time_cast: datetime.datetime, team: str) -> bool:
+        """Buffers a vote, to be written with the next batch.
+
+        Returns:
+            False if the buffer is full and the vote wasn't buffered.
+        """
+        with self._pending_changed:
+            if len(self._pending) + self._flushing >= self.max_pending:
+                return False
+            self._pending.append({"time_cast": time_cast, "candidate": team})
+            if len(self._pending) >= self.flush_size:
+                self._pending_changed.notify()
+        return True
+
+    def flush(self) -> None:
+        """Writes the buffered votes to the database."""
+        with self._flush_lock:
+            with self._pending_changed:
+                votes, self._pending = self._pending, []
+                self._flushing = len(votes)
+            if not votes:
+                return
+
+            try:
+                with self.db.connect() as conn:
+                    # Insert many votes per statement, in a single transaction.
+                    for i in range(0, len(votes), VOTE_INSERT_ROWS):
+                        rows = votes[i : i + VOTE_INSERT_ROWS]
+                        conn.execute(sqlalchemy.insert(votes_table).values(rows))
+                    conn.commit()
+            except Exception:
+                # Keep the votes to retry them with the next batch. The buffer
+                # stays within max_pending, as add_vote() counts these votes.
+                with self._pending_changed:
+                    self._pending[:0] = votes
+                raise
+            finally:
+                with self._pending_changed:
+                    self._flushing = 0
+            self._count_votes(votes)
+
+    def index_context(self) -> dict:
+        """Returns the vote tallies and the most recent votes."""
+        with self._context_lock:
+            if self._context_is_fresh():
+                return dict(self._context)
+
+        # Count the votes while no batch is being written, so that every batch
+        # is either included in the count or added to the tallies after it.
+        with self._flush_lock:
+            with self._context_lock:
+                # Another request may have counted the votes in the meantime.
+                if self._context_is_fresh():
+                    return dict(self._context)
+            context = query_index_context(self.db)
+            with self._context_lock:
+                self._context = context
+                self._context_time = time.monotonic()
+        return dict(context)
+
+    def _context_is_fresh(self) -> bool:
+        return (
+            self._context is not None
+            and time.monotonic() - self._context_time < self.tally_ttl
+        )
+
+    def _count_votes(self, votes: list[dict]) -> None:
+        with self._context_lock:
+            if self._context is None:
+                return
+            context = dict(self._context)
+            for vote in votes:
+                if vote["candidate"] == "TABS":
+                    context["tab_count"] += 1
+                else:
+                    context["space_count"] += 1
+            recent_votes = votes[::-1] + context["recent_votes"]
+            context["recent_votes"] = recent_votes[:5]
+            self._context = context
+
+    def _flush_periodically(self) -> None:
+        while True:
+            with self._pending_changed:
+                self._pending_changed.wait_for(
+                    lambda: len(self._pending) >= self.flush_size,
+                    timeout=self.flush_interval,
+                )
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(e)
+
+
+vote_stores: dict[sqlalchemy.engine.base.Engine, VoteStore] = {}
+vote_stores_lock = threading.Lock()
+
+
+def get_vote_store(db: sqlalchemy.engine.base.Engine) -> VoteStore:
+    """Returns the vote store of a connection pool."""
+    with vote_stores_lock:
+        if db not in vote_stores:
+            vote_stores[db] = VoteStore(db)
+        return vote_stores[db]
+
+
+def get_index_context(db: sqlalchemy.engine.base.Engine) -> dict:
+    if BUFFER_VOTES:
+        return get_vote_store(db).index_context()
+    return query_index_context(db)
+
+
 @app.route("/votes", methods=["POST"])
 def save_vote(db: sqlalchemy.engine.base.Engine, team: str) -> Response:
     time_cast = datetime.datetime.now(tz=datetime.timezone.utc)
@@ -131,6 +300,19 @@ def save_vote(db: sqlalchemy.engine.base.Engine, team: str) -> Response:
             status=400,
         )
 
+    if BUFFER_VOTES:
+        # The vote is written to the database later, with a batch of votes.
+        if not get_vote_store(db).add_vote(time_cast, team):
+            return Response(
+                status=503,
+                response="Too many votes are waiting to be saved! Please try "
+                "again later.",
+            )
+        return Response(
+            status=200,
+            response=f"Vote successfully cast for '{team}' at time {time_cast}!",
+        )
+
     # [START cloud_sql_sqlserver_sqlalchemy_connection]
     # Preparing a statement before hand can help protect against injections.
     stmt = sqlalchemy.text(
@@ -0,0 +1,157 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import datetime
+import threading
+import time
+from typing import Callable
+
+import pytest
+import sqlalchemy
+
+import app
+
+
+@pytest.fixture
+def db(tmp_path: str) -> sqlalchemy.engine.base.Engine:
+    db = sqlalchemy.create_engine(f"sqlite:///{tmp_path}/votes.db")
+    with db.connect() as conn:
+        conn.execute(
+            sqlalchemy.text(
+                "CREATE TABLE votes ( vote_id INTEGER PRIMARY KEY, "
+                "time_cast timestamp NOT NULL, candidate VARCHAR(6) NOT NULL );"
+            )
+        )
+        conn.commit()
+    return db
+
+
+@pytest.fixture(autouse=True)
+def sqlite_index_context(monkeypatch: pytest.MonkeyPatch) -> None:
+    # SQLite doesn't support SELECT TOP(5), so count the votes with LIMIT.
+    def query_index_context(db: sqlalchemy.engine.base.Engine) -> dict:
+        with db.connect() as conn:
+            recent_votes = conn.execute(
+                sqlalchemy.text(
+                    "SELECT candidate, time_cast FROM votes "
+                    "ORDER BY time_cast DESC LIMIT 5"
+                )
+            ).fetchall()
+            stmt = sqlalchemy.text(
+                "SELECT COUNT(vote_id) FROM votes WHERE candidate=:candidate"
+            )
+            return {
+                "recent_votes": [
+                    {"candidate": row[0], "time_cast": row[1]} for row in recent_votes
+                ],
+                "space_count": conn.execute(stmt, {"candidate": "SPACES"}).scalar(),
+                "tab_count": conn.execute(stmt, {"candidate": "TABS"}).scalar(),
+            }
+
+    monkeypatch.setattr(app, "query_index_context", query_index_context)
+
+
+def count_votes(db: sqlalchemy.engine.base.Engine) -> int:
+    with db.connect() as conn:
+        return conn.execute(sqlalchemy.text("SELECT COUNT(*) FROM votes")).scalar()
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def now() -> datetime.datetime:
+    return datetime.datetime.now(tz=datetime.timezone.utc)
+
+
+def test_flush_by_size(db: sqlalchemy.engine.base.Engine) -> None:
+    store = app.VoteStore(db, flush_size=3, flush_interval=60)
+
+    store.add_vote(now(), "TABS")
+    store.add_vote(now(), "SPACES")
+    time.sleep(0.2)
+    assert count_votes(db) == 0
+
+    store.add_vote(now(), "TABS")
+    assert wait_for(lambda: count_votes(db) == 3)
+
+
+def test_flush_by_interval(db: sqlalchemy.engine.base.Engine) -> None:
+    store = app.VoteStore(db, flush_size=100, flush_interval=0.1)
+
+    store.add_vote(now(), "TABS")
+    assert wait_for(lambda: count_votes(db) == 1)
+
+
+def test_buffer_limit(db: sqlalchemy.engine.base.Engine) -> None:
+    store = app.VoteStore(db, flush_size=100, flush_interval=60, max_pending=2)
+
+    assert store.add_vote(now(), "TABS")
+    assert store.add_vote(now(), "TABS")
+    assert not store.add_vote(now(), "TABS")
+
+    store.flush()
+    assert count_votes(db) == 2
+    assert store.add_vote(now(), "TABS")
+
+
+def test_tally(
+    db: sqlalchemy.engine.base.Engine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = app.VoteStore(db, flush_size=100, flush_interval=60, tally_ttl=0)
+    assert store.index_context()["tab_count"] == 0
+
+    # Refresh the tallies after the batch is committed, but before it is added
+    # to the tallies, which must not count it twice.
+    count_batch = store._count_votes
+    readers = []
+
+    def refresh_and_count_batch(votes: list[dict]) -> None:
+        reader = threading.Thread(target=store.index_context)
+        reader.start()
+        reader.join(timeout=0.5)
+        readers.append(reader)
+        count_batch(votes)
+
+    monkeypatch.setattr(store, "_count_votes", refresh_and_count_batch)
+    for team in ("TABS", "TABS", "SPACES"):
+        store.add_vote(now(), team)
+    store.flush()
+    for reader in readers:
+        reader.join()
+
+    # Use the tallies in memory from now on.
+    store.tally_ttl = 3600
+    context = store.index_context()
+    assert context["tab_count"] == 2
+    assert context["space_count"] == 1
+    assert [vote["candidate"] for vote in context["recent_votes"]] == [
+        "SPACES",
+        "TABS",
+        "TABS",
+    ]
+
+    monkeypatch.setattr(store, "_count_votes", count_batch)
+    store.add_vote(now(), "SPACES")
+    store.flush()
+    context = store.index_context()
+    assert context["tab_count"] == 2
+    assert context["space_count"] == 2
+    assert context["recent_votes"][0]["candidate"] == "SPACES"
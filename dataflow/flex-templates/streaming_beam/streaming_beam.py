@@ -26,7 +26,7 @@ import argparse
 import json
 import logging
 import time
-from typing import Any
+from typing import Any, Iterable, NamedTuple
 
 import apache_beam as beam
 from apache_beam.options.pipeline_options import PipelineOptions
@@ -54,6 +54,60 @@ def parse_json_message(message: str) -> dict[str, Any]:
     }
 
 
+class ReviewStats(NamedTuple):
+    """Compact accumulator for the review statistics of a URL."""
+
+    num_reviews: int = 0
+    score_sum: float = 0.0
+    first_date: int | None = None
+    last_date: int | None = None
+
+
+class ReviewStatsFn(beam.CombineFn):
+    """Computes the review statistics of a URL.
+
+    Only a `ReviewStats` is kept for each URL instead of all its messages,
+    so Beam can combine the messages of each bundle before the shuffle.
+    """
+
+    def create_accumulator(self) -> ReviewStats:
+        return ReviewStats()
+
+    def add_input(self, stats: ReviewStats, msg: dict[str, Any]) -> ReviewStats:
+        date = msg["processing_time"]
+        if not stats.num_reviews:
+            return ReviewStats(1, msg["score"], date, date)
+        return ReviewStats(
+            stats.num_reviews + 1,
+            stats.score_sum + msg["score"],
+            min(stats.first_date, date),
+            max(stats.last_date, date),
+        )
+
+    def merge_accumulators(self, accumulators: Iterable[ReviewStats]) -> ReviewStats:
+        num_reviews, score_sum, first_dates, last_dates = 0, 0.0, [], []
+        for stats in accumulators:
+            num_reviews += stats.num_reviews
+            score_sum += stats.score_sum
+            if stats.num_reviews:
+                first_dates.append(stats.first_date)
+                last_dates.append(stats.last_date)
+        return ReviewStats(
+            num_reviews,
+            score_sum,
+            min(first_dates, default=None),
+            max(last_dates, default=None),
+        )
+
+    def extract_output(self, stats: ReviewStats) -> dict[str, Any]:
+        return {
+            "num_reviews": stats.num_reviews,
+            "score": stats.score_sum / stats.num_reviews if stats.num_reviews else 0.0,
+            "first_date": stats.first_date,
+            "last_date": stats.last_date,
+        }
+
+
 def run(
     input_subscription: str,
     output_table: str,
@@ -75,17 +129,8 @@ def run(
             | "Fixed-size windows"
             >> beam.WindowInto(window.FixedWindows(window_interval_sec, 0))
             | "Add URL keys" >> beam.WithKeys(lambda msg: msg["url"])
-            | "Group by URLs" >> beam.GroupByKey()
-            | "Get statistics"
-            >> beam.MapTuple(
-                lambda url, messages: {
-                    "url": url,
-                    "num_reviews": len(messages),
-                    "score": sum(msg["score"] for msg in messages) / len(messages),
-                    "first_date": min(msg["processing_time"] for msg in messages),
-                    "last_date": max(msg["processing_time"] for msg in messages),
-                }
-            )
+            | "Get statistics per URL" >> beam.CombinePerKey(ReviewStatsFn())
+            | "Add URLs" >> beam.MapTuple(lambda url, stats: {"url": url, **stats})
         )
 
         # Output the results into BigQuery table.
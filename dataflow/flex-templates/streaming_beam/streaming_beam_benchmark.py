@@ -0,0 +1,136 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the review statistics computed with GroupByKey and with a CombineFn.
+
+The benchmark runs both versions on the DirectRunner over a synthetic set of
+reviews with skewed URLs, where a few URLs get most of the reviews.
+The shuffle volume is estimated from the pickled size of the elements that
+each version sends to the shuffle for every bundle of `--bundle-size` reviews.
+
+    python streaming_beam_benchmark.py --num-reviews 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable, Iterable
+import pickle
+import random
+import time
+from typing import Any
+
+import apache_beam as beam
+from apache_beam.transforms import window
+
+from streaming_beam import ReviewStatsFn
+
+
+def group_by_key_stats(reviews: beam.PCollection) -> beam.PCollection:
+    # The previous implementation, which materializes all the reviews of a URL.
+    return (
+        reviews
+        | "Group by URLs" >> beam.GroupByKey()
+        | "Get statistics"
+        >> beam.MapTuple(
+            lambda url, messages: {
+                "url": url,
+                "num_reviews": len(messages),
+                "score": sum(msg["score"] for msg in messages) / len(messages),
+                "first_date": min(msg["processing_time"] for msg in messages),
+                "last_date": max(msg["processing_time"] for msg in messages),
+            }
+        )
+    )
+
+
+def combine_stats(reviews: beam.PCollection) -> beam.PCollection:
+    return (
+        reviews
+        | "Get statistics per URL" >> beam.CombinePerKey(ReviewStatsFn())
+        | "Add URLs" >> beam.MapTuple(lambda url, stats: {"url": url, **stats})
+    )
+
+
+def synthetic_reviews(
+    num_reviews: int, num_urls: int, skew: float
+) -> list[tuple[str, dict[str, Any]]]:
+    random.seed(0)
+    urls = [f"https://example.com/page/{n}" for n in range(num_urls)]
+    weights = [1 / (n + 1) ** skew for n in range(num_urls)]
+    reviews = []
+    for url in random.choices(urls, weights, k=num_reviews):
+        msg = {
+            "url": url,
+            "score": float(random.random() < 0.5),
+            "processing_time": 1_600_000_000 + random.randrange(60),
+        }
+        reviews.append((url, msg))
+    return reviews
+
+
+def shuffle_bytes(
+    reviews: list[tuple[str, dict[str, Any]]], bundle_size: int
+) -> tuple[int, int]:
+    """Estimates the bytes shuffled by each version, in that order."""
+    group_by_key_bytes = sum(len(pickle.dumps(review)) for review in reviews)
+    combine_bytes = 0
+    combine_fn = ReviewStatsFn()
+    for i in range(0, len(reviews), bundle_size):
+        accumulators = {}
+        for url, msg in reviews[i : i + bundle_size]:
+            accumulator = accumulators.get(url, combine_fn.create_accumulator())
+            accumulators[url] = combine_fn.add_input(accumulator, msg)
+        combine_bytes += sum(
+            len(pickle.dumps((url, tuple(acc)))) for url, acc in accumulators.items()
+        )
+    return group_by_key_bytes, combine_bytes
+
+
+def benchmark(
+    name: str,
+    get_stats: Callable[[beam.PCollection], beam.PCollection],
+    reviews: Iterable[tuple[str, dict[str, Any]]],
+    shuffled_bytes: int,
+) -> None:
+    start = time.perf_counter()
+    with beam.Pipeline() as pipeline:
+        windowed_reviews = (
+            pipeline
+            | "Create reviews" >> beam.Create(reviews)
+            | "Add timestamps"
+            >> beam.MapTuple(
+                lambda url, msg: window.TimestampedValue(
+                    (url, msg), msg["processing_time"]
+                )
+            )
+            | "Fixed-size windows" >> beam.WindowInto(window.FixedWindows(60, 0))
+        )
+        get_stats(windowed_reviews)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed:7.2f}s  ~{shuffled_bytes / 2**20:8.2f} MiB shuffled")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-reviews", type=int, default=500_000)
+    parser.add_argument("--num-urls", type=int, default=1000)
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--bundle-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    reviews = synthetic_reviews(args.num_reviews, args.num_urls, args.skew)
+    group_by_key_bytes, combine_bytes = shuffle_bytes(reviews, args.bundle_size)
+    benchmark("GroupByKey", group_by_key_stats, reviews, group_by_key_bytes)
+    benchmark("CombineFn", combine_stats, reviews, combine_bytes)
@@ -0,0 +1,177 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Collects the output documents of a batch process while it is still running.
+
+`batch_process_documents_sample.py` waits for the operation to complete,
+then downloads and parses every output shard one after the other. For large
+batches, collecting the output takes longer than processing it. Instead,
+`collect_documents()` polls the operation metadata, and as soon as an input
+document has been processed, downloads and parses its output shards in a
+pool of processes, yielding the documents as they are ready:
+
+    operation = client.batch_process_documents(request)
+    for uri, document in collect_documents(operation, field_mask="text,entities"):
+        print(uri, len(document.text))
+"""
+
+from concurrent.futures import Executor, FIRST_COMPLETED, ProcessPoolExecutor, wait
+import json
+import multiprocessing
+import re
+import time
+from typing import Iterator, Optional
+
+from google.api_core import operation as operation_lib
+from google.cloud import documentai  # type: ignore
+from google.cloud import storage
+
+_storage_client = None
+
+
+def _get_storage_client() -> storage.Client:
+    # One client per worker process, as clients can't be shared across them.
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    return _storage_client
+
+
+def _camel_case(name: str) -> str:
+    first, *rest = name.split("_")
+    return first + "".join(word.capitalize() for word in rest)
+
+
+def parse_field_mask(field_mask: Optional[str]) -> Optional[dict]:
+    """
+    Parses a field mask, such as "text,entities,pages.pageNumber", into a tree
+    of the JSON fields to keep, where None keeps a field and all its children.
+    """
+    if not field_mask:
+        return None
+    tree: dict = {}
+    for path in field_mask.split(","):
+        *parents, name = [_camel_case(field) for field in path.strip().split(".")]
+        node: Optional[dict] = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            if node is None:
+                break
+        else:
+            node[name] = None
+    return tree
+
+
+def project_fields(data: object, fields: dict) -> object:
+    """Keeps only the fields of a JSON Document in a tree of fields."""
+    if isinstance(data, list):
+        return [project_fields(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        name: data[name] if children is None else project_fields(data[name], children)
+        for name, children in fields.items()
+        if name in data
+    }
+
+
+def download_document(bucket: str, name: str, fields: Optional[dict] = None) -> bytes:
+    """
+    Downloads and parses an output shard, and returns it as a serialized
+    Document, which is much faster to pass back and parse than JSON.
+    """
+    data = _get_storage_client().bucket(bucket).blob(name).download_as_bytes()
+    if fields is None:
+        document = documentai.Document.from_json(data, ignore_unknown_fields=True)
+    else:
+        projected = project_fields(json.loads(data), fields)
+        document = documentai.Document.from_json(
+            json.dumps(projected), ignore_unknown_fields=True
+        )
+    return documentai.Document.serialize(document)
+
+
+def collect_documents(
+    operation: operation_lib.Operation,
+    field_mask: Optional[str] = None,
+    poll_interval: float = 10.0,
+    storage_client: Optional[storage.Client] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[tuple[str, documentai.Document]]:
+    """
+    Yields the (gs:// URI, Document) of the output shards of a batch process,
+    as they are processed. Raises ValueError once the shards are collected if
+    the operation failed.
+    """
+    if storage_client is None:
+        storage_client = storage.Client()
+    if executor is None:
+        # Forking a process using gRPC isn't safe, so workers are spawned.
+        executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    fields = parse_field_mask(field_mask)
+
+    collected = set()
+    pending = {}
+    with executor:
+        while True:
+            finished = operation.done()
+            metadata = documentai.BatchProcessMetadata(operation.metadata)
+            for process in metadata.individual_process_statuses:
+                # The output destination is only set when the input document
+                # has been processed.
+                destination = process.output_gcs_destination
+                if not destination or destination in collected:
+                    continue
+                collected.add(destination)
+                if process.status.code != 0:
+                    print(
+                        f"Failed to process {process.input_gcs_source}: "
+                        f"{process.status.message}"
+                    )
+                    continue
+                matches = re.match(r"gs://(.*?)/(.*)", destination)
+                if not matches:
+                    print("Could not parse output GCS destination:", destination)
+                    continue
+                output_bucket, output_prefix = matches.groups()
+                for blob in storage_client.list_blobs(
+                    output_bucket, prefix=output_prefix
+                ):
+                    if blob.content_type != "application/json":
+                        continue
+                    future = executor.submit(
+                        download_document, output_bucket, blob.name, fields
+                    )
+                    pending[future] = f"gs://{output_bucket}/{blob.name}"
+
+            # Yields the shards ready until the next poll, or all of them
+            # once the operation is done.
+            deadline = time.monotonic() + poll_interval
+            while pending:
+                timeout = None if finished else max(0.0, deadline - time.monotonic())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    uri = pending.pop(future)
+                    yield uri, documentai.Document.deserialize(future.result())
+
+            if finished:
+                break
+            time.sleep(max(0.0, deadline - time.monotonic()))
+
+    if metadata.state != documentai.BatchProcessMetadata.State.SUCCEEDED:
+        raise ValueError(f"Batch Process Failed: {metadata.state_message}")
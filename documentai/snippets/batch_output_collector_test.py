@@ -0,0 +1,115 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+from unittest import mock
+
+from documentai.snippets import batch_output_collector
+from google.cloud import documentai
+
+SHARDS = {
+    "output/1/0/doc-0.json": {"text": "first", "pages": [{"pageNumber": 1}]},
+    "output/1/0/doc-1.json": {"text": "second", "pages": [{"pageNumber": 2}]},
+    "output/1/1/doc-0.json": {
+        "text": "third",
+        "entities": [{"type": "total", "mentionText": "42"}],
+        "pages": [{"pageNumber": 1, "dimension": {"width": 8.5}}],
+    },
+}
+
+
+class FakeOperation:
+    """A batch process which finishes one input document per poll."""
+
+    def __init__(self) -> None:
+        self.polls = 0
+
+    def done(self) -> bool:
+        self.polls += 1
+        return self.polls == 3
+
+    @property
+    def metadata(self) -> documentai.BatchProcessMetadata:
+        statuses = [{"input_gcs_source": f"gs://input/{n}.pdf"} for n in range(2)]
+        for n in range(min(self.polls, 2)):
+            statuses[n]["output_gcs_destination"] = f"gs://bucket/output/1/{n}"
+        state = "SUCCEEDED" if self.polls == 3 else "RUNNING"
+        return documentai.BatchProcessMetadata(
+            state=state, individual_process_statuses=statuses
+        )
+
+
+def fake_storage_client() -> mock.Mock:
+    client = mock.Mock()
+
+    def list_blobs(bucket: str, prefix: str) -> list:
+        blobs = [mock.Mock(content_type="text/plain")]
+        for name in SHARDS:
+            if name.startswith(prefix):
+                blobs.append(mock.Mock(content_type="application/json"))
+                blobs[-1].name = name
+        return blobs
+
+    def bucket(bucket_name: str) -> mock.Mock:
+        bucket = mock.Mock()
+        bucket.blob.side_effect = lambda name: mock.Mock(
+            download_as_bytes=mock.Mock(return_value=json.dumps(SHARDS[name]).encode())
+        )
+        return bucket
+
+    client.list_blobs.side_effect = list_blobs
+    client.bucket.side_effect = bucket
+    return client
+
+
+def test_collect_documents() -> None:
+    storage_client = fake_storage_client()
+    operation = FakeOperation()
+
+    with mock.patch.object(
+        batch_output_collector, "_get_storage_client", return_value=storage_client
+    ):
+        documents = dict(
+            batch_output_collector.collect_documents(
+                operation,
+                field_mask="text,pages.page_number",
+                poll_interval=0.01,
+                storage_client=storage_client,
+                executor=ThreadPoolExecutor(),
+            )
+        )
+
+    assert sorted(documents) == [f"gs://bucket/{name}" for name in SHARDS]
+    assert storage_client.list_blobs.call_count == 2
+    document = documents["gs://bucket/output/1/1/doc-0.json"]
+    assert document.text == "third"
+    assert document.pages[0].page_number == 1
+    # Fields outside of the field mask aren't parsed.
+    assert not document.entities
+    assert not document.pages[0].dimension
+
+
+def test_parse_field_mask() -> None:
+    assert batch_output_collector.parse_field_mask(
+        "text, pages.page_number, pages.dimension.width, entities"
+    ) == {
+        "text": None,
+        "pages": {"pageNumber": None, "dimension": {"width": None}},
+        "entities": None,
+    }
+    assert batch_output_collector.parse_field_mask("pages.pageNumber,pages") == {
+        "pages": None
+    }
@@ -0,0 +1,114 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Compares layout_to_text() and DocumentView on a synthetic OCR response.
+
+python document_view_benchmark.py --pages 500 --tokens-per-page 400
+"""
+
+import random
+import time
+from typing import Callable
+
+from google.cloud import documentai
+
+from document_view import DocumentView, LEVELS
+from handle_response_sample import layout_to_text
+
+# The number of tokens of each element of the levels above tokens.
+TOKENS_PER_ELEMENT = {"blocks": 80, "paragraphs": 20, "lines": 8}
+
+
+def synthetic_document(pages: int, tokens_per_page: int) -> documentai.Document:
+    random.seed(0)
+    words = ["Document", "AI", "résumé", "naïve", "invoice", "total", "€42", "日本"]
+    pb = documentai.Document.pb()()
+    text = []
+    offset = 0
+    for _ in range(pages):
+        page = pb.pages.add()
+        token_spans = []
+        for _ in range(tokens_per_page):
+            word = random.choice(words) + " "
+            token = page.tokens.add()
+            token.layout.text_anchor.text_segments.add(
+                start_index=offset, end_index=offset + len(word)
+            )
+            for i, char in enumerate(word):
+                symbol = page.symbols.add()
+                symbol.layout.text_anchor.text_segments.add(
+                    start_index=offset + i, end_index=offset + i + 1
+                )
+            token_spans.append((offset, offset + len(word)))
+            text.append(word)
+            offset += len(word)
+        for level, size in TOKENS_PER_ELEMENT.items():
+            for first in range(0, tokens_per_page, size):
+                spans = token_spans[first : first + size]
+                element = getattr(page, level).add()
+                # Elements spanning several lines have several text segments.
+                middle = len(spans) // 2
+                for part in (spans[:middle], spans[middle:]):
+                    if part:
+                        element.layout.text_anchor.text_segments.add(
+                            start_index=part[0][0], end_index=part[-1][1]
+                        )
+    pb.text = "".join(text)
+    return documentai.Document.wrap(pb)
+
+
+def per_element_texts(document: documentai.Document) -> dict[str, list[str]]:
+    # The current path, through layout_to_text() for every element.
+    text = document.text
+    return {
+        level: [
+            layout_to_text(element.layout, text)
+            for page in document.pages
+            for element in getattr(page, level)
+        ]
+        for level in LEVELS
+    }
+
+
+def document_view_texts(document: documentai.Document) -> dict[str, list[str]]:
+    view = DocumentView(document)
+    return {level: view.texts(level) for level in LEVELS}
+
+
+def benchmark(
+    name: str,
+    get_texts: Callable[[documentai.Document], dict[str, list[str]]],
+    document: documentai.Document,
+) -> dict[str, list[str]]:
+    start = time.perf_counter()
+    texts = get_texts(document)
+    elapsed = time.perf_counter() - start
+    num_elements = sum(len(level_texts) for level_texts in texts.values())
+    print(f"{name:<14} {num_elements} elements in {elapsed:.3f}s")
+    return texts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--tokens-per-page", type=int, default=400)
+    args = parser.parse_args()
+
+    document = synthetic_document(args.pages, args.tokens_per_page)
+    expected = benchmark("layout_to_text", per_element_texts, document)
+    texts = benchmark("DocumentView", document_view_texts, document)
+    assert texts == expected
@@ -0,0 +1,75 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from documentai.snippets import document_view
+from documentai.snippets import handle_response_sample
+from google.cloud import documentai
+
+
+def layout(*segments: tuple[int, int]) -> dict:
+    return {
+        "text_anchor": {
+            "text_segments": [
+                {"start_index": start, "end_index": end} for start, end in segments
+            ]
+        }
+    }
+
+
+def test_document_view() -> None:
+    document = documentai.Document(
+        text="Naïve café\nrésumé €42\nPage two\n",
+        pages=[
+            {
+                # The first line is split over two segments.
+                "lines": [
+                    {"layout": layout((0, 6), (6, 11))},
+                    {"layout": layout((11, 22))},
+                ],
+                "tokens": [
+                    {"layout": layout((0, 6))},
+                    {"layout": layout((6, 11))},
+                    {"layout": layout((11, 18))},
+                    {"layout": layout((18, 22))},
+                ],
+            },
+            {
+                "lines": [{"layout": layout((22, 31))}],
+                "tokens": [{"layout": layout((22, 27))}, {"layout": layout((27, 31))}],
+            },
+        ],
+    )
+    view = document_view.DocumentView(document)
+
+    for level in ("lines", "tokens"):
+        expected = [
+            handle_response_sample.layout_to_text(element.layout, document.text)
+            for page in document.pages
+            for element in getattr(page, level)
+        ]
+        assert view.texts(level) == expected
+        assert [view.text_of(level, i) for i in range(len(expected))] == expected
+
+    assert view.texts("lines") == ["Naïve café\n", "résumé €42\n", "Page two\n"]
+    assert view.texts("tokens", page=1) == ["Page ", "two\n"]
+    assert view.texts("blocks") == []
+    assert view.num_elements("tokens") == 6
+    assert view.num_elements("tokens", page=0) == 4
+    assert view.page_elements("tokens", 1) == range(4, 6)
+    assert view.page_of("tokens", 3) == 0
+    assert view.page_of("tokens", 4) == 1
+    assert view.element_at("tokens", 8) == 1
+    assert view.element_at("lines", 8) == 0
+    assert view.element_at("lines", 40) is None
@@ -15,50 +15,111 @@
 # [START bigtable_functions_quickstart_asyncio]
 import asyncio
 
-import functions_framework
+import functions_framework.aio
 from google.cloud.bigtable.data import BigtableDataClientAsync, ReadRowsQuery, RowRange
-
-event_loop = asyncio.new_event_loop()
-asyncio.set_event_loop(event_loop)
-
-
-# Setup: create a shared client within the context of the event loop
-async def create_client():
-    # create client in the asyncio event loop context to
-    # give background tasks a chance to initialize
-    return BigtableDataClientAsync()
-
-
-client = event_loop.run_until_complete(create_client())
-
-
-# Actual cloud functions entrypoint, will delegate to the async one
-@functions_framework.http
-def bigtable_read_data(request):
-    return event_loop.run_until_complete(_bigtable_read_data_async(request))
-
-
-# Actual handler
-async def _bigtable_read_data_async(request):
-    async with client.get_table(
-        request.headers.get("instance_id"), request.headers.get("table_id")
-    ) as table:
-
-        prefix = "phone#"
-        end_key = prefix[:-1] + chr(ord(prefix[-1]) + 1)
-
-        outputs = []
-        query = ReadRowsQuery(row_ranges=[RowRange(start_key=prefix, end_key=end_key)])
-
-        async for row in await table.read_rows_stream(query):
-            print("%s" % row)
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+MAX_SHARDS = 16
+# Rows buffered for each shard while the previous shards are being sent
+SHARD_PREFETCH_ROWS = 1000
+
+# Shared client, created on the first request in the server's event loop so
+# its background tasks run there. All the concurrent requests then use it.
+client = None
+
+
+def get_client():
+    global client
+    if client is None:
+        client = BigtableDataClientAsync()
+    return client
+
+
+# Actual cloud functions entrypoint, served by an ASGI server
+@functions_framework.aio.http
+async def bigtable_read_data(request):
+    prefix = "phone#"
+    end_key = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    try:
+        shards = min(max(int(request.headers.get("shards", 1)), 1), MAX_SHARDS)
+    except ValueError:
+        return PlainTextResponse("shards must be an integer", status_code=400)
+
+    lines = _read_lines(
+        request.headers.get("instance_id"),
+        request.headers.get("table_id"),
+        prefix,
+        end_key,
+        shards,
+    )
+    # Rows are sent as they are read, instead of holding the result in memory.
+    return StreamingResponse(lines, media_type="text/plain")
+
+
+async def _read_lines(instance_id, table_id, start_key, end_key, shards):
+    async with get_client().get_table(instance_id, table_id) as table:
+        row_ranges = await _split_row_range(table, start_key, end_key, shards)
+
+        separator = ""
+        async for row in _read_rows(table, row_ranges):
             output = "Rowkey: {}, os_build: {}".format(
                 row.row_key.decode("utf-8"),
                 row.get_cells("stats_summary", b"os_build")[0].value.decode("utf-8"),
             )
-            outputs.append(output)
-
-        return "\n".join(outputs)
+            yield separator + output
+            separator = "\n"
+
+
+async def _split_row_range(table, start_key, end_key, shards):
+    """Splits a row range into up to `shards` ranges of similar sizes,
+    using the row key samples of the table.
+    """
+    if shards == 1:
+        return [RowRange(start_key=start_key, end_key=end_key)]
+
+    start, end = start_key.encode("utf-8"), end_key.encode("utf-8")
+    keys = [key for key, _ in await table.sample_row_keys() if start < key < end]
+    splits = sorted(
+        {keys[len(keys) * i // shards] for i in range(1, shards)} if keys else set()
+    )
+
+    bounds = [start, *splits, end]
+    return [RowRange(start_key=a, end_key=b) for a, b in zip(bounds, bounds[1:])]
+
+
+async def _read_rows(table, row_ranges):
+    """Scans the row ranges concurrently and yields their rows in key order."""
+    if len(row_ranges) == 1:
+        async for row in await table.read_rows_stream(
+            ReadRowsQuery(row_ranges=row_ranges)
+        ):
+            yield row
+        return
+
+    queues = [asyncio.Queue(maxsize=SHARD_PREFETCH_ROWS) for _ in row_ranges]
+
+    async def scan(row_range, queue):
+        try:
+            query = ReadRowsQuery(row_ranges=[row_range])
+            async for row in await table.read_rows_stream(query):
+                await queue.put(row)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(None)
+
+    tasks = [asyncio.create_task(scan(r, q)) for r, q in zip(row_ranges, queues)]
+    try:
+        for queue in queues:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        # Stop the scans if the client disconnects or a scan fails.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 
 # [END bigtable_functions_quickstart_asyncio]
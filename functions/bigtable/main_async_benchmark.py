@@ -0,0 +1,142 @@
+# Copyright 2024 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the 'License');
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an 'AS IS' BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Load benchmark of main_async.py against the Bigtable emulator.
+
+It compares the previous handler, which served requests one at a time and
+built the whole response, with serving concurrent streaming requests.
+
+    gcloud beta emulators bigtable start --host-port=localhost:8086 &
+    export BIGTABLE_EMULATOR_HOST=localhost:8086
+    python main_async_benchmark.py --rows 50000 --requests 32 --shards 4
+"""
+
+import argparse
+import asyncio
+from collections.abc import Awaitable
+import contextlib
+import os
+import statistics
+import time
+from typing import TypeVar
+
+from google.cloud import bigtable
+from google.cloud.bigtable.data import ReadRowsQuery, RowRange
+from requests import Request
+
+import main_async
+
+PROJECT = "benchmark-project"
+INSTANCE = "benchmark-instance"
+TABLE = "mobile-time-series"
+
+T = TypeVar("T")
+
+
+def create_table(rows: int) -> None:
+    client = bigtable.Client(project=PROJECT, admin=True)
+    table = client.instance(INSTANCE).table(TABLE)
+    if table.exists():
+        table.delete()
+    table.create(column_families={"stats_summary": None})
+
+    batcher = table.mutations_batcher()
+    for i in range(rows):
+        row = table.direct_row(f"phone#{i:08x}#20190501")
+        row.set_cell("stats_summary", "os_build", f"PQ2A.190405.{i % 1000:03d}")
+        batcher.mutate(row)
+    batcher.flush()
+
+
+async def read_whole_response(request: Request) -> str:
+    # A copy of the previous handler, which returned the whole response at once.
+    async with main_async.get_client().get_table(
+        request.headers.get("instance_id"), request.headers.get("table_id")
+    ) as table:
+
+        prefix = "phone#"
+        end_key = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+        outputs = []
+        query = ReadRowsQuery(row_ranges=[RowRange(start_key=prefix, end_key=end_key)])
+
+        async for row in await table.read_rows_stream(query):
+            print("%s" % row)
+            output = "Rowkey: {}, os_build: {}".format(
+                row.row_key.decode("utf-8"),
+                row.get_cells("stats_summary", b"os_build")[0].value.decode("utf-8"),
+            )
+            outputs.append(output)
+
+        return "\n".join(outputs)
+
+
+async def read_streaming_response(request: Request) -> float:
+    start = time.perf_counter()
+    first_byte = None
+    response = await main_async.bigtable_read_data(request)
+    async for _ in response.body_iterator:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+    return first_byte
+
+
+async def timed(coroutine: Awaitable[T]) -> tuple[float, T]:
+    start = time.perf_counter()
+    result = await coroutine
+    return time.perf_counter() - start, result
+
+
+def report(name: str, elapsed: float, latencies: list[float]) -> None:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(
+        f"{name:<12} {len(latencies) / elapsed:8.2f} req/s  "
+        f"p50={statistics.median(latencies):.3f}s  p95={p95:.3f}s"
+    )
+
+
+async def run_benchmark(requests: int, shards: int) -> None:
+    headers = {"instance_id": INSTANCE, "table_id": TABLE}
+
+    start = time.perf_counter()
+    latencies = []
+    # The previous handler printed every row, which is discarded here.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(requests):
+            request = Request("GET", headers=headers)
+            latency, _ = await timed(read_whole_response(request))
+            latencies.append(latency)
+    report("sequential", time.perf_counter() - start, latencies)
+
+    headers["shards"] = str(shards)
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            timed(read_streaming_response(Request("GET", headers=headers)))
+            for _ in range(requests)
+        ]
+    )
+    report("concurrent", time.perf_counter() - start, [r[0] for r in results])
+    print(f"{'':<12} first byte p50={statistics.median(r[1] for r in results):.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args()
+
+    create_table(args.rows)
+    asyncio.run(run_benchmark(args.requests, args.shards))
@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import datetime
 import os
 import uuid
 
 from google.cloud import bigtable
+from google.cloud.bigtable.data import RowRange
 import pytest
 from requests import Request
 
@@ -55,15 +57,63 @@ def table_id():
     table.delete()
 
 
-def test_main(table_id):
+async def read_response(request):
+    main_async.client = None  # The client belongs to the test's event loop
+    response = await main_async.bigtable_read_data(request)
+    return "".join([line async for line in response.body_iterator])
+
+
+@pytest.mark.parametrize("shards", ["1", "4"])
+def test_main(table_id, shards):
     request = Request(
-        "GET", headers={"instance_id": BIGTABLE_INSTANCE, "table_id": table_id}
+        "GET",
+        headers={
+            "instance_id": BIGTABLE_INSTANCE,
+            "table_id": table_id,
+            "shards": shards,
+        },
     )
 
-    response = main_async.bigtable_read_data(request)
+    response = asyncio.run(read_response(request))
+
+    assert """Rowkey: phone#4c410523#20190501, os_build: PQ2A.190405.003
+Rowkey: phone#4c410523#20190502, os_build: PQ2A.190405.004""" in response
+
 
-    assert (
-        """Rowkey: phone#4c410523#20190501, os_build: PQ2A.190405.003
-Rowkey: phone#4c410523#20190502, os_build: PQ2A.190405.004"""
-        in response
+def test_invalid_shards(table_id):
+    request = Request(
+        "GET",
+        headers={
+            "instance_id": BIGTABLE_INSTANCE,
+            "table_id": table_id,
+            "shards": "many",
+        },
     )
+
+    response = asyncio.run(main_async.bigtable_read_data(request))
+
+    assert response.status_code == 400
+
+
+class FakeTable:
+    async def read_rows_stream(self, query):
+        async def rows():
+            for i in range(main_async.SHARD_PREFETCH_ROWS * 2):
+                yield i
+
+        return rows()
+
+
+def test_read_rows_stops_scans():
+    async def read_first_row():
+        row_ranges = [RowRange(start_key=b"a", end_key=b"b")] * 2
+        rows = main_async._read_rows(FakeTable(), row_ranges)
+        row = await rows.__anext__()
+        await rows.aclose()
+        return row, asyncio.all_tasks() - {asyncio.current_task()}
+
+    row, pending = asyncio.run(read_first_row())
+
+    assert row == 0
+    # The scans are over once the rows are closed.
+    assert not pending
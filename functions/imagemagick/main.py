@@ -17,11 +17,15 @@
 import os
 import tempfile
 
+from google.api_core import exceptions
 from google.cloud import storage, vision
 from wand.image import Image
 
 storage_client = storage.Client()
 vision_client = vision.ImageAnnotatorClient()
+
+# Images larger than this are processed on disk instead of in memory.
+IN_MEMORY_MAX_BYTES = int(os.getenv("IN_MEMORY_MAX_BYTES", 32 * 1024 * 1024))
 # [END functions_imagemagick_setup]
 
 
@@ -33,7 +37,7 @@ def blur_offensive_images(data, context):
     file_name = file_data["name"]
     bucket_name = file_data["bucket"]
 
-    blob = storage_client.bucket(bucket_name).get_blob(file_name)
+    blob = storage_client.bucket(bucket_name).blob(file_name)
     blob_uri = f"gs://{bucket_name}/{file_name}"
     blob_source = vision.Image(source=vision.ImageSource(gcs_image_uri=blob_uri))
 
@@ -62,27 +66,69 @@ def blur_offensive_images(data, context):
 # Blurs the given file using ImageMagick.
 def __blur_image(current_blob):
     file_name = current_blob.name
-    _, temp_local_filename = tempfile.mkstemp()
+
+    # Get the size of the image, unless it was deleted since it was uploaded.
+    try:
+        current_blob.reload()
+    except exceptions.NotFound:
+        print(f"The image {file_name} no longer exists.")
+        return
+
+    # Upload result to a second bucket, to avoid re-triggering the function.
+    # You could instead re-upload it to the same bucket + tell your function
+    # to ignore files marked as blurred (e.g. those with a "blurred" prefix)
+    blur_bucket_name = os.getenv("BLURRED_BUCKET_NAME")
+    blur_bucket = storage_client.bucket(blur_bucket_name)
+    new_blob = blur_bucket.blob(file_name)
+
+    # Small images are processed in memory, which avoids copies on the
+    # function's in-memory file system.
+    if current_blob.size is not None and current_blob.size <= IN_MEMORY_MAX_BYTES:
+        __blur_image_in_memory(current_blob, new_blob)
+    else:
+        __blur_image_on_disk(current_blob, new_blob)
+
+    print(f"Blurred image uploaded to: gs://{blur_bucket_name}/{file_name}")
+
+
+def __blur(image):
+    image.resize(*image.size, blur=16, filter="hamming")
+
+
+def __blur_image_in_memory(current_blob, new_blob):
+    file_name = current_blob.name
 
     # Download file from bucket.
+    image_data = current_blob.download_as_bytes()
+    print(f"Image {file_name} was downloaded to memory.")
+
+    # Blur the image using ImageMagick.
+    with Image(blob=image_data) as image:
+        __blur(image)
+        image_data = image.make_blob()
+
+    print(f"Image {file_name} was blurred.")
+
+    new_blob.upload_from_string(image_data, content_type=current_blob.content_type)
+
+
+def __blur_image_on_disk(current_blob, new_blob):
+    file_name = current_blob.name
+    _, temp_local_filename = tempfile.mkstemp()
+
+    # Download file from bucket, in chunks.
     current_blob.download_to_filename(temp_local_filename)
     print(f"Image {file_name} was downloaded to {temp_local_filename}.")
 
     # Blur the image using ImageMagick.
     with Image(filename=temp_local_filename) as image:
-        image.resize(*image.size, blur=16, filter="hamming")
+        __blur(image)
         image.save(filename=temp_local_filename)
 
     print(f"Image {file_name} was blurred.")
 
-    # Upload result to a second bucket, to avoid re-triggering the function.
-    # You could instead re-upload it to the same bucket + tell your function
-    # to ignore files marked as blurred (e.g. those with a "blurred" prefix)
-    blur_bucket_name = os.getenv("BLURRED_BUCKET_NAME")
-    blur_bucket = storage_client.bucket(blur_bucket_name)
-    new_blob = blur_bucket.blob(file_name)
+    # Upload the file, in chunks.
     new_blob.upload_from_filename(temp_local_filename)
-    print(f"Blurred image uploaded to: gs://{blur_bucket_name}/{file_name}")
 
     # Delete the temporary file.
     os.remove(temp_local_filename)
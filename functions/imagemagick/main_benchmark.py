@@ -0,0 +1,105 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares blurring images in memory and on disk.
+
+Each run blurs a synthetic JPEG in a separate process, with a fake Cloud
+Storage blob, and reports its latency and the peak RSS of the process.
+On a tmpfs, the temporary file of the on-disk path also uses memory, which
+is not included in the RSS. Run it with the temporary directory on a tmpfs,
+like in Cloud Functions:
+
+    TMPDIR=/dev/shm python main_benchmark.py --width 4000 --height 3000
+"""
+
+import argparse
+import multiprocessing
+import multiprocessing.queues
+import resource
+import time
+from typing import Optional
+from unittest import mock
+
+from wand.image import Image
+
+
+class FakeBlob:
+    def __init__(self, name: str, data: bytes = b"") -> None:
+        self.name = name
+        self.data = data
+        self.size = len(data)
+        self.content_type = "image/jpeg"
+
+    def download_as_bytes(self) -> bytes:
+        return self.data
+
+    def download_to_filename(self, filename: str) -> None:
+        with open(filename, "wb") as f:
+            f.write(self.data)
+
+    def upload_from_string(
+        self, data: bytes, content_type: Optional[str] = None
+    ) -> None:
+        self.data = data
+
+    def upload_from_filename(self, filename: str) -> None:
+        # Like the client library, read the file in chunks.
+        with open(filename, "rb") as f:
+            while f.read(8 * 1024 * 1024):
+                pass
+
+
+def synthetic_image(width: int, height: int) -> bytes:
+    with Image(width=width, height=height, pseudo="plasma:") as image:
+        image.format = "jpeg"
+        return image.make_blob()
+
+
+def blur(in_memory: bool, data: bytes, results: multiprocessing.queues.Queue) -> None:
+    # The clients are not used with the fake blobs.
+    with mock.patch("google.cloud.storage.Client"), mock.patch(
+        "google.cloud.vision.ImageAnnotatorClient"
+    ):
+        import main
+
+    main.IN_MEMORY_MAX_BYTES = len(data) if in_memory else 0
+    main.storage_client.bucket.return_value.blob.return_value = FakeBlob("blurred")
+
+    start = time.perf_counter()
+    main.__blur_image(FakeBlob("image.jpg", data))
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((elapsed, peak_rss))
+
+
+def benchmark(name: str, in_memory: bool, data: bytes) -> None:
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=blur, args=(in_memory, data, results))
+    process.start()
+    elapsed, peak_rss = results.get()
+    process.join()
+    print(f"{name:<10} {elapsed:7.3f}s  peak RSS {peak_rss:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    data = synthetic_image(args.width, args.height)
+    print(f"{args.width}x{args.height} JPEG, {len(data) / 2**20:.1f} MiB")
+    benchmark("in memory", True, data)
+    benchmark("on disk", False, data)
@@ -16,6 +16,8 @@ from collections import UserDict
 from unittest.mock import MagicMock, patch
 import uuid
 
+from google.api_core import exceptions
+
 import main
 
 
@@ -80,6 +82,8 @@ def test_blur_image(storage_client, image_mock, os_mock, capsys):
 
     blob = UserDict()
     blob.name = filename
+    blob.size = main.IN_MEMORY_MAX_BYTES + 1
+    blob.reload = MagicMock()
     blob.bucket = UserDict()
     blob.download_to_filename = MagicMock()
     blob.upload_from_filename = MagicMock()
@@ -93,3 +97,56 @@ def test_blur_image(storage_client, image_mock, os_mock, capsys):
     assert f"Blurred image uploaded to: gs://{blur_bucket}/{filename}" in out
     assert os_mock.remove.called
     assert image_mock.resize.called
+
+
+@patch("main.os")
+@patch("main.Image")
+@patch("main.storage_client")
+def test_blur_image_in_memory(storage_client, image_mock, os_mock, capsys):
+    filename = str(uuid.uuid4())
+    blur_bucket = "blurred-bucket-" + str(uuid.uuid4())
+
+    os_mock.getenv = MagicMock(return_value=blur_bucket)
+
+    image_mock.return_value = image_mock
+    image_mock.__enter__.return_value = image_mock
+    image_mock.make_blob = MagicMock(return_value=b"blurred")
+
+    blob = UserDict()
+    blob.name = filename
+    blob.size = 1024
+    blob.reload = MagicMock()
+    blob.content_type = "image/jpeg"
+    blob.download_as_bytes = MagicMock(return_value=b"image")
+
+    main.__blur_image(blob)
+
+    out, _ = capsys.readouterr()
+
+    assert f"Image {filename} was downloaded to memory." in out
+    assert f"Image {filename} was blurred." in out
+    assert f"Blurred image uploaded to: gs://{blur_bucket}/{filename}" in out
+    image_mock.assert_called_with(blob=b"image")
+    assert image_mock.resize.called
+    new_blob = storage_client.bucket(blur_bucket).blob(filename)
+    new_blob.upload_from_string.assert_called_with(
+        b"blurred", content_type="image/jpeg"
+    )
+    assert not os_mock.remove.called
+
+
+@patch("main.Image")
+@patch("main.storage_client")
+def test_blur_deleted_image(storage_client, image_mock, capsys):
+    filename = str(uuid.uuid4())
+
+    blob = UserDict()
+    blob.name = filename
+    blob.reload = MagicMock(side_effect=exceptions.NotFound(""))
+
+    main.__blur_image(blob)
+
+    out, _ = capsys.readouterr()
+
+    assert f"The image {filename} no longer exists." in out
+    assert not image_mock.called
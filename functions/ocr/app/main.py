@@ -14,10 +14,13 @@
 
 # [START functions_ocr_setup]
 import base64
+import concurrent.futures
 import json
 import os
-from typing import Dict, TypeVar
+import threading
+from typing import Dict, List, Optional, Tuple, TypeVar
 
+from google.api_core import exceptions
 from google.cloud import pubsub_v1
 from google.cloud import storage
 from google.cloud import translate_v2 as translate
@@ -25,15 +28,56 @@ from google.cloud import vision
 
 vision_client = vision.ImageAnnotatorClient()
 translate_client = translate.Client()
-publisher = pubsub_v1.PublisherClient()
+# Messages published within 50ms are sent together.
+publisher = pubsub_v1.PublisherClient(
+    batch_settings=pubsub_v1.types.BatchSettings(
+        max_messages=100, max_bytes=1024 * 1024, max_latency=0.05
+    )
+)
 storage_client = storage.Client()
 
 project_id = os.environ["GCP_PROJECT"]
 # [END functions_ocr_setup]
 
+# If set, texts to translate are collected for this many seconds, then
+# translated with a single Translation API call per language pair.
+TRANSLATE_BATCH_WINDOW = float(os.environ.get("TRANSLATE_BATCH_WINDOW", "0"))
+# Maximum number of texts per Translation API call.
+TRANSLATE_BATCH_SIZE = 128
+
 
 # [START functions_ocr_detect]
-def detect_text(bucket: str, filename: str) -> None:
+# Published texts are recorded in RESULT_BUCKET under this prefix.
+CACHE_PREFIX = os.environ.get("CACHE_PREFIX", "ocr-cache")
+
+
+def _cache_blob(bucket: str, filename: str, generation: str) -> storage.Blob:
+    """Returns the object recording the text published for an image generation."""
+    result_bucket = storage_client.bucket(os.environ["RESULT_BUCKET"])
+    return result_bucket.blob(f"{CACHE_PREFIX}/{bucket}/{filename}#{generation}.json")
+
+
+def _get_cached_detection(
+    bucket: str, filename: str, generation: Optional[str]
+) -> Optional[dict]:
+    if not generation:
+        return None
+    try:
+        blob = _cache_blob(bucket, filename, generation)
+        return json.loads(blob.download_as_bytes())
+    except exceptions.NotFound:
+        return None
+
+
+def _cache_detection(
+    bucket: str, filename: str, generation: Optional[str], detection: dict
+) -> None:
+    if generation:
+        blob = _cache_blob(bucket, filename, generation)
+        blob.upload_from_string(json.dumps(detection), content_type="application/json")
+
+
+def detect_text(bucket: str, filename: str, generation: Optional[str] = None) -> None:
     """
     Extract the text from an image uploaded to Cloud Storage.
 
@@ -44,6 +88,9 @@ def detect_text(bucket: str, filename: str) -> None:
     Args:
         bucket: name of GCS bucket in which the file is stored.
         filename: name of the file to be read.
+        generation: generation of the file. If set, the published text is
+            recorded, so retried events for the same generation don't call
+            the Vision and Translation APIs, nor publish the text again.
 
     Returns:
         None; the output is written to stdout and Stackdriver Logging.
@@ -52,6 +99,11 @@ def detect_text(bucket: str, filename: str) -> None:
 
     futures = []
 
+    detection = _get_cached_detection(bucket, filename, generation)
+    if detection and detection.get("published"):
+        print(f"Text for image generation {generation} already published.")
+        return
+
     image = vision.Image(
         source=vision.ImageSource(gcs_image_uri=f"gs://{bucket}/{filename}")
     )
@@ -86,6 +138,11 @@ def detect_text(bucket: str, filename: str) -> None:
     for future in futures:
         future.result()
 
+    # Retried events for this generation are now acknowledged without
+    # publishing the text again.
+    detection = {"text": text, "src_lang": src_lang, "published": True}
+    _cache_detection(bucket, filename, generation, detection)
+
 
 # [END functions_ocr_detect]
 
@@ -134,7 +191,7 @@ def process_image(file_info: dict, context: dict) -> None:
     bucket = validate_message(file_info, "bucket")
     name = validate_message(file_info, "name")
 
-    detect_text(bucket, name)
+    detect_text(bucket, name, file_info.get("generation"))
 
     print("File {} processed.".format(file_info["name"]))
 
@@ -142,6 +199,57 @@ def process_image(file_info: dict, context: dict) -> None:
 # [END functions_ocr_process]
 
 
+class TranslationBatcher:
+    """Collects the texts to translate for a short window of time, then
+    translates them with one Translation API call per language pair.
+
+    Texts are only batched across the events processed concurrently by an
+    instance, so this is only useful with concurrency enabled.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending: Dict[
+            Tuple[str, str], List[Tuple[str, concurrent.futures.Future]]
+        ] = {}
+        self._timer: Optional[threading.Timer] = None
+
+    def translate(self, text: str, target_lang: str, src_lang: str) -> str:
+        """Returns the translated text, once its batch has been translated."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._pending.setdefault((src_lang, target_lang), []).append((text, future))
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return future.result()
+
+    def flush(self) -> None:
+        """Translates all the pending texts."""
+        with self._lock:
+            pending, self._pending, self._timer = self._pending, {}, None
+        for (src_lang, target_lang), items in pending.items():
+            for i in range(0, len(items), TRANSLATE_BATCH_SIZE):
+                batch = items[i : i + TRANSLATE_BATCH_SIZE]
+                try:
+                    results = translate_client.translate(
+                        [text for text, _ in batch],
+                        target_language=target_lang,
+                        source_language=src_lang,
+                    )
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result["translatedText"])
+
+
+translation_batcher = TranslationBatcher(TRANSLATE_BATCH_WINDOW)
+
+
 # [START functions_ocr_translate]
 def translate_text(event: dict, context: dict) -> None:
     """
@@ -171,12 +279,15 @@ def translate_text(event: dict, context: dict) -> None:
     src_lang = validate_message(message, "src_lang")
 
     print(f"Translating text into {target_lang}.")
-    translated_text = translate_client.translate(
-        text, target_language=target_lang, source_language=src_lang
-    )
+    if TRANSLATE_BATCH_WINDOW > 0:
+        translated_text = translation_batcher.translate(text, target_lang, src_lang)
+    else:
+        translated_text = translate_client.translate(
+            text, target_language=target_lang, source_language=src_lang
+        )["translatedText"]
     topic_name = os.environ["RESULT_TOPIC"]
     message = {
-        "text": translated_text["translatedText"],
+        "text": translated_text,
         "filename": filename,
         "lang": target_lang,
     }
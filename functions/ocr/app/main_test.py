@@ -18,6 +18,8 @@ import json
 
 from unittest import mock
 
+from google.api_core import exceptions
+
 import main
 
 # flake8: noqa
@@ -44,6 +46,51 @@ class TestGCFPyOCRSample:
 
         main.detect_text("sample-bucket", "sample-file")
 
+    @mock.patch.object(main, "storage_client")
+    @mock.patch.object(main, "publisher")
+    @mock.patch.object(main, "translate_client")
+    @mock.patch.object(main, "vision_client")
+    def test_detect_text_cache(
+        self, mock_vision_client, mock_translate_client, mock_publisher, mock_storage
+    ):
+        blob = mock_storage.bucket.return_value.blob.return_value
+        mock_future = concurrent.futures.Future()
+        mock_future.set_result(True)
+        mock_publisher.publish.return_value = mock_future
+
+        # The first event for a generation detects the text, publishes it, and
+        # records it once published.
+        blob.download_as_bytes.side_effect = exceptions.NotFound("")
+        mock_annotation = mock.MagicMock()
+        mock_annotation.description = "sample text"
+        mock_vision_client.text_detection.return_value.text_annotations = [
+            mock_annotation
+        ]
+        mock_translate_client.detect_language.return_value = {"language": "en"}
+        main.detect_text("sample-bucket", "sample-file", "1")
+        mock_storage.bucket.return_value.blob.assert_called_with(
+            "ocr-cache/sample-bucket/sample-file#1.json"
+        )
+        assert mock_publisher.publish.called
+        blob.upload_from_string.assert_called_once()
+        cached = blob.upload_from_string.call_args[0][0]
+        assert json.loads(cached) == {
+            "text": "sample text",
+            "src_lang": "en",
+            "published": True,
+        }
+
+        # Retried events are ignored, without any API call.
+        mock_vision_client.reset_mock()
+        mock_translate_client.reset_mock()
+        mock_publisher.reset_mock()
+        blob.download_as_bytes.side_effect = None
+        blob.download_as_bytes.return_value = cached.encode()
+        main.detect_text("sample-bucket", "sample-file", "1")
+        mock_vision_client.text_detection.assert_not_called()
+        mock_translate_client.detect_language.assert_not_called()
+        mock_publisher.publish.assert_not_called()
+
     @mock.patch.object(main, "detect_text")
     def test_process_image(self, m):
         m.return_value = None
@@ -92,3 +139,22 @@ class TestGCFPyOCRSample:
         event = {"data": data}
         context = {}
         main.save_result(event, context)
+
+    @mock.patch.object(main, "translate_client")
+    def test_translation_batcher(self, mock_translate_client):
+        mock_translate_client.translate.side_effect = (
+            lambda texts, target_language, source_language: [
+                {"translatedText": f"{text}-{target_language}"} for text in texts
+            ]
+        )
+        batcher = main.TranslationBatcher(window=0.1)
+        requests = [("a", "es"), ("b", "es"), ("c", "fr")]
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            results = list(
+                executor.map(
+                    lambda request: batcher.translate(request[0], request[1], "en"),
+                    requests,
+                )
+            )
+        assert results == ["a-es", "b-es", "c-fr"]
+        assert mock_translate_client.translate.call_count == 2
@@ -13,18 +13,114 @@
 # limitations under the License.
 
 # [START functions_response_streaming]
+import io
+import json
+import time
+
 from flask import Response, stream_with_context
 
 import functions_framework
 from google.cloud import bigquery
+from google.cloud import bigquery_storage
+import pyarrow
+import pyarrow.csv
 
 # Construct a BigQuery client object.
 client = bigquery.Client()
+# Construct a BigQuery Storage client object, to read results as Arrow batches.
+bqstorage_client = bigquery_storage.BigQueryReadClient()
+
+# Target size of the response chunks in the columnar formats.
+CHUNK_SIZE = 1024 * 1024
+
+
+def encode_ndjson(batches):
+    """Encodes record batches as newline-delimited JSON."""
+    for batch in batches:
+        lines = [json.dumps(row, default=str) + "\n" for row in batch.to_pylist()]
+        yield "".join(lines).encode()
+
+
+def encode_csv(batches):
+    """Encodes record batches as CSV, with a header line."""
+    include_header = True
+    for batch in batches:
+        sink = io.BytesIO()
+        options = pyarrow.csv.WriteOptions(include_header=include_header)
+        pyarrow.csv.write_csv(batch, sink, options)
+        include_header = False
+        yield sink.getvalue()
+
+
+def encode_arrow(batches):
+    """Encodes record batches in the Arrow IPC streaming format."""
+    sink = io.BytesIO()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pyarrow.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+# Columnar formats, chosen by the Accept header of the request.
+ENCODERS = {
+    "application/x-ndjson": encode_ndjson,
+    "text/csv": encode_csv,
+    "application/vnd.apache.arrow.stream": encode_arrow,
+}
+
+
+def coalesce(chunks, chunk_size):
+    """Merges small chunks into chunks of at least `chunk_size` bytes."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def log_metrics(chunks, mimetype, start_time):
+    """Logs the time to first byte and the throughput of the response.
+
+    WSGI servers can't send HTTP trailers, so the metrics are written as a
+    structured log entry once the response has been sent.
+    """
+    time_to_first_byte = None
+    total_bytes = 0
+    for chunk in chunks:
+        if time_to_first_byte is None:
+            time_to_first_byte = time.monotonic() - start_time
+        total_bytes += len(chunk)
+        yield chunk
+    elapsed = time.monotonic() - start_time
+    entry = {
+        "severity": "INFO",
+        "message": f"Streamed {total_bytes} bytes of {mimetype}",
+        "time_to_first_byte_sec": time_to_first_byte,
+        "elapsed_sec": elapsed,
+        "bytes_per_sec": total_bytes / elapsed if elapsed else None,
+    }
+    print(json.dumps(entry))
 
 
 @functions_framework.http
 def stream_big_query_output(request):
     """HTTP Cloud Function.
+
+    Large results can be streamed in a columnar format with an Accept header
+    of application/x-ndjson, text/csv or application/vnd.apache.arrow.stream.
+    They are read with the BigQuery Storage Read API and sent in chunks of
+    about `chunk_size` bytes, an optional query parameter.
+
     Args:
         request (flask.Request): The request object.
         <https://flask.palletsprojects.com/en/1.1.x/api/#incoming-request-data>
@@ -33,6 +129,9 @@ def stream_big_query_output(request):
         Response object using `make_response`
         <https://flask.palletsprojects.com/en/1.1.x/api/#flask.make_response>.
     """
+    start_time = time.monotonic()
+    mimetype = request.accept_mimetypes.best_match(["text/plain", *ENCODERS])
+
     # Example large query from public dataset
     query = """
     SELECT abstract
@@ -41,11 +140,21 @@ def stream_big_query_output(request):
     """
     query_job = client.query(query)  # Make an API request.
 
-    def generate():
-        for row in query_job:
-            yield row[0]
+    if mimetype not in ENCODERS:
+
+        def generate():
+            for row in query_job:
+                yield row[0]
+
+        return Response(stream_with_context(generate()))
 
-    return Response(stream_with_context(generate()))
+    chunk_size = request.args.get("chunk_size", CHUNK_SIZE, type=int)
+    batches = query_job.result().to_arrow_iterable(bqstorage_client=bqstorage_client)
+    chunks = coalesce(ENCODERS[mimetype](batches), chunk_size)
+    return Response(
+        stream_with_context(log_metrics(chunks, mimetype, start_time)),
+        mimetype=mimetype,
+    )
 
 
 # [END functions_response_streaming]
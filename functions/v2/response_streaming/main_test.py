@@ -11,7 +11,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+
 import flask
+import pyarrow
 import pytest
 
 import main
@@ -28,3 +31,40 @@ def test_main(app):
         response = main.stream_big_query_output(flask.request)
         assert response.is_streamed
         assert response.status_code == 200
+
+
+def test_main_csv(app):
+    with app.test_request_context(headers={"Accept": "text/csv"}):
+        response = main.stream_big_query_output(flask.request)
+        assert response.is_streamed
+        assert response.status_code == 200
+        assert response.mimetype == "text/csv"
+        assert response.get_data(as_text=True).startswith('"abstract"\n')
+
+
+def test_encoders():
+    batches = [
+        pyarrow.record_batch(
+            [pyarrow.array([1, 2]), pyarrow.array(["a", "b"])], ["n", "s"]
+        ),
+        pyarrow.record_batch([pyarrow.array([3]), pyarrow.array(["c"])], ["n", "s"]),
+    ]
+
+    ndjson = b"".join(main.encode_ndjson(batches)).decode()
+    assert [json.loads(line) for line in ndjson.splitlines()] == [
+        {"n": 1, "s": "a"},
+        {"n": 2, "s": "b"},
+        {"n": 3, "s": "c"},
+    ]
+
+    csv = b"".join(main.encode_csv(batches)).decode()
+    assert csv == '"n","s"\n1,"a"\n2,"b"\n3,"c"\n'
+
+    arrow = b"".join(main.coalesce(main.encode_arrow(batches), chunk_size=10))
+    table = pyarrow.ipc.open_stream(arrow).read_all()
+    assert table.to_pydict() == {"n": [1, 2, 3], "s": ["a", "b", "c"]}
+
+
+def test_coalesce():
+    chunks = list(main.coalesce([b"a" * 3, b"b" * 3, b"c" * 5, b"d"], chunk_size=5))
+    assert chunks == [b"aaabbb", b"ccccc", b"d"]
@@ -0,0 +1,151 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares batching of log entries by shallow and by serialized size.
+
+The benchmark generates a synthetic export of log entries and writes them
+using a fake Logging API that counts RPCs, simulates per-request latency and
+rejects requests larger than 10MB, like the real API does.
+
+Run it with:
+
+    python batching_benchmark.py --entries 200000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable, List
+
+from google.api_core import exceptions
+
+import main
+
+_API_MAX_REQUEST_BYTES = 10 * 1024 * 1024
+
+
+class _FakeLoggingApi:
+    def __init__(self, rpc_latency: float) -> None:
+        self.rpc_latency = rpc_latency
+        self.rpcs, self.rejected, self.written = 0, 0, 0
+
+    def write_entries(self, logs: List[dict]) -> None:
+        self.rpcs += 1
+        time.sleep(self.rpc_latency)
+        if sum(main._entry_size(log) for log in logs) > _API_MAX_REQUEST_BYTES:
+            self.rejected += 1
+            raise exceptions.InvalidArgument(
+                f"Request payload size exceeds the limit: {_API_MAX_REQUEST_BYTES} bytes."
+            )
+        self.written += len(logs)
+
+
+class _FakeLoggingClient:
+    def __init__(self, rpc_latency: float) -> None:
+        self.project = "benchmark-project"
+        self.logging_api = _FakeLoggingApi(rpc_latency)
+
+
+def _synthetic_export(count: int) -> List[str]:
+    random.seed(0)
+    lines = []
+    for n in range(count):
+        log = {
+            "insertId": f"{n:016x}",
+            "logName": "projects/source-project/logs/requests",
+            "resource": {"type": "cloud_run_revision", "labels": {"service": "api"}},
+            "timestamp": "2023-08-01T12:00:00.000000Z",
+            "severity": random.choice(["INFO", "WARNING", "ERROR"]),
+            "httpRequest": {"requestUrl": "/" + "x" * random.randint(20, 400)},
+            "jsonPayload": {"message": "y" * random.randint(100, 4000)},
+        }
+        lines.append(json.dumps(log))
+    return lines
+
+
+def _shallow_size_import(lines: List[str], client: _FakeLoggingClient) -> None:
+    """The batching that measures entries with sys.getsizeof()"""
+    total_size, logs = 0, []
+    for line in lines:
+        log = json.loads(line)
+        main._patch_entry(log, client.project)
+        size = sys.getsizeof(log)
+        if total_size + size >= main._LOGS_MAX_SIZE_BYTES:
+            try:
+                client.logging_api.write_entries(logs)
+            except exceptions.InvalidArgument:
+                pass
+            total_size, logs = 0, []
+        total_size += size
+        logs.append(log)
+    if logs:
+        try:
+            client.logging_api.write_entries(logs)
+        except exceptions.InvalidArgument:
+            pass
+
+
+def _serialized_size_import(lines: List[str], client: _FakeLoggingClient) -> None:
+    """The batching that measures entries by their encoded size"""
+    batcher = main._LogBatcher()
+    for line in lines:
+        log = json.loads(line)
+        main._patch_entry(log, client.project)
+        batch = batcher.add(log)
+        if batch:
+            main._write_logs(batch.logs, client)
+    batch = batcher.flush()
+    if batch.logs:
+        main._write_logs(batch.logs, client)
+
+
+def _run(
+    name: str,
+    import_func: Callable[[List[str], _FakeLoggingClient], None],
+    lines: List[str],
+    rpc_latency: float,
+) -> None:
+    client = _FakeLoggingClient(rpc_latency)
+    start_time = time.monotonic()
+    import_func(lines, client)
+    elapsed = time.monotonic() - start_time
+    api = client.logging_api
+    print(
+        f"{name:<16} rpcs={api.rpcs:<6} rejected={api.rejected:<4} "
+        f"written={api.written:<8} lost={len(lines) - api.written:<8} "
+        f"wall time={elapsed:.2f}s"
+    )
+
+
+def main_benchmark() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=200000)
+    parser.add_argument(
+        "--rpc-latency", type=float, default=0.05, help="seconds per write RPC"
+    )
+    args = parser.parse_args()
+
+    lines = _synthetic_export(args.entries)
+    print(
+        f"{len(lines)} entries, {sum(len(line) for line in lines)} bytes, "
+        f"{args.rpc_latency}s per RPC"
+    )
+    _run("shallow size", _shallow_size_import, lines, args.rpc_latency)
+    _run("serialized size", _serialized_size_import, lines, args.rpc_latency)
+
+
+if __name__ == "__main__":
+    main_benchmark()
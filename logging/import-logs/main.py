@@ -15,24 +15,45 @@
 # pylint: disable=missing-module-docstring
 # pylint: disable=broad-exception-caught
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+import heapq
+import itertools
 import json
 import math
 import os
+import queue
 import sys
+import threading
+import time
 
-from typing import List, Tuple, TypedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypedDict
 
 from google.api_core import exceptions
 from google.cloud import logging_v2, storage
 
 # Logging limits (https://cloud.google.com/logging/quotas#api-limits)
 _LOGS_MAX_SIZE_BYTES = 9 * 1024 * 1024  # < 10MB
+_LOGS_MAX_ENTRIES = 1000
+
+# Minimal interval between checkpoint updates (https://cloud.google.com/storage/quotas)
+_CHECKPOINT_INTERVAL_SEC = 5
+
+# Interval and timeout of waiting for the first task to save the import plan
+_PLAN_POLL_INTERVAL_SEC = 5
+_PLAN_WAIT_TIMEOUT_SEC = 60 * 60
 
 # Read Cloud Run environment variables
 TASK_INDEX = int(os.getenv("CLOUD_RUN_TASK_INDEX", "0"))
 TASK_COUNT = int(os.getenv("CLOUD_RUN_TASK_COUNT", "1"))
 
+# Pipelined import parameters (the import runs serially when both are 1)
+READ_WORKERS = int(os.getenv("READ_WORKERS", "1"))
+WRITE_WORKERS = int(os.getenv("WRITE_WORKERS", "1"))
+# Number of days that are listed concurrently
+LIST_WORKERS = int(os.getenv("LIST_WORKERS", "8"))
+
 
 def getenv_date(name: str) -> date:
     """Reads environment variable and converts it to 'datetime.date'"""
@@ -48,6 +69,8 @@ END_DATE = getenv_date("END_DATE")
 LOG_ID = os.getenv("LOG_ID")
 BUCKET_NAME = os.getenv("STORAGE_BUCKET_NAME")
 PROJECT_ID = os.getenv("PROJECT_ID")
+CHECKPOINT_PREFIX = os.getenv("CHECKPOINT_PREFIX")
+PLAN_PREFIX = os.getenv("PLAN_PREFIX")
 
 
 def eprint(*objects: str, **kwargs: TypedDict) -> None:
@@ -55,17 +78,6 @@ def eprint(*objects: str, **kwargs: TypedDict) -> None:
     print(*objects, file=sys.stderr, **kwargs)
 
 
-def _day(blob_name: str) -> int:
-    """Parse day number from Blob's path
-
-    Use the known Blob path convention to parse the day part from the path.
-    The path convention is <LOG_ID>/YYYY/MM/DD/<OBJECT_NAME>
-    """
-    # calculated in function to allow test to set LOG_ID
-    offset = len(LOG_ID) + 1 + 4 + 1 + 2 + 1
-    return int(blob_name[offset : offset + 2])
-
-
 def _is_valid_import_range() -> bool:
     """Validate the import date range
 
@@ -109,56 +121,317 @@ def calc_import_range() -> Tuple[date, date]:
 
 
 def _prefix(_date: date) -> str:
-    return f"{LOG_ID}/{_date.year:04}/{_date.month:02}/"
+    return f"{LOG_ID}/{_date.year:04}/{_date.month:02}/{_date.day:02}/"
+
+
+def _list_day_blobs(day: date, client: storage.Client) -> List[storage.Blob]:
+    return list(client.list_blobs(BUCKET_NAME, prefix=_prefix(day)))
 
 
-def list_log_files(first_day: date, last_day: date, client: storage.Client) -> List:
-    """Load paths to all log files stored in Cloud Storage in between first and last days.
+def _list_log_blobs(
+    first_day: date, last_day: date, client: storage.Client
+) -> Iterator[storage.Blob]:
+    """Lazily load all log file blobs stored in Cloud Storage in between first and last days.
     For log organization hierarchy see
     https://cloud.google.com/logging/docs/export/storage#gcs-organization.
+
+    Each day is listed using its own prefix, so days outside of the range are not listed.
+    Up to LIST_WORKERS days are listed concurrently. Blobs are yielded in the order
+    of days as soon as the day is listed, so the import can start before the listing ends.
+    """
+    days = (
+        first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)
+    )
+    with ThreadPoolExecutor(max_workers=LIST_WORKERS) as executor:
+        listings = deque()
+        for day in itertools.islice(days, LIST_WORKERS):
+            listings.append(executor.submit(_list_day_blobs, day, client))
+        while listings:
+            blobs = listings.popleft().result()
+            day = next(days, None)
+            if day is not None:
+                listings.append(executor.submit(_list_day_blobs, day, client))
+            yield from blobs
+
+
+def list_log_files(
+    first_day: date, last_day: date, client: storage.Client
+) -> Iterator[str]:
+    """Lazily load paths to all log files stored in Cloud Storage in between first and last days."""
+    return (b.name for b in _list_log_blobs(first_day, last_day, client))
+
+
+def plan_import(blobs: Iterable[storage.Blob], task_count: int) -> List[dict]:
+    """Assign log files to tasks so that each task imports about the same number of bytes
+
+    Uses the greedy heuristic: files are assigned from the largest to the smallest,
+    each to the task with the least bytes assigned so far. Ties are resolved by
+    file path and task index to keep the plan deterministic.
+    Returns a list of {"size": total bytes, "files": sorted paths} dicts, one per task.
     """
-    paths = []
+    tasks = [{"size": 0, "files": []} for _ in range(task_count)]
+    heap = [(0, index) for index in range(task_count)]
+    for blob in sorted(blobs, key=lambda b: (-(b.size or 0), b.name)):
+        size, index = heapq.heappop(heap)
+        tasks[index]["files"].append(blob.name)
+        tasks[index]["size"] = size + (blob.size or 0)
+        heapq.heappush(heap, (tasks[index]["size"], index))
+    for task in tasks:
+        task["files"].sort()
+    return tasks
+
+
+def _plan_name() -> str:
+    """Returns the plan object name that is unique for the import range and number of tasks"""
+    return (
+        f"{PLAN_PREFIX}/{LOG_ID}/{START_DATE:%Y%m%d}-{END_DATE:%Y%m%d}/"
+        f"plan-{TASK_COUNT}.json"
+    )
 
-    # collect paths for special case when first and last days are in the same month
-    if first_day.year == last_day.year and first_day.month == last_day.month:
-        blobs = client.list_blobs(
-            BUCKET_NAME, prefix=_prefix(first_day), delimiter=None
-        )
-        paths = [
-            b.name
-            for b in blobs
-            if _day(b.name) >= first_day.day and _day(b.name) <= last_day.day
-        ]
-        return paths
-
-    # collect all log file paths in first month and filter those for early days
-    blobs = client.list_blobs(BUCKET_NAME, prefix=_prefix(first_day), delimiter=None)
-    paths.extend([b.name for b in blobs if _day(b.name) >= first_day.day])
-    # process all paths in last months
-    blobs = client.list_blobs(BUCKET_NAME, prefix=_prefix(last_day))
-    paths.extend([b.name for b in blobs if _day(b.name) <= last_day.day])
-    # process all paths in between
-    for year in range(first_day.year, last_day.year + 1):
-        for month in range(
-            first_day.month + 1 if year == first_day.year else 1,
-            last_day.month if year == last_day.year else 13,
-        ):
-            blobs = client.list_blobs(
-                BUCKET_NAME, prefix=_prefix(date(year=year, month=month, day=1))
+
+def _download_plan(blob: storage.Blob) -> Optional[List[dict]]:
+    try:
+        return json.loads(blob.download_as_bytes())["tasks"]
+    except exceptions.NotFound:
+        return None
+
+
+def load_import_plan(client: storage.Client) -> List[dict]:
+    """Load the import plan shared by all tasks
+
+    Only the first task lists the log files, creates the plan and saves it to the
+    storage bucket. The other tasks wait until the plan is saved and read it, so
+    the import range is listed once and all tasks use the same plan even if new
+    log files are exported while the tasks start.
+    """
+    blob = client.bucket(BUCKET_NAME).blob(_plan_name())
+    plan = _download_plan(blob)
+    if plan is not None:
+        return plan
+
+    if TASK_INDEX == 0:
+        plan = plan_import(_list_log_blobs(START_DATE, END_DATE, client), TASK_COUNT)
+        try:
+            blob.upload_from_string(
+                json.dumps({"tasks": plan}),
+                content_type="application/json",
+                if_generation_match=0,
             )
-            paths.extend([b.name for b in blobs])
-    return paths
+        except exceptions.PreconditionFailed:
+            # a previous attempt of the first task has saved the plan
+            return json.loads(blob.download_as_bytes())["tasks"]
+        return plan
+
+    deadline = time.monotonic() + _PLAN_WAIT_TIMEOUT_SEC
+    while time.monotonic() < deadline:
+        time.sleep(_PLAN_POLL_INTERVAL_SEC)
+        plan = _download_plan(blob)
+        if plan is not None:
+            return plan
+    raise TimeoutError(f"the import plan {_plan_name()} was not saved by task #1")
 
 
-def _read_logs(path: str, bucket: storage.Bucket) -> List[str]:
+def _read_logs(path: str, bucket: storage.Bucket, start: int = 0) -> List[str]:
     blob = bucket.blob(path)
-    contents = blob.download_as_string()
-    return contents.splitlines()
+    contents = blob.download_as_string(start=start)
+    return contents.splitlines(keepends=True)
+
+
+def _stream_logs(path: str, bucket: storage.Bucket, start: int = 0) -> Iterator[bytes]:
+    """Yields lines of the log file without loading the whole file to memory"""
+    blob = bucket.blob(path)
+    with blob.open("rb") as reader:
+        if start:
+            reader.seek(start)
+        for line in reader:
+            yield line
+
+
+def _entry_size(log: dict) -> int:
+    """Returns the size of the log entry when it is encoded in the write request"""
+    return len(json.dumps(log, separators=(",", ":")))
+
+
+class _LogBatch:
+    """Log entries of one write request and the file ranges they were read from"""
+
+    def __init__(self) -> None:
+        self.logs: List[dict] = []
+        self.size = 0
+        self.read_size = 0
+        # maps file path to (start offset, end offset, end of file) tuple
+        self.ranges: Dict[str, Tuple[int, int, bool]] = {}
+
+    def mark_read(self, path: str, start: int, end: int, eof: bool = False) -> None:
+        """Records that bytes from start to end of the file belong to the batch"""
+        if path in self.ranges:
+            start, prev_end, _ = self.ranges[path]
+            self.read_size += end - prev_end
+        else:
+            self.read_size += end - start
+        self.ranges[path] = (start, end, eof)
+
+
+class _LogBatcher:
+    """Groups log entries into batches that fit the write request limits
+
+    The batch size is tracked using the length of the entries' JSON encoding
+    that is close to the size of the serialized request, so batches are packed
+    close to the limit.
+    """
+
+    def __init__(self) -> None:
+        self.max_size = _LOGS_MAX_SIZE_BYTES
+        self.max_entries = _LOGS_MAX_ENTRIES
+        self.batch = _LogBatch()
+
+    def add(self, log: dict) -> Optional[_LogBatch]:
+        """Adds the entry to the batch
+
+        Returns the full batch (without the added entry) when the entry does
+        not fit into the current batch.
+        """
+        size = _entry_size(log)
+        batch = None
+        if self.batch.logs and (
+            self.batch.size + size > self.max_size
+            or len(self.batch.logs) >= self.max_entries
+        ):
+            batch = self.flush()
+        self.batch.logs.append(log)
+        self.batch.size += size
+        return batch
+
+    def flush(self) -> _LogBatch:
+        """Returns the current batch and starts a new one"""
+        batch = self.batch
+        self.batch = _LogBatch()
+        return batch
+
+
+def _batch_log_file(
+    path: str, lines: Iterable, start: int, batcher: _LogBatcher, project_id: str
+) -> Iterator[_LogBatch]:
+    """Adds entries of the log file to the batcher and yields full batches
+
+    The lines are read starting at the byte offset 'start' of the file.
+    The range of each entry spans from the end of the previous entry to the end
+    of its own line, so ranges of consecutive batches have no gaps.
+    """
+    offset = prev_end = start
+    for line in lines:
+        offset += len(line)
+        if not line.strip():
+            continue
+        log = json.loads(line)
+        _patch_entry(log, project_id)
+        batch = batcher.add(log)
+        if batch:
+            yield batch
+        batcher.batch.mark_read(path, prev_end, offset)
+        prev_end = offset
+    batcher.batch.mark_read(path, prev_end, offset, eof=True)
+
+
+class _Checkpoint:
+    """Tracks parts of the log files that were written to Cloud Logging
+
+    The checkpoint is saved as a small JSON object with the paths of imported
+    files and the byte offsets of partially imported files. Concurrent writers
+    can commit ranges out of order. The offset of the file advances only when
+    all preceding ranges of the file are committed.
+    """
+
+    def __init__(self, blob: Optional[storage.Blob] = None) -> None:
+        self.blob = blob
+        self.offsets: Dict[str, int] = {}
+        self.completed: Set[str] = set()
+        self._pending: Dict[str, Dict[int, Tuple[int, bool]]] = {}
+        self._lock = threading.Lock()
+        self._changed = False
+        self._save_time = 0.0
+
+    def load(self) -> None:
+        """Loads the saved checkpoint if it exists"""
+        if not self.blob:
+            return
+        try:
+            data = json.loads(self.blob.download_as_bytes())
+        except exceptions.NotFound:
+            return
+        self.offsets = data.get("offsets", {})
+        self.completed = set(data.get("completed", []))
+
+    def offset(self, path: str) -> Optional[int]:
+        """Returns the offset to resume reading the file or None if it was imported"""
+        with self._lock:
+            if path in self.completed:
+                return None
+            return self.offsets.get(path, 0)
+
+    def commit(self, ranges: Dict[str, Tuple[int, int, bool]]) -> None:
+        """Marks the file ranges as written and periodically saves the checkpoint"""
+        if not ranges:
+            return
+        with self._lock:
+            for path, (start, end, eof) in ranges.items():
+                self._pending.setdefault(path, {})[start] = (end, eof)
+                self._advance(path)
+            self._changed = True
+        self.save(force=False)
+
+    def _advance(self, path: str) -> None:
+        pending = self._pending[path]
+        offset = self.offsets.get(path, 0)
+        while offset in pending:
+            end, eof = pending.pop(offset)
+            if eof:
+                self.completed.add(path)
+                self.offsets.pop(path, None)
+                del self._pending[path]
+                return
+            offset = end
+        self.offsets[path] = offset
+
+    def save(self, force: bool = True) -> None:
+        """Saves the checkpoint if it changed
+
+        Unless forced, saves no more often than every _CHECKPOINT_INTERVAL_SEC
+        seconds to stay within the update rate limit of a Cloud Storage object.
+        """
+        if not self.blob:
+            return
+        with self._lock:
+            if not self._changed:
+                return
+            if (
+                not force
+                and time.monotonic() - self._save_time < _CHECKPOINT_INTERVAL_SEC
+            ):
+                return
+            data = json.dumps(
+                {"offsets": self.offsets, "completed": sorted(self.completed)}
+            )
+            self.blob.upload_from_string(data, content_type="application/json")
+            self._changed = False
+            self._save_time = time.monotonic()
+
+
+def _is_too_large(err: exceptions.GoogleAPICallError) -> bool:
+    message = str(err)
+    return "exceeds the limit" in message or "larger than max" in message
 
 
 def _write_logs(logs: List[dict], client: logging_v2.Client) -> None:
     try:
         client.logging_api.write_entries(logs)
+    except (exceptions.InvalidArgument, exceptions.ResourceExhausted) as err:
+        if len(logs) < 2 or not _is_too_large(err):
+            raise
+        # the request is rejected as too large, retry it in two halves
+        middle = len(logs) // 2
+        _write_logs(logs[:middle], client)
+        _write_logs(logs[middle:], client)
     except exceptions.PermissionDenied as err2:
         for detail in err2.details:
             if isinstance(detail, logging_v2.types.WriteLogEntriesPartialErrors):
@@ -187,25 +460,148 @@ def _patch_entry(log: dict, project_id: str) -> None:
     # log["timestamp"] = None
 
 
+def _checkpoint_name() -> str:
+    """Returns the checkpoint object name that is unique for the task and import range"""
+    return (
+        f"{CHECKPOINT_PREFIX}/{LOG_ID}/{START_DATE:%Y%m%d}-{END_DATE:%Y%m%d}/"
+        f"task-{TASK_INDEX}-of-{TASK_COUNT}.json"
+    )
+
+
+def _print_throughput(entries: int, size: int, start_time: float) -> None:
+    """Prints the number of imported entries and bytes per second"""
+    elapsed = max(time.monotonic() - start_time, 1e-6)
+    print(
+        f"Task #{(TASK_INDEX+1)} imported {entries} entries ({size} bytes) "
+        f"in {elapsed:.1f}s: {entries / elapsed:.1f} entries/s, "
+        f"{size / elapsed:.1f} bytes/s"
+    )
+
+
 def import_logs(
-    log_files: List, storage_client: storage.Client, logging_client: logging_v2.Client
+    log_files: Iterable,
+    storage_client: storage.Client,
+    logging_client: logging_v2.Client,
+    checkpoint: Optional[_Checkpoint] = None,
+) -> None:
+    """Iterates through log files to write log entries in batched mode
+
+    Files and parts of files that the checkpoint marks as imported are skipped.
+    """
+    start_time = time.monotonic()
+    checkpoint = checkpoint or _Checkpoint()
+    batcher = _LogBatcher()
+    imported_entries, imported_size = 0, 0
+    bucket = storage_client.bucket(BUCKET_NAME)
+
+    def _write_batch(batch: _LogBatch) -> None:
+        nonlocal imported_entries, imported_size
+        if batch.logs:
+            _write_logs(batch.logs, logging_client)
+        checkpoint.commit(batch.ranges)
+        imported_entries += len(batch.logs)
+        imported_size += batch.read_size
+
+    try:
+        for file_path in log_files:
+            start = checkpoint.offset(file_path)
+            if start is None:
+                continue
+            data = _read_logs(file_path, bucket, start)
+            for batch in _batch_log_file(
+                file_path, data, start, batcher, logging_client.project
+            ):
+                _write_batch(batch)
+        _write_batch(batcher.flush())
+    finally:
+        checkpoint.save()
+    _print_throughput(imported_entries, imported_size, start_time)
+
+
+def import_logs_pipelined(
+    log_files: Iterable,
+    storage_client: storage.Client,
+    logging_client: logging_v2.Client,
+    read_workers: int,
+    write_workers: int,
+    checkpoint: Optional[_Checkpoint] = None,
 ) -> None:
-    """Iterates through log files to write log entries in batched mode"""
-    total_size, logs = 0, []
+    """Imports log entries using separate pools of reader and writer threads
+
+    Readers stream log files line by line and put batches of patched entries
+    to a bounded queue. Writers take the batches from the queue and write them
+    to Cloud Logging. When all writers are busy the queue fills up and blocks
+    readers, so no more than a few batches are held in memory.
+    Files and parts of files that the checkpoint marks as imported are skipped.
+    """
+    start_time = time.monotonic()
+    checkpoint = checkpoint or _Checkpoint()
     bucket = storage_client.bucket(BUCKET_NAME)
-    for file_path in log_files:
-        data = _read_logs(file_path, bucket)
-        for entry in data:
-            log = json.loads(entry)
-            _patch_entry(log, logging_client.project)
-            size = sys.getsizeof(log)
-            if total_size + size >= _LOGS_MAX_SIZE_BYTES:
-                _write_logs(logs, logging_client)
-                total_size, logs = 0, []
-            total_size += size
-            logs.append(log)
-    if logs:
-        _write_logs(logs, logging_client)
+    paths = iter(log_files)
+    paths_lock = threading.Lock()
+    batches = queue.Queue(maxsize=2 * write_workers)
+    stats_lock = threading.Lock()
+    stats = {"entries": 0, "size": 0}
+    errors = []
+    failed = threading.Event()
+
+    def _next_path() -> str:
+        with paths_lock:
+            return next(paths, None)
+
+    def _read() -> None:
+        batcher = _LogBatcher()
+        try:
+            path = _next_path()
+            while path is not None and not failed.is_set():
+                start = checkpoint.offset(path)
+                if start is not None:
+                    lines = _stream_logs(path, bucket, start)
+                    for batch in _batch_log_file(
+                        path, lines, start, batcher, logging_client.project
+                    ):
+                        batches.put(batch)
+                path = _next_path()
+            batches.put(batcher.flush())
+        except Exception as err:
+            errors.append(err)
+            failed.set()
+
+    def _write() -> None:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            # keep draining the queue after a failure to unblock readers
+            if failed.is_set():
+                continue
+            try:
+                if batch.logs:
+                    _write_logs(batch.logs, logging_client)
+                checkpoint.commit(batch.ranges)
+            except Exception as err:
+                errors.append(err)
+                failed.set()
+                continue
+            with stats_lock:
+                stats["entries"] += len(batch.logs)
+                stats["size"] += batch.read_size
+
+    with ThreadPoolExecutor(max_workers=write_workers) as writers:
+        for _ in range(write_workers):
+            writers.submit(_write)
+        try:
+            with ThreadPoolExecutor(max_workers=read_workers) as readers:
+                for _ in range(read_workers):
+                    readers.submit(_read)
+        finally:
+            for _ in range(write_workers):
+                batches.put(None)
+    checkpoint.save()
+
+    _print_throughput(stats["entries"], stats["size"], start_time)
+    if errors:
+        raise errors[0]
 
 
 def main() -> None:
@@ -216,21 +612,47 @@ def main() -> None:
     if not _is_valid_import_range():
         sys.exit(1)
 
-    start_date, end_date = calc_import_range()
+    storage_client = storage.Client()
+    if PLAN_PREFIX:
+        task_plan = load_import_plan(storage_client)[TASK_INDEX]
+        if not task_plan["files"]:
+            print(f"Task #{(TASK_INDEX+1)} has no work to do")
+            sys.exit(0)
+        print(
+            f"Task #{(TASK_INDEX+1)} starts importing {len(task_plan['files'])} "
+            f"log files ({task_plan['size']} bytes)"
+        )
+        log_files = task_plan["files"]
+    else:
+        start_date, end_date = calc_import_range()
 
-    if start_date > end_date:
-        print(f"Task #{(TASK_INDEX+1)} has no work to do")
-        sys.exit(0)
-    print(
-        f"Task #{(TASK_INDEX+1)} starts importing logs from {start_date} to {end_date}"
-    )
+        if start_date > end_date:
+            print(f"Task #{(TASK_INDEX+1)} has no work to do")
+            sys.exit(0)
+        print(
+            f"Task #{(TASK_INDEX+1)} starts importing logs from {start_date} to {end_date}"
+        )
+        log_files = list_log_files(start_date, end_date, storage_client)
 
-    storage_client = storage.Client()
-    log_files = list_log_files(start_date, end_date, storage_client)
+    checkpoint = _Checkpoint()
+    if CHECKPOINT_PREFIX:
+        bucket = storage_client.bucket(BUCKET_NAME)
+        checkpoint = _Checkpoint(bucket.blob(_checkpoint_name()))
+        checkpoint.load()
     logging_client = (
         logging_v2.Client(project=PROJECT_ID) if PROJECT_ID else logging_v2.Client()
     )
-    import_logs(log_files, storage_client, logging_client)
+    if READ_WORKERS > 1 or WRITE_WORKERS > 1:
+        import_logs_pipelined(
+            log_files,
+            storage_client,
+            logging_client,
+            READ_WORKERS,
+            WRITE_WORKERS,
+            checkpoint,
+        )
+    else:
+        import_logs(log_files, storage_client, logging_client, checkpoint)
 
 
 # Start script
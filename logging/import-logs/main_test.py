@@ -18,13 +18,14 @@
 # pylint: disable=too-many-return-statements
 
 from datetime import date, timedelta
+import io
 import json
 import os
-import sys
 from typing import List, Tuple, TypedDict
 from unittest import mock
 from unittest.mock import MagicMock
 
+from google.api_core import exceptions
 from google.cloud import logging_v2, storage
 import pytest
 
@@ -44,6 +45,7 @@ def _setup_environment(
     log_id: str = TEST_LOG_ID,
     storage_bucket: str = TEST_BUCKET,
     max_size: int = 0,
+    max_entries: int = 1000,
 ) -> None:
     main.LOG_ID = log_id
     main.BUCKET_NAME = storage_bucket
@@ -52,6 +54,7 @@ def _setup_environment(
     main.START_DATE = start_date
     main.END_DATE = end_date
     main._LOGS_MAX_SIZE_BYTES = max_size  # pylint: disable=protected-access
+    main._LOGS_MAX_ENTRIES = max_entries  # pylint: disable=protected-access
 
 
 @pytest.mark.parametrize(
@@ -220,30 +223,19 @@ TEST_FILES_MAR_2003 = [
 ]
 
 
+TEST_FILES = [
+    *TEST_FILES_JUN_2001,
+    *TEST_FILES_JUL_2001,
+    *TEST_FILES_AUG_2001,
+    *TEST_FILES_MAY_2002,
+    *TEST_FILES_JAN_2003,
+    *TEST_FILES_FEB_2003,
+    *TEST_FILES_MAR_2003,
+]
+
+
 def _args_based_list_blobs_return(*_args: str, **kwargs: TypedDict) -> List[str]:
-    if kwargs["prefix"] == f"{TEST_LOG_ID}/2001/06/":
-        print("TEST_FILES_JUN_2001")
-        return TEST_FILES_JUN_2001
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2001/07/":
-        print("TEST_FILES_JUL_2001")
-        return TEST_FILES_JUL_2001
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2001/08/":
-        print("TEST_FILES_AUG_2001")
-        return TEST_FILES_AUG_2001
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2002/05/":
-        print("TEST_FILES_MAY_2002")
-        return TEST_FILES_MAY_2002
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2003/01/":
-        print("TEST_FILES_JAN_2003")
-        return TEST_FILES_JAN_2003
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2003/02/":
-        print("TEST_FILES_FEB_2003")
-        return TEST_FILES_FEB_2003
-    elif kwargs["prefix"] == f"{TEST_LOG_ID}/2003/03/":
-        print("TEST_FILES_MAR_2003")
-        return TEST_FILES_MAR_2003
-    else:
-        return []
+    return iter([f for f in TEST_FILES if f.name.startswith(kwargs["prefix"])])
 
 
 @pytest.mark.parametrize(
@@ -280,7 +272,175 @@ def test_list_log_files(first_day: str, last_day: str, expected_paths: List) ->
 
     paths = main.list_log_files(first_day, last_day, mocked_client)
 
-    assert set(paths) == set(expected_paths)
+    assert list(paths) == expected_paths
+    listed_prefixes = {
+        c.kwargs["prefix"] for c in mocked_client.list_blobs.call_args_list
+    }
+    assert len(listed_prefixes) == (last_day - first_day).days + 1
+    for prefix in listed_prefixes:
+        assert prefix.startswith(f"{TEST_LOG_ID}/")
+        listed_day = date(*[int(part) for part in prefix.split("/")[1:4]])
+        assert first_day <= listed_day <= last_day
+
+
+def test_list_log_files_is_lazy() -> None:
+    _setup_environment()
+
+    mocked_client = MagicMock(spec=storage.Client)
+    mocked_client.list_blobs = MagicMock(side_effect=_args_based_list_blobs_return)
+
+    paths = main.list_log_files(date(2001, 6, 1), date(2003, 3, 31), mocked_client)
+    first_path = next(paths)
+
+    assert first_path == TEST_FILES_JUN_2001[0].name
+    assert mocked_client.list_blobs.call_count <= main.LIST_WORKERS + 1
+
+
+def _sized_blob(name: str, size: int) -> storage.Blob:
+    blob = storage.Blob(name=f"{TEST_LOG_ID}/2001/06/{name}", bucket=TEST_BUCKET)
+    blob._properties["size"] = size  # pylint: disable=protected-access
+    return blob
+
+
+TEST_SIZED_FILES = [
+    _sized_blob("01/file1.json", 100),
+    _sized_blob("01/file2.json", 10),
+    _sized_blob("02/file1.json", 700),
+    _sized_blob("03/file1.json", 40),
+    _sized_blob("03/file2.json", 300),
+    _sized_blob("04/file1.json", 250),
+    _sized_blob("05/file1.json", 50),
+]
+
+
+@pytest.mark.parametrize(
+    "task_count, expected_sizes",
+    [
+        (1, [1450]),
+        (2, [740, 710]),
+        (3, [700, 390, 360]),
+        (8, [700, 300, 250, 100, 50, 40, 10, 0]),
+    ],
+    ids=["single task", "two tasks", "three tasks", "more tasks than files"],
+)
+def test_plan_import(task_count: int, expected_sizes: List[int]) -> None:
+    plan = main.plan_import(TEST_SIZED_FILES, task_count)
+
+    assert [task["size"] for task in plan] == expected_sizes
+    files = [f for task in plan for f in task["files"]]
+    assert sorted(files) == sorted(b.name for b in TEST_SIZED_FILES)
+    for task in plan:
+        assert task["files"] == sorted(task["files"])
+    assert plan == main.plan_import(list(reversed(TEST_SIZED_FILES)), task_count)
+
+
+def _plan_storage_client(plan_blob: storage.Blob) -> storage.Client:
+    mocked_storage_client = MagicMock(spec=storage.Client)
+    mocked_bucket = MagicMock(spec=storage.Bucket)
+    mocked_storage_client.bucket = MagicMock(return_value=mocked_bucket)
+    mocked_bucket.blob = MagicMock(return_value=plan_blob)
+    mocked_storage_client.list_blobs = MagicMock(
+        side_effect=lambda *_, prefix: [
+            b for b in TEST_SIZED_FILES if b.name.startswith(prefix)
+        ]
+    )
+    return mocked_storage_client
+
+
+def test_load_import_plan_existing() -> None:
+    _setup_environment(
+        task_count=2, start_date=date(2001, 6, 1), end_date=date(2001, 6, 30)
+    )
+    saved_plan = [{"size": 1, "files": ["a"]}, {"size": 2, "files": ["b"]}]
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(
+        return_value=json.dumps({"tasks": saved_plan})
+    )
+    mocked_storage_client = _plan_storage_client(mocked_blob)
+
+    plan = main.load_import_plan(mocked_storage_client)
+
+    assert plan == saved_plan
+    mocked_storage_client.list_blobs.assert_not_called()
+    mocked_blob.upload_from_string.assert_not_called()
+
+
+def test_load_import_plan_creates_plan() -> None:
+    _setup_environment(
+        task_count=2, start_date=date(2001, 6, 1), end_date=date(2001, 6, 30)
+    )
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(side_effect=exceptions.NotFound("plan"))
+    mocked_storage_client = _plan_storage_client(mocked_blob)
+
+    plan = main.load_import_plan(mocked_storage_client)
+
+    assert plan == main.plan_import(TEST_SIZED_FILES, 2)
+    mocked_blob.upload_from_string.assert_called_once()
+    assert mocked_blob.upload_from_string.call_args.kwargs["if_generation_match"] == 0
+
+
+def test_load_import_plan_saved_by_previous_attempt() -> None:
+    _setup_environment(
+        task_count=2, start_date=date(2001, 6, 1), end_date=date(2001, 6, 30)
+    )
+    saved_plan = [{"size": 1, "files": ["a"]}, {"size": 2, "files": ["b"]}]
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(
+        side_effect=[exceptions.NotFound("plan"), json.dumps({"tasks": saved_plan})]
+    )
+    mocked_blob.upload_from_string = MagicMock(
+        side_effect=exceptions.PreconditionFailed("plan exists")
+    )
+    mocked_storage_client = _plan_storage_client(mocked_blob)
+
+    plan = main.load_import_plan(mocked_storage_client)
+
+    assert plan == saved_plan
+
+
+@mock.patch("time.sleep")
+def test_load_import_plan_waits_for_first_task(mocked_sleep: MagicMock) -> None:
+    _setup_environment(
+        task_index=1,
+        task_count=2,
+        start_date=date(2001, 6, 1),
+        end_date=date(2001, 6, 30),
+    )
+    saved_plan = [{"size": 1, "files": ["a"]}, {"size": 2, "files": ["b"]}]
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(
+        side_effect=[
+            exceptions.NotFound("plan"),
+            exceptions.NotFound("plan"),
+            json.dumps({"tasks": saved_plan}),
+        ]
+    )
+    mocked_storage_client = _plan_storage_client(mocked_blob)
+
+    plan = main.load_import_plan(mocked_storage_client)
+
+    assert plan == saved_plan
+    assert mocked_sleep.call_count == 2
+    mocked_storage_client.list_blobs.assert_not_called()
+    mocked_blob.upload_from_string.assert_not_called()
+
+
+@mock.patch.object(main, "_PLAN_WAIT_TIMEOUT_SEC", 0)
+def test_load_import_plan_wait_timeout() -> None:
+    _setup_environment(
+        task_index=1,
+        task_count=2,
+        start_date=date(2001, 6, 1),
+        end_date=date(2001, 6, 30),
+    )
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(side_effect=exceptions.NotFound("plan"))
+    mocked_storage_client = _plan_storage_client(mocked_blob)
+
+    with pytest.raises(TimeoutError):
+        main.load_import_plan(mocked_storage_client)
+    mocked_storage_client.list_blobs.assert_not_called()
 
 
 TEST_LOG_FILES = ["file1.json", "file2.json", "file3.json", "file4.json"]
@@ -291,13 +451,23 @@ TEST_CONTENT = {
          {"file": "3", "line": "3"}\n{"file": "3", "line": "4"}',
     "file4.json": '{"file": "4", "line": "1"}',
 }
-# note that all log entries are of same size (expected 184 bytes)
-TEST_LOG_SIZE = sys.getsizeof(json.loads(TEST_CONTENT["file4.json"]))
+
+
+def _patched_log_size(content: str) -> int:
+    log = json.loads(content)
+    main._patch_entry(log, TEST_PROJECT_ID)  # pylint: disable=protected-access
+    return main._entry_size(log)  # pylint: disable=protected-access
+
+
+# note that all patched log entries are of same size
+TEST_LOG_SIZE = _patched_log_size(TEST_CONTENT["file4.json"])
 
 
 def _args_based_blob_return(*args: Tuple, **_kwargs: TypedDict) -> str:
     mocked_blob = MagicMock(spec=storage.Blob)
-    mocked_blob.download_as_string = MagicMock(return_value=TEST_CONTENT.get(args[0]))
+    mocked_blob.download_as_string = MagicMock(
+        side_effect=lambda start=0: TEST_CONTENT.get(args[0])[start:]
+    )
     return mocked_blob
 
 
@@ -305,14 +475,14 @@ def _calc_args_size(*args: Tuple) -> int:
     size = 0
     if args and args[0] and isinstance(args[0][0], list):
         for arg in args[0][0]:
-            size += sys.getsizeof(arg)
+            size += main._entry_size(arg)  # pylint: disable=protected-access
     return size
 
 
 @pytest.mark.parametrize(
     "log_files, max_size, expected_writes",
     [
-        (TEST_LOG_FILES, 1 * 1024 * 1024, [(10 * TEST_LOG_SIZE)]),
+        (TEST_LOG_FILES, 1 * 1024 * 1024, [10 * TEST_LOG_SIZE]),
         (
             TEST_LOG_FILES[:2],
             (TEST_LOG_SIZE + 10),
@@ -359,6 +529,231 @@ def test_import_logs(
         ), f"expected write size {expected_size}, got {_calc_args_size(write_call.args)}"
 
 
+def test_import_logs_max_entries() -> None:
+    _setup_environment(max_size=1 * 1024 * 1024, max_entries=4)
+    mocked_storage_client = MagicMock(spec=storage.Client)
+    mocked_bucket = MagicMock(spec=storage.Bucket)
+    mocked_storage_client.bucket = MagicMock(return_value=mocked_bucket)
+    mocked_bucket.blob = MagicMock(side_effect=_args_based_blob_return)
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_logging_client.project = TEST_PROJECT_ID
+    mocked_write_entries = mocked_logging_client.logging_api.write_entries = MagicMock()
+
+    main.import_logs(TEST_LOG_FILES, mocked_storage_client, mocked_logging_client)
+
+    write_lengths = [len(c.args[0]) for c in mocked_write_entries.call_args_list]
+    assert write_lengths == [4, 4, 2], f"expected [4, 4, 2], got {write_lengths}"
+
+
+def test_write_logs_splits_too_large_batch() -> None:
+    def _write_entries(logs: List[dict]) -> None:
+        if len(logs) > 2:
+            raise exceptions.InvalidArgument(
+                "Request payload size exceeds the limit: 10485760 bytes."
+            )
+
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_write_entries = mocked_logging_client.logging_api.write_entries = MagicMock(
+        side_effect=_write_entries
+    )
+    logs = [{"line": str(n)} for n in range(5)]
+
+    main._write_logs(logs, mocked_logging_client)  # pylint: disable=protected-access
+
+    written = [
+        c.args[0] for c in mocked_write_entries.call_args_list if len(c.args[0]) <= 2
+    ]
+    assert [log for batch in written for log in batch] == logs
+
+
+def test_write_logs_raises_other_errors() -> None:
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_logging_client.logging_api.write_entries = MagicMock(
+        side_effect=exceptions.InvalidArgument("Invalid log entry")
+    )
+
+    with pytest.raises(exceptions.InvalidArgument):
+        main._write_logs(  # pylint: disable=protected-access
+            [{"line": "1"}, {"line": "2"}], mocked_logging_client
+        )
+
+
+def _args_based_blob_open_return(*args: Tuple, **_kwargs: TypedDict) -> storage.Blob:
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.open = MagicMock(
+        side_effect=lambda *_: io.BytesIO(TEST_CONTENT.get(args[0]).encode())
+    )
+    return mocked_blob
+
+
+@pytest.mark.parametrize(
+    "read_workers, write_workers, max_size",
+    [
+        (2, 2, 1 * 1024 * 1024),
+        (4, 1, 2 * TEST_LOG_SIZE + 10),
+        (1, 3, TEST_LOG_SIZE + 10),
+    ],
+    ids=[
+        "few readers and writers",
+        "more readers than writers",
+        "more writers than readers",
+    ],
+)
+def test_import_logs_pipelined(
+    read_workers: int, write_workers: int, max_size: int
+) -> None:
+    _setup_environment(max_size=max_size)
+    mocked_storage_client = MagicMock(spec=storage.Client)
+    mocked_bucket = MagicMock(spec=storage.Bucket)
+    mocked_storage_client.bucket = MagicMock(return_value=mocked_bucket)
+    mocked_bucket.blob = MagicMock(side_effect=_args_based_blob_open_return)
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_logging_client.project = TEST_PROJECT_ID
+    mocked_write_entries = mocked_logging_client.logging_api.write_entries = MagicMock()
+
+    main.import_logs_pipelined(
+        TEST_LOG_FILES,
+        mocked_storage_client,
+        mocked_logging_client,
+        read_workers,
+        write_workers,
+    )
+
+    assert mocked_bucket.blob.call_count == len(TEST_LOG_FILES)
+    written = [
+        log
+        for write_call in mocked_write_entries.call_args_list
+        for log in write_call.args[0]
+    ]
+    assert len(written) == 10, f"expected 10 entries, got {len(written)}"
+    for write_call in mocked_write_entries.call_args_list:
+        assert _calc_args_size(write_call.args) < max_size
+    assert {(log["file"], log["line"]) for log in written} == {
+        (str(f), str(n))
+        for f, lines in [(1, 3), (2, 2), (3, 4), (4, 1)]
+        for n in range(1, lines + 1)
+    }
+
+
+def test_import_logs_pipelined_write_failure() -> None:
+    _setup_environment(max_size=TEST_LOG_SIZE + 10)
+    mocked_storage_client = MagicMock(spec=storage.Client)
+    mocked_bucket = MagicMock(spec=storage.Bucket)
+    mocked_storage_client.bucket = MagicMock(return_value=mocked_bucket)
+    mocked_bucket.blob = MagicMock(side_effect=_args_based_blob_open_return)
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_logging_client.project = TEST_PROJECT_ID
+    mocked_logging_client.logging_api.write_entries = MagicMock(
+        side_effect=RuntimeError("write failed")
+    )
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        main.import_logs_pipelined(
+            TEST_LOG_FILES, mocked_storage_client, mocked_logging_client, 2, 2
+        )
+
+
+def test_checkpoint_commits_ranges_in_order() -> None:
+    checkpoint = main._Checkpoint()  # pylint: disable=protected-access
+
+    checkpoint.commit({"file1.json": (10, 20, False)})
+    assert checkpoint.offset("file1.json") == 0
+    checkpoint.commit({"file1.json": (0, 10, False), "file2.json": (0, 5, True)})
+    assert checkpoint.offset("file1.json") == 20
+    assert checkpoint.offset("file2.json") is None
+    checkpoint.commit({"file1.json": (20, 30, True)})
+    assert checkpoint.offset("file1.json") is None
+    assert checkpoint.offsets == {}
+
+
+def test_checkpoint_save_and_load() -> None:
+    saved = {}
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.upload_from_string = MagicMock(
+        side_effect=lambda data, **_: saved.update(data=data)
+    )
+    mocked_blob.download_as_bytes = MagicMock(side_effect=lambda: saved["data"])
+    checkpoint = main._Checkpoint(mocked_blob)  # pylint: disable=protected-access
+    checkpoint.commit({"file1.json": (0, 10, True), "file2.json": (0, 7, False)})
+    checkpoint.save()
+
+    restored = main._Checkpoint(mocked_blob)  # pylint: disable=protected-access
+    restored.load()
+
+    assert restored.offset("file1.json") is None
+    assert restored.offset("file2.json") == 7
+    assert restored.offset("file3.json") == 0
+
+
+def test_checkpoint_load_missing() -> None:
+    mocked_blob = MagicMock(spec=storage.Blob)
+    mocked_blob.download_as_bytes = MagicMock(
+        side_effect=exceptions.NotFound("no checkpoint")
+    )
+    checkpoint = main._Checkpoint(mocked_blob)  # pylint: disable=protected-access
+    checkpoint.load()
+
+    assert checkpoint.offset("file1.json") == 0
+
+
+def _resumed_checkpoint() -> main._Checkpoint:  # pylint: disable=protected-access
+    checkpoint = main._Checkpoint()  # pylint: disable=protected-access
+    # file1 is imported and file3 is imported up to the end of its second line
+    second_line_end = TEST_CONTENT["file3.json"].index("\n", 30) + 1
+    checkpoint.commit(
+        {
+            "file1.json": (0, len(TEST_CONTENT["file1.json"]), True),
+            "file3.json": (0, second_line_end, False),
+        }
+    )
+    return checkpoint
+
+
+@pytest.mark.parametrize("pipelined", [False, True], ids=["serial", "pipelined"])
+def test_import_logs_resumes_from_checkpoint(pipelined: bool) -> None:
+    _setup_environment(max_size=TEST_LOG_SIZE + 10)
+    mocked_storage_client = MagicMock(spec=storage.Client)
+    mocked_bucket = MagicMock(spec=storage.Bucket)
+    mocked_storage_client.bucket = MagicMock(return_value=mocked_bucket)
+    mocked_bucket.blob = MagicMock(
+        side_effect=(
+            _args_based_blob_open_return if pipelined else _args_based_blob_return
+        )
+    )
+    mocked_logging_client = MagicMock(spec=logging_v2.Client)
+    mocked_logging_client.logging_api = MagicMock()
+    mocked_logging_client.project = TEST_PROJECT_ID
+    mocked_write_entries = mocked_logging_client.logging_api.write_entries = MagicMock()
+    checkpoint = _resumed_checkpoint()
+
+    if pipelined:
+        main.import_logs_pipelined(
+            TEST_LOG_FILES,
+            mocked_storage_client,
+            mocked_logging_client,
+            2,
+            2,
+            checkpoint,
+        )
+    else:
+        main.import_logs(
+            TEST_LOG_FILES, mocked_storage_client, mocked_logging_client, checkpoint
+        )
+
+    written = {
+        (log["file"], log["line"])
+        for write_call in mocked_write_entries.call_args_list
+        for log in write_call.args[0]
+    }
+    assert written == {("2", "1"), ("2", "2"), ("3", "3"), ("3", "4"), ("4", "1")}
+    assert checkpoint.completed == set(TEST_LOG_FILES)
+
+
 TEST_DATE_STR = "08/12/2023"
 
 
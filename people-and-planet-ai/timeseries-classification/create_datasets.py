@@ -15,7 +15,6 @@
 from __future__ import annotations
 
 import logging
-import random
 
 import apache_beam as beam
 from apache_beam.options.pipeline_options import PipelineOptions
@@ -54,7 +53,7 @@ def run(
         | "Get training points" >> beam.FlatMap(data_utils.generate_training_points)
         | "Serialize TFRecords" >> beam.Map(trainer.serialize)
         | "Train-eval split"
-        >> beam.Partition(lambda x, n: random.choices([0, 1], train_eval_split)[0], 2)
+        >> beam.Partition(data_utils.train_eval_partition, 2, train_eval_split)
     )
 
     (
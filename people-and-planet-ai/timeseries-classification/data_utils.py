@@ -15,45 +15,155 @@
 
 from __future__ import annotations
 
-from collections.abc import Iterable
-from datetime import datetime, timedelta
+from collections.abc import Iterable, Mapping
+from datetime import timedelta
 import os
-import time
+import random
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import tensorflow as tf
 
 import trainer
 
-
 # Duration of a time step interval in the timeseries.
 # Training and prediction data must be resampled to this time step delta.
 TIME_STEP_INTERVAL = timedelta(hours=1)
 
-
-def to_unix_time(timestamp: datetime) -> int:
-    return time.mktime(timestamp.timetuple())
+# Number of input rows resampled at a time.
+CHUNK_SIZE = 100_000
+
+
+def to_unix_time(timestamps: pd.Series) -> pd.Series:
+    # Converts datetime64 values into seconds since the epoch.
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_convert(None)
+    return (timestamps - pd.Timestamp(0)) / pd.Timedelta(seconds=1)
+
+
+class FixedTimeStepResampler:
+    """Resamples chunks of a timeseries sorted by timestamp into fixed time steps.
+
+    Values within a time step are averaged, and time steps without values are
+    linearly interpolated. The time steps at the end of a chunk are held back
+    until the next chunk, since it can still add values to the last time step
+    or have the next value to interpolate missing time steps towards.
+    """
+
+    def __init__(self, names: list[str]) -> None:
+        self.names = [name for name in names if name != "timestamp"]
+        self.step_seconds = int(TIME_STEP_INTERVAL.total_seconds())
+        self.first_step: int | None = None
+        self.sums = np.zeros((0, len(self.names)))
+        self.counts = np.zeros((0, len(self.names)), dtype=np.int64)
+
+    def push(self, chunk: Mapping[str, np.ndarray]) -> pd.DataFrame:
+        """Adds a chunk and returns the time steps that are complete."""
+        timestamps = np.asarray(chunk["timestamp"], dtype=np.float64)
+        if len(timestamps) == 0:
+            return self._to_data_frame(0, np.zeros((0, len(self.names))))
+        steps = np.floor_divide(timestamps, self.step_seconds).astype(np.int64)
+        if self.first_step is None:
+            self.first_step = int(steps.min())
+        elif steps.min() < self.first_step:
+            raise ValueError("chunks must be sorted by timestamp")
+
+        # Accumulate the values of the chunk into the held back time steps.
+        num_steps = max(len(self.sums), int(steps.max()) - self.first_step + 1)
+        sums = np.zeros((num_steps, len(self.names)))
+        counts = np.zeros((num_steps, len(self.names)), dtype=np.int64)
+        sums[: len(self.sums)] = self.sums
+        counts[: len(self.counts)] = self.counts
+        indices = steps - self.first_step
+        for i, name in enumerate(self.names):
+            values = np.asarray(chunk[name], dtype=np.float64)
+            valid = ~np.isnan(values)
+            sums[:, i] += np.bincount(
+                indices[valid], weights=values[valid], minlength=num_steps
+            )
+            counts[:, i] += np.bincount(indices[valid], minlength=num_steps)
+
+        # Everything before the last time step that has all its values is
+        # complete, and that time step becomes the start of the next interpolation.
+        (complete,) = np.nonzero(np.all(counts[:-1] > 0, axis=1))
+        if len(complete) == 0 or complete[-1] == 0:
+            self.sums, self.counts = sums, counts
+            return self._to_data_frame(self.first_step, np.zeros((0, len(self.names))))
+        end = int(complete[-1])
+        values = self._interpolate(sums[: end + 1], counts[: end + 1])[:end]
+        data = self._to_data_frame(self.first_step, values)
+        self.first_step += end
+        self.sums, self.counts = sums[end:], counts[end:]
+        return data
+
+    def flush(self) -> pd.DataFrame:
+        """Returns all the remaining time steps."""
+        if self.first_step is None:
+            return self._to_data_frame(0, np.zeros((0, len(self.names))))
+        data = self._to_data_frame(
+            self.first_step, self._interpolate(self.sums, self.counts)
+        )
+        self.first_step += len(self.sums)
+        self.sums = np.zeros((0, len(self.names)))
+        self.counts = np.zeros((0, len(self.names)), dtype=np.int64)
+        return data
+
+    @staticmethod
+    def _interpolate(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        # Like `DataFrame.interpolate`, leading missing values stay missing and
+        # trailing missing values get the last value.
+        positions = np.arange(len(sums))
+        values = np.full(sums.shape, np.nan)
+        for i in range(sums.shape[1]):
+            (valid,) = np.nonzero(counts[:, i])
+            if len(valid) == 0:
+                continue
+            means = sums[valid, i] / counts[valid, i]
+            values[:, i] = np.interp(positions, valid, means)
+            values[: valid[0], i] = np.nan
+        return values
+
+    def _to_data_frame(self, first_step: int, values: np.ndarray) -> pd.DataFrame:
+        steps = np.arange(first_step, first_step + len(values), dtype=np.float64)
+        return pd.DataFrame(
+            {
+                "timestamp": steps * self.step_seconds,
+                **{name: values[:, i] for i, name in enumerate(self.names)},
+            }
+        )
 
 
-def with_fixed_time_steps(input_data: dict[str, np.ndarray]) -> pd.DataFrame:
-    return (
-        pd.DataFrame(input_data)
-        .assign(timestamp=lambda df: df["timestamp"].map(datetime.utcfromtimestamp))
-        .resample(TIME_STEP_INTERVAL, on="timestamp")
-        .mean()
-        .reset_index()
-        .assign(timestamp=lambda df: df["timestamp"].map(to_unix_time))
-        .interpolate()
+def with_fixed_time_steps(
+    input_data: Mapping[str, np.ndarray] | np.ndarray, chunk_size: int = CHUNK_SIZE
+) -> pd.DataFrame:
+    names = (
+        list(input_data.dtype.names)
+        if isinstance(input_data, np.ndarray)
+        else list(input_data)
     )
+    timestamps = np.asarray(input_data["timestamp"], dtype=np.float64)
+    order = np.argsort(timestamps, kind="stable")
+    resampler = FixedTimeStepResampler(names)
+    data = [
+        resampler.push(
+            {
+                name: np.asarray(input_data[name], dtype=np.float64)[indices]
+                for name in names
+            }
+        )
+        for indices in (
+            order[i : i + chunk_size] for i in range(0, len(order), chunk_size)
+        )
+    ]
+    data.append(resampler.flush())
+    return pd.concat(data, ignore_index=True)
 
 
 def read_data(data_file: str) -> pd.DataFrame:
     mmsi = os.path.splitext(os.path.basename(data_file))[0]
     with tf.io.gfile.GFile(data_file, "rb") as f:
-        return with_fixed_time_steps(np.load(f)["x"]).assign(
-            mmsi=lambda df: df["mmsi"].map(lambda _: int(mmsi)),
-        )
+        return with_fixed_time_steps(np.load(f)["x"]).assign(mmsi=int(mmsi))
 
 
 def read_labels(labels_file: str) -> pd.DataFrame:
@@ -62,8 +172,8 @@ def read_labels(labels_file: str) -> pd.DataFrame:
             pd.read_csv(f, parse_dates=["start_time", "end_time"])
             .astype({"mmsi": int})
             .assign(
-                start_time=lambda df: df["start_time"].map(to_unix_time),
-                end_time=lambda df: df["end_time"].map(to_unix_time),
+                start_time=lambda df: to_unix_time(df["start_time"]),
+                end_time=lambda df: to_unix_time(df["end_time"]),
             )
         )
 
@@ -88,30 +198,53 @@ def label_data(data: pd.DataFrame, labels: pd.DataFrame) -> pd.DataFrame:
     )
 
 
-def generate_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
-    # Pandas assigns NaN (Not-a-Number) if a value is missing.
-    # If is_fishing equals itself it means it's populated because (NaN != NaN).
-    # For the training data points, we only get points where we have a label.
+def generate_training_point_batches(
+    data: pd.DataFrame, batch_size: int = 1024
+) -> Iterable[dict[str, np.ndarray]]:
+    # The data frame is converted once into a contiguous float32 array.
+    # Every labeled row gets a window with the past `padding` rows and the
+    # row itself. The windows are views over the array, so they are only
+    # copied when a batch picks non-consecutive rows.
     padding = trainer.PADDING
-    training_point_indices = (
-        data[padding:].query("is_fishing == is_fishing").index.tolist()
-    )
-    for point_index in training_point_indices:
-        # For the inputs, we grab the past data and the data point itself.
-        inputs = (
-            data.drop(columns=["is_fishing"])
-            .loc[point_index - padding : point_index]
-            .to_dict("list")
-        )
-        # For the outputs, we only grab the label from the data point itself.
-        outputs = (
-            data[["is_fishing"]]
-            .loc[point_index:point_index]
-            .astype("int8")
-            .to_dict("list")
-        )
+    input_names = [name for name in data.columns if name != "is_fishing"]
+    inputs = np.ascontiguousarray(data[input_names].to_numpy(dtype=np.float32))
+    labels = data["is_fishing"].to_numpy(dtype=np.float32)
+    if len(inputs) <= padding:
+        return
 
-        yield {
-            name: np.reshape(values, (len(values), 1))
-            for name, values in {**inputs, **outputs}.items()
+    # windows[i] has shape (len(input_names), padding + 1) and ends at row i + padding.
+    windows = sliding_window_view(inputs, padding + 1, axis=0)
+
+    # Pandas assigns NaN (Not-a-Number) if a value is missing.
+    # For the training data points, we only get points where we have a label.
+    window_indices = np.flatnonzero(~np.isnan(labels[padding:]))
+    for start in range(0, len(window_indices), batch_size):
+        indices = window_indices[start : start + batch_size]
+        if indices[-1] - indices[0] + 1 == len(indices):
+            batch_windows = windows[indices[0] : indices[-1] + 1]
+        else:
+            batch_windows = windows[indices]
+
+        # Each input has shape (batch, padding + 1, 1) and the label (batch, 1, 1).
+        batch = {
+            name: batch_windows[:, i, :, np.newaxis]
+            for i, name in enumerate(input_names)
         }
+        batch["is_fishing"] = labels[indices + padding].astype(np.int8)[
+            :, np.newaxis, np.newaxis
+        ]
+        yield batch
+
+
+def generate_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
+    for batch in generate_training_point_batches(data):
+        for i in range(len(batch["is_fishing"])):
+            yield {name: values[i] for name, values in batch.items()}
+
+
+def train_eval_partition(
+    _: bytes, num_partitions: int, train_eval_split: list[int]
+) -> int:
+    # Defined here rather than as a lambda in the pipeline so that
+    # multi-process DirectRunner workers can import it.
+    return random.choices(range(num_partitions), train_eval_split)[0]
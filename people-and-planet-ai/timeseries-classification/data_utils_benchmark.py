@@ -0,0 +1,100 @@
+# Copyright 2021 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the training points generators on a synthetic vessel track.
+
+    python data_utils_benchmark.py --num-rows 100000
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_utils
+import trainer
+
+
+def pandas_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
+    # The previous implementation, which slices the data frame for every point.
+    padding = trainer.PADDING
+    training_point_indices = (
+        data[padding:].query("is_fishing == is_fishing").index.tolist()
+    )
+    for point_index in training_point_indices:
+        inputs = (
+            data.drop(columns=["is_fishing"])
+            .loc[point_index - padding : point_index]
+            .to_dict("list")
+        )
+        outputs = (
+            data[["is_fishing"]]
+            .loc[point_index:point_index]
+            .astype("int8")
+            .to_dict("list")
+        )
+        yield {
+            name: np.reshape(values, (len(values), 1))
+            for name, values in {**inputs, **outputs}.items()
+        }
+
+
+def numpy_training_points(data: pd.DataFrame) -> Iterable[dict[str, np.ndarray]]:
+    # Batches are consumed as a whole, like when they're written as TFRecords.
+    for batch in data_utils.generate_training_point_batches(data):
+        for _ in range(len(batch["is_fishing"])):
+            yield batch
+
+
+def synthetic_track(num_rows: int, labeled_ratio: float) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    is_fishing = rng.integers(0, 2, num_rows).astype(float)
+    is_fishing[rng.random(num_rows) > labeled_ratio] = np.nan
+    return pd.DataFrame(
+        {
+            "distance_from_port": rng.random(num_rows) * 1e5,
+            "speed": rng.random(num_rows) * 20,
+            "course": rng.random(num_rows) * 360,
+            "lat": rng.random(num_rows) * 180 - 90,
+            "lon": rng.random(num_rows) * 360 - 180,
+            "is_fishing": is_fishing,
+        }
+    )
+
+
+def benchmark(
+    name: str,
+    generator: Callable[[pd.DataFrame], Iterable[dict[str, np.ndarray]]],
+    data: pd.DataFrame,
+) -> None:
+    start = time.perf_counter()
+    num_points = sum(1 for _ in generator(data))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<8} {num_points} points in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-rows", type=int, default=100_000)
+    parser.add_argument("--labeled-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    data = synthetic_track(args.num_rows, args.labeled_ratio)
+    benchmark("numpy", numpy_training_points, data)
+    benchmark("pandas", pandas_training_points, data)
@@ -69,6 +69,40 @@ def test_serialize_deserialize() -> None:
         assert set(outputs.keys()) == set(trainer.OUTPUTS_SPEC.keys())
 
 
+def test_with_fixed_time_steps_chunks() -> None:
+    with open("test_data/56980685061237.npz", "rb") as f:
+        input_data = np.load(f)["x"]
+    data = data_utils.with_fixed_time_steps(input_data)
+    data_in_chunks = data_utils.with_fixed_time_steps(input_data, chunk_size=1)
+
+    pd.testing.assert_frame_equal(data, data_in_chunks)
+    assert not data.isna().any().any()
+    assert np.all(np.diff(data["timestamp"]) == 3600)
+
+
+def test_generate_training_point_batches() -> None:
+    unlabeled_data = data_utils.read_data("test_data/56980685061237.npz")
+    labels = data_utils.read_labels("test_data/labels.csv")
+    data = data_utils.label_data(unlabeled_data, labels)
+    batches = list(data_utils.generate_training_point_batches(data, batch_size=100))
+    training_points = list(data_utils.generate_training_points(data))
+
+    assert sum(len(batch["is_fishing"]) for batch in batches) == len(training_points)
+    for batch in batches[:-1]:
+        assert len(batch["is_fishing"]) == 100
+    for name, spec in {**trainer.INPUTS_SPEC, **trainer.OUTPUTS_SPEC}.items():
+        for batch in batches:
+            assert batch[name].shape[1:] == training_points[0][name].shape
+            assert spec.shape.is_compatible_with(batch[name].shape[1:])
+    first_index = data[trainer.PADDING :].query("is_fishing == is_fishing").index[0]
+    np.testing.assert_array_equal(
+        batches[0]["speed"][0, :, 0],
+        data["speed"]
+        .loc[first_index - trainer.PADDING : first_index]
+        .to_numpy(dtype=np.float32),
+    )
+
+
 @mock.patch.object(trainer, "PADDING", 2)
 def test_e2e_local() -> None:
     with tempfile.TemporaryDirectory() as temp_dir:
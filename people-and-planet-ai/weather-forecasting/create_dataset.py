@@ -33,6 +33,8 @@ import requests
 NUM_DATES = 100
 MAX_REQUESTS = 20  # default EE request quota
 MIN_BATCH_SIZE = 100
+POINTS_PER_BATCH = 50
+REQUESTS_PER_WORKER = 5  # concurrent EE requests from each worker
 
 # Constants.
 NUM_BINS = 10
@@ -94,6 +96,25 @@ def sample_points(date: datetime, num_bins: int = NUM_BINS) -> Iterator[tuple]:
         yield (date, point["geometry"]["coordinates"])
 
 
+def sample_point_batches(
+    date: datetime,
+    num_bins: int = NUM_BINS,
+    batch_size: int = POINTS_PER_BATCH,
+) -> Iterator[tuple]:
+    """Selects points like `sample_points`, grouped in batches of the same date.
+
+    Args:
+        date: The date of interest.
+        num_bins: Number of bins to bucketize values.
+        batch_size: Maximum number of points per batch.
+
+    Yields: (date, [lon_lat, ...]) pairs.
+    """
+    points = [point for (_, point) in sample_points(date, num_bins)]
+    for i in range(0, len(points), batch_size):
+        yield (date, points[i : i + batch_size])
+
+
 def get_training_example(
     date: datetime, point: tuple, patch_size: int = PATCH_SIZE
 ) -> tuple:
@@ -114,6 +135,44 @@ def get_training_example(
     )
 
 
+def get_training_examples(
+    date: datetime,
+    points: list[tuple],
+    max_requests: int = REQUESTS_PER_WORKER,
+    patch_size: int = PATCH_SIZE,
+) -> list[tuple]:
+    """Gets the (inputs, labels) training examples of many points of a date.
+
+    The patches of all the points are fetched concurrently.
+
+    Args:
+        date: The date of interest.
+        points: List of (longitude, latitude) coordinates.
+        max_requests: Limit the number of concurrent requests from this worker.
+        patch_size: Size in pixels of the surrounding square patch.
+
+    Returns: A list of (inputs, labels) pairs of NumPy arrays, one per point.
+    """
+    from weather import data
+
+    inputs = data.get_inputs_patches(date, points, patch_size, max_requests)
+    labels = data.get_labels_patches(date, points, patch_size, max_requests)
+    return list(zip(inputs, labels))
+
+
+def try_get_examples(
+    date: datetime, points: list[tuple], max_requests: int = REQUESTS_PER_WORKER
+) -> Iterator[tuple]:
+    """Wrapper over `get_training_examples` that falls back to fetching every point on its own if any of them fails."""
+    try:
+        yield from get_training_examples(date, points, max_requests)
+    except (requests.exceptions.HTTPError, ee.ee_exception.EEException) as e:
+        logging.warning(f"⚠️ failed to get {len(points)} examples: {date}")
+        logging.exception(e)
+        for point in points:
+            yield from try_get_example(date, point)
+
+
 def try_get_example(date: datetime, point: tuple) -> Iterator[tuple]:
     """Wrapper over `get_training_examples` that allows it to simply log errors instead of crashing."""
     try:
@@ -154,6 +213,8 @@ def run(
     This fetches data from Earth Engine and writes compressed NumPy files.
     We use `max_requests` to limit the number of concurrent requests to Earth Engine
     to avoid quota issues. You can request for an increas of quota if you need it.
+    Each worker makes up to `REQUESTS_PER_WORKER` concurrent requests, so the
+    number of workers is limited to keep the total within `max_requests`.
 
     Args:
         data_path: Directory path to save the data files.
@@ -167,19 +228,22 @@ def run(
         START_DATE + (END_DATE - START_DATE) * random.random() for _ in range(num_dates)
     ]
 
+    num_workers = max(max_requests // REQUESTS_PER_WORKER, 1)
+    requests_per_worker = max(max_requests // num_workers, 1)
     beam_options = PipelineOptions(
         beam_args,
         save_main_session=True,
-        direct_num_workers=max(max_requests, MAX_REQUESTS),  # direct runner
-        max_num_workers=max_requests,  # distributed runners
+        direct_num_workers=num_workers,  # direct runner
+        max_num_workers=num_workers,  # distributed runners
     )
     with beam.Pipeline(options=beam_options) as pipeline:
         (
             pipeline
             | "📆 Random dates" >> beam.Create(random_dates)
-            | "📌 Sample points" >> beam.FlatMap(sample_points, num_bins)
+            | "📌 Sample points" >> beam.FlatMap(sample_point_batches, num_bins)
             | "🃏 Reshuffle" >> beam.Reshuffle()
-            | "📑 Get example" >> beam.FlatMapTuple(try_get_example)
+            | "📑 Get examples"
+            >> beam.FlatMapTuple(try_get_examples, requests_per_worker)
             | "🗂️ Batch examples" >> beam.BatchElements(min_batch_size)
             | "📝 Write NPZ files" >> beam.Map(write_npz, data_path)
         )
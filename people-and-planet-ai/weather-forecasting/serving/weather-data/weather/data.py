@@ -19,8 +19,15 @@ trained on exactly the same data that will be used for predictions.
 
 from __future__ import annotations
 
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import lru_cache
+import hashlib
 import io
+import os
+import threading
 
 import ee
 from google.api_core import exceptions, retry
@@ -28,12 +35,18 @@ import google.auth
 import numpy as np
 from numpy.lib.recfunctions import structured_to_unstructured
 import requests
+from requests.adapters import HTTPAdapter
 
 # Constants.
 SCALE = 10000  # meters per pixel
 INPUT_HOUR_DELTAS = [-4, -2, 0]
 OUTPUT_HOUR_DELTAS = [2, 6]
 WINDOW = timedelta(days=1)
+MAX_REQUESTS = 20  # default EE request quota, per process
+MAX_CACHED_IMAGES = 256
+
+# Directory to cache the downloaded patches as NPY files, disabled if not set.
+CACHE_DIR = os.environ.get("WEATHER_DATA_CACHE_DIR")
 
 # Authenticate and initialize Earth Engine with the default credentials.
 credentials, project = google.auth.default(
@@ -135,6 +148,7 @@ def get_elevation() -> ee.Image:
     return ee.Image("MERIT/DEM/v1_0_3").rename("elevation").unmask(0).float()
 
 
+@lru_cache(maxsize=MAX_CACHED_IMAGES)
 def get_inputs_image(date: datetime) -> ee.Image:
     """Gets an Earth Engine image with all the inputs for the model.
 
@@ -150,6 +164,7 @@ def get_inputs_image(date: datetime) -> ee.Image:
     return ee.Image([precipitation, cloud_and_moisture, elevation])
 
 
+@lru_cache(maxsize=MAX_CACHED_IMAGES)
 def get_labels_image(date: datetime) -> ee.Image:
     """Gets an Earth Engine image with the labels to train the model.
 
@@ -177,6 +192,27 @@ def get_inputs_patch(date: datetime, point: tuple, patch_size: int) -> np.ndarra
     return structured_to_unstructured(patch)
 
 
+def get_inputs_patches(
+    date: datetime,
+    points: list[tuple],
+    patch_size: int,
+    max_requests: int = MAX_REQUESTS,
+) -> np.ndarray:
+    """Gets the patches of pixels for the inputs at many points concurrently.
+
+    Args:
+        date: The date of interest.
+        points: List of (longitude, latitude) coordinates.
+        patch_size: Size in pixels of the surrounding square patch.
+        max_requests: Maximum number of concurrent requests in this process.
+
+    Returns: The pixel values of the patches as a NumPy array, one per point.
+    """
+    image = get_inputs_image(date)
+    patches = get_patches(image, points, patch_size, SCALE, max_requests)
+    return np.stack([structured_to_unstructured(patch) for patch in patches])
+
+
 def get_labels_patch(date: datetime, point: tuple, patch_size: int) -> np.ndarray:
     """Gets the patch of pixels for the labels.
 
@@ -192,17 +228,168 @@ def get_labels_patch(date: datetime, point: tuple, patch_size: int) -> np.ndarra
     return structured_to_unstructured(patch)
 
 
+def get_labels_patches(
+    date: datetime,
+    points: list[tuple],
+    patch_size: int,
+    max_requests: int = MAX_REQUESTS,
+) -> np.ndarray:
+    """Gets the patches of pixels for the labels at many points concurrently.
+
+    Args:
+        date: The date of interest.
+        points: List of (longitude, latitude) coordinates.
+        patch_size: Size in pixels of the surrounding square patch.
+        max_requests: Maximum number of concurrent requests in this process.
+
+    Returns: The pixel values of the patches as a NumPy array, one per point.
+    """
+    image = get_labels_image(date)
+    patches = get_patches(image, points, patch_size, SCALE, max_requests)
+    return np.stack([structured_to_unstructured(patch) for patch in patches])
+
+
+class AdaptiveRateLimiter:
+    """Limits the number of concurrent requests to Earth Engine.
+
+    The limit is halved every time a request gets "429: Too Many Requests",
+    and it grows by one after as many consecutive successful requests as the
+    current limit, up to `max_requests`.
+    """
+
+    def __init__(self, max_requests: int) -> None:
+        self.max_requests = max_requests
+        self.limit = max_requests
+        self.in_flight = 0
+        self.successes = 0
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def request(self) -> Iterator[None]:
+        """Waits until a request is allowed and holds it while in the context."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def throttled(self) -> None:
+        """Reduces the limit after a "429: Too Many Requests" error."""
+        with self.condition:
+            self.limit = max(1, self.limit // 2)
+            self.successes = 0
+
+    def succeeded(self) -> None:
+        """Increases the limit after enough consecutive successful requests."""
+        with self.condition:
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_requests:
+                self.limit += 1
+                self.successes = 0
+                self.condition.notify_all()
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(max_requests: int) -> AdaptiveRateLimiter:
+    """Gets the rate limiter shared by all the threads of this process.
+
+    Args:
+        max_requests: Maximum number of concurrent requests in this process.
+
+    Returns: An AdaptiveRateLimiter.
+    """
+    return AdaptiveRateLimiter(max_requests)
+
+
+# A single session, so connections are reused across all the downloads.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_maxsize=MAX_REQUESTS))
+
+
+def get_session() -> requests.Session:
+    """Gets the HTTP session shared by all the threads of this process.
+
+    Returns: A requests Session.
+    """
+    return _session
+
+
+def get_cache_path(
+    image: ee.Image, point: tuple, patch_size: int, scale: int
+) -> str | None:
+    """Gets the file path of a cached patch.
+
+    The patch is identified by the serialized Earth Engine image graph,
+    the point, the patch size and the scale.
+
+    Args:
+        image: Image to get the patch from.
+        point: A (longitude, latitude) pair for the point of interest.
+        patch_size: Size in pixels of the surrounding square patch.
+        scale: Number of meters per pixel.
+
+    Returns: The path of the NPY file, or None if caching is disabled.
+    """
+    if not CACHE_DIR:
+        return None
+    key = f"{image.serialize()}|{tuple(point)}|{patch_size}|{scale}"
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.npy")
+
+
+def get_patches(
+    image: ee.Image,
+    points: list[tuple],
+    patch_size: int,
+    scale: int,
+    max_requests: int = MAX_REQUESTS,
+) -> list[np.ndarray]:
+    """Fetches patches of pixels for many points concurrently.
+
+    The number of requests in flight is limited by the adaptive rate limiter
+    shared by all the threads of this process, up to `max_requests`.
+
+    Args:
+        image: Image to get the patches from.
+        points: List of (longitude, latitude) pairs for the points of interest.
+        patch_size: Size in pixels of the surrounding square patch.
+        scale: Number of meters per pixel.
+        max_requests: Maximum number of concurrent requests in this process.
+
+    Returns: The requested patches in the same order as the points.
+    """
+    with ThreadPoolExecutor(max_requests) as executor:
+        return list(
+            executor.map(
+                lambda point: get_patch(image, point, patch_size, scale, max_requests),
+                points,
+            )
+        )
+
+
 @retry.Retry()
-def get_patch(image: ee.Image, point: tuple, patch_size: int, scale: int) -> np.ndarray:
+def get_patch(
+    image: ee.Image,
+    point: tuple,
+    patch_size: int,
+    scale: int,
+    max_requests: int = MAX_REQUESTS,
+) -> np.ndarray:
     """Fetches a patch of pixels from Earth Engine.
 
     It retries if we get error "429: Too Many Requests".
+    If `CACHE_DIR` is set, the patch is read from or saved to the local cache.
 
     Args:
         image: Image to get the patch from.
         point: A (longitude, latitude) pair for the point of interest.
         patch_size: Size in pixels of the surrounding square patch.
         scale: Number of meters per pixel.
+        max_requests: Maximum number of concurrent requests in this process.
 
     Raises:
         requests.exceptions.RequestException
@@ -211,21 +398,38 @@ def get_patch(image: ee.Image, point: tuple, patch_size: int, scale: int) -> np.
         The requested patch of pixels as a structured
         NumPy array with shape (width, height).
     """
+    cache_path = get_cache_path(image, point, patch_size, scale)
+    if cache_path and os.path.exists(cache_path):
+        return np.load(cache_path, allow_pickle=True)
+
+    rate_limiter = get_rate_limiter(max_requests)
     geometry = ee.Geometry.Point(point)
-    url = image.getDownloadURL(
-        {
-            "region": geometry.buffer(scale * patch_size / 2, 1).bounds(1),
-            "dimensions": [patch_size, patch_size],
-            "format": "NPY",
-        }
-    )
+    with rate_limiter.request():
+        url = image.getDownloadURL(
+            {
+                "region": geometry.buffer(scale * patch_size / 2, 1).bounds(1),
+                "dimensions": [patch_size, patch_size],
+                "format": "NPY",
+            }
+        )
+        response = get_session().get(url)
 
     # If we get "429: Too Many Requests" errors, it's safe to retry the request.
     # The Retry library only works with `google.api_core` exceptions.
-    response = requests.get(url)
     if response.status_code == 429:
+        rate_limiter.throttled()
         raise exceptions.TooManyRequests(response.text)
 
     # Still raise any other exceptions to make sure we got valid data.
     response.raise_for_status()
-    return np.load(io.BytesIO(response.content), allow_pickle=True)
+    rate_limiter.succeeded()
+    patch = np.load(io.BytesIO(response.content), allow_pickle=True)
+
+    if cache_path:
+        # Write to a temporary file first so readers never see a partial file.
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, patch, allow_pickle=True)
+        os.replace(temp_path, cache_path)
+    return patch
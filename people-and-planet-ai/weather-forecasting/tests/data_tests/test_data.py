@@ -0,0 +1,151 @@
+# Copyright 2023 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import io
+from types import ModuleType
+from unittest import mock
+
+import numpy as np
+import pytest
+
+PATCH_SIZE = 3
+DTYPE = [("band_1", np.float32), ("band_2", np.float32)]
+
+
+@pytest.fixture(scope="module")
+def data() -> Iterable[ModuleType]:
+    # Importing the module authenticates and initializes Earth Engine.
+    with mock.patch("google.auth.default", return_value=(mock.Mock(), "project")):
+        with mock.patch("ee.Initialize"):
+            from weather import data
+
+            yield data
+
+
+@pytest.fixture
+def image() -> mock.Mock:
+    image = mock.Mock()
+    image.serialize.return_value = "serialized image graph"
+    image.getDownloadURL.return_value = "https://earthengine.googleapis.com/npy"
+    return image
+
+
+@pytest.fixture
+def session(data: ModuleType, monkeypatch: pytest.MonkeyPatch) -> Iterable[mock.Mock]:
+    session = mock.Mock()
+    session.get.return_value = npy_response(1.0)
+    monkeypatch.setattr(data, "get_session", lambda: session)
+    monkeypatch.setattr(data.ee, "Geometry", mock.Mock())
+    yield session
+    data.get_rate_limiter.cache_clear()
+
+
+def structured_patch(value: float) -> np.ndarray:
+    return np.full((PATCH_SIZE, PATCH_SIZE), value, dtype=DTYPE)
+
+
+def npy_response(value: float) -> mock.Mock:
+    f = io.BytesIO()
+    np.save(f, structured_patch(value))
+    return mock.Mock(status_code=200, content=f.getvalue())
+
+
+def test_get_patch_cache(
+    data: ModuleType,
+    image: mock.Mock,
+    session: mock.Mock,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: str,
+) -> None:
+    monkeypatch.setattr(data, "CACHE_DIR", str(tmp_path))
+
+    # Cache miss: the patch is downloaded and saved.
+    patch = data.get_patch(image, (-77.9, 25.2), PATCH_SIZE, data.SCALE)
+    np.testing.assert_array_equal(patch, structured_patch(1.0))
+    assert session.get.call_count == 1
+
+    # Cache hit: the patch is read from the cache.
+    session.get.return_value = npy_response(2.0)
+    patch = data.get_patch(image, (-77.9, 25.2), PATCH_SIZE, data.SCALE)
+    np.testing.assert_array_equal(patch, structured_patch(1.0))
+    assert session.get.call_count == 1
+
+    # Another point is a cache miss.
+    patch = data.get_patch(image, (-78.0, 25.2), PATCH_SIZE, data.SCALE)
+    np.testing.assert_array_equal(patch, structured_patch(2.0))
+    assert session.get.call_count == 2
+
+
+def test_get_patch_too_many_requests(
+    data: ModuleType, image: mock.Mock, session: mock.Mock
+) -> None:
+    session.get.side_effect = [
+        mock.Mock(status_code=429, text="Too Many Requests"),
+        npy_response(1.0),
+    ]
+
+    patch = data.get_patch(image, (-77.9, 25.2), PATCH_SIZE, data.SCALE, 4)
+    np.testing.assert_array_equal(patch, structured_patch(1.0))
+    assert session.get.call_count == 2
+    # The 429 error halved the number of concurrent requests.
+    assert data.get_rate_limiter(4).limit == 2
+
+
+def test_adaptive_rate_limiter(data: ModuleType) -> None:
+    limiter = data.AdaptiveRateLimiter(4)
+    limiter.throttled()
+    limiter.throttled()
+    limiter.throttled()
+    assert limiter.limit == 1
+
+    # The limit grows by one after as many successes as the current limit.
+    limiter.succeeded()
+    assert limiter.limit == 2
+    limiter.succeeded()
+    assert limiter.limit == 2
+    limiter.succeeded()
+    assert limiter.limit == 3
+    for _ in range(10):
+        limiter.succeeded()
+    assert limiter.limit == 4
+
+
+def test_get_inputs_patches(data: ModuleType, monkeypatch: pytest.MonkeyPatch) -> None:
+    def get_patch(
+        image: mock.Mock, point: tuple, patch_size: int, scale: int, max_requests: int
+    ) -> np.ndarray:
+        assert max_requests == 3
+        return structured_patch(point[0])
+
+    monkeypatch.setattr(data, "get_inputs_image", lambda date: mock.Mock())
+    monkeypatch.setattr(data, "get_patch", get_patch)
+
+    points = [(float(i), 0.0) for i in range(10)]
+    date = datetime(2019, 9, 2, 18)
+    patches = data.get_inputs_patches(date, points, PATCH_SIZE, max_requests=3)
+    assert patches.shape == (10, PATCH_SIZE, PATCH_SIZE, 2)
+    # The patches are in the same order as the points.
+    assert list(patches[:, 0, 0, 0]) == [float(i) for i in range(10)]
+
+
+def test_get_session(data: ModuleType) -> None:
+    # All the threads share a session, so connections are reused across batches.
+    with ThreadPoolExecutor(2) as executor:
+        sessions = list(executor.map(lambda _: data.get_session(), range(2)))
+    assert sessions[0] is sessions[1] is data.get_session()
@@ -83,9 +83,12 @@ class WriteToGCS(DoFn):
         shard_id, batch = key_value
         filename = "-".join([self.output_path, window_start, window_end, str(shard_id)])
 
+        # Encode the whole batch first to upload it with a single write.
+        data = "".join(
+            f"{message_body},{publish_time}\n" for message_body, publish_time in batch
+        ).encode()
         with io.gcsio.GcsIO().open(filename=filename, mode="w") as f:
-            for message_body, publish_time in batch:
-                f.write(f"{message_body},{publish_time}\n".encode())
+            f.write(data)
 
 
 def run(input_topic, output_path, window_size=1.0, num_shards=5, pipeline_args=None):
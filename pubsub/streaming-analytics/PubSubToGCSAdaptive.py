@@ -0,0 +1,232 @@
+# Copyright 2026 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A variant of PubSubToGCS.py that picks the number of shards of each window
+from its number of messages, and can write gzip or Avro files.
+
+The module is self-contained, so that its DoFns can be pickled with
+`save_main_session` like the ones of PubSubToGCS.py.
+"""
+
+import argparse
+from datetime import datetime
+import gzip
+import io
+import logging
+import math
+import random
+
+from apache_beam import (
+    CombineGlobally,
+    DoFn,
+    GroupByKey,
+    Map,
+    ParDo,
+    Pipeline,
+    PTransform,
+    WindowInto,
+)
+from apache_beam.io import ReadFromPubSub
+from apache_beam.io.gcp.gcsio import GcsIO
+from apache_beam.options.pipeline_options import PipelineOptions
+from apache_beam.pvalue import AsSingleton
+from apache_beam.transforms.combiners import CountCombineFn
+from apache_beam.transforms.window import FixedWindows
+import fastavro
+
+AVRO_SCHEMA = fastavro.parse_schema(
+    {
+        "type": "record",
+        "name": "Message",
+        "fields": [
+            {"name": "message_body", "type": "string"},
+            {"name": "publish_time", "type": "string"},
+        ],
+    }
+)
+FILE_EXTENSIONS = {"text": "", "gzip": ".gz", "avro": ".avro"}
+
+
+class GroupMessagesByAdaptiveShards(PTransform):
+    """A composite transform that groups Pub/Sub messages based on publish time,
+    like GroupMessagesByFixedWindows in PubSubToGCS.py, using one shard per
+    `elements_per_shard` messages in each window, up to `max_shards` shards.
+    """
+
+    def __init__(self, window_size, max_shards=5, elements_per_shard=10000):
+        # Set window size to 60 seconds.
+        self.window_size = int(window_size * 60)
+        self.max_shards = max_shards
+        self.elements_per_shard = elements_per_shard
+
+    def expand(self, pcoll):
+        windowed = (
+            pcoll
+            | "Window into fixed intervals"
+            >> WindowInto(FixedWindows(self.window_size))
+            | "Add timestamp to windowed elements" >> ParDo(AddTimestamp())
+        )
+        # Count the elements of each window to pick its number of shards.
+        window_counts = (
+            windowed
+            | "Count per window" >> CombineGlobally(CountCombineFn()).without_defaults()
+        )
+        return (
+            windowed
+            | "Add adaptive key"
+            >> Map(
+                add_adaptive_key,
+                window_count=AsSingleton(window_counts),
+                elements_per_shard=self.elements_per_shard,
+                max_shards=self.max_shards,
+            )
+            | "Group by key" >> GroupByKey()
+        )
+
+
+def add_adaptive_key(element, window_count, elements_per_shard, max_shards):
+    """Assigns a random shard key, using one shard per `elements_per_shard`
+    elements in the window, between 1 and `max_shards` shards.
+    """
+    num_shards = min(max(math.ceil(window_count / elements_per_shard), 1), max_shards)
+    return random.randint(0, num_shards - 1), element
+
+
+class AddTimestamp(DoFn):
+    def process(self, element, publish_time=DoFn.TimestampParam):
+        """Processes each windowed element by extracting the message body and its
+        publish time into a tuple.
+        """
+        yield (
+            element.decode("utf-8"),
+            datetime.utcfromtimestamp(float(publish_time)).strftime(
+                "%Y-%m-%d %H:%M:%S.%f"
+            ),
+        )
+
+
+def encode_batch(batch, output_format="text"):
+    """Encodes all the messages in a batch into a single buffer."""
+    if output_format == "avro":
+        buffer = io.BytesIO()
+        records = (
+            {"message_body": message_body, "publish_time": publish_time}
+            for message_body, publish_time in batch
+        )
+        fastavro.writer(buffer, AVRO_SCHEMA, records, codec="deflate")
+        return buffer.getvalue()
+
+    data = "".join(
+        f"{message_body},{publish_time}\n" for message_body, publish_time in batch
+    ).encode()
+    if output_format == "gzip":
+        return gzip.compress(data)
+    return data
+
+
+class WriteBatchToGCS(DoFn):
+    def __init__(self, output_path, output_format="text"):
+        self.output_path = output_path
+        self.output_format = output_format
+
+    def process(self, key_value, window=DoFn.WindowParam):
+        """Write messages in a batch to Google Cloud Storage."""
+
+        ts_format = "%H:%M"
+        window_start = window.start.to_utc_datetime().strftime(ts_format)
+        window_end = window.end.to_utc_datetime().strftime(ts_format)
+        shard_id, batch = key_value
+        filename = "-".join([self.output_path, window_start, window_end, str(shard_id)])
+        filename += FILE_EXTENSIONS[self.output_format]
+
+        # Encode the whole batch first to upload it with a single write.
+        data = encode_batch(batch, self.output_format)
+        with GcsIO().open(filename=filename, mode="w") as f:
+            f.write(data)
+
+
+def run(
+    input_topic,
+    output_path,
+    window_size=1.0,
+    max_shards=5,
+    elements_per_shard=10000,
+    output_format="text",
+    pipeline_args=None,
+):
+    # Set `save_main_session` to True so DoFns can access globally imported modules.
+    pipeline_options = PipelineOptions(
+        pipeline_args, streaming=True, save_main_session=True
+    )
+
+    with Pipeline(options=pipeline_options) as pipeline:
+        (
+            pipeline
+            | "Read from Pub/Sub" >> ReadFromPubSub(topic=input_topic)
+            | "Window into"
+            >> GroupMessagesByAdaptiveShards(
+                window_size, max_shards, elements_per_shard
+            )
+            | "Write to GCS" >> ParDo(WriteBatchToGCS(output_path, output_format))
+        )
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.INFO)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_topic",
+        help="The Cloud Pub/Sub topic to read from."
+        '"projects/<PROJECT_ID>/topics/<TOPIC_ID>".',
+    )
+    parser.add_argument(
+        "--window_size",
+        type=float,
+        default=1.0,
+        help="Output file's window size in minutes.",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="Path of the output GCS file including the prefix.",
+    )
+    parser.add_argument(
+        "--max_shards",
+        type=int,
+        default=5,
+        help="Maximum number of shards to use when writing a window to GCS.",
+    )
+    parser.add_argument(
+        "--elements_per_shard",
+        type=int,
+        default=10000,
+        help="Number of elements of a window per shard.",
+    )
+    parser.add_argument(
+        "--output_format",
+        choices=["text", "gzip", "avro"],
+        default="text",
+        help="Format of the output files.",
+    )
+    known_args, pipeline_args = parser.parse_known_args()
+
+    run(
+        known_args.input_topic,
+        known_args.output_path,
+        known_args.window_size,
+        known_args.max_shards,
+        known_args.elements_per_shard,
+        known_args.output_format,
+        pipeline_args,
+    )
@@ -0,0 +1,65 @@
+# Copyright 2026 Google LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import io
+
+from apache_beam import Create, Map
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that
+from apache_beam.transforms.window import TimestampedValue
+import fastavro
+
+
+import PubSubToGCSAdaptive
+
+
+def test_group_messages_by_adaptive_shards():
+    def check_shards(groups):
+        # 5 messages in the window, with 2 per shard, use up to 3 shards.
+        assert sorted(m for _, batch in groups for m, _ in batch) == list("abcde")
+        assert {shard_id for shard_id, _ in groups} <= {0, 1, 2}
+
+    with TestPipeline() as p:
+        groups = (
+            p
+            | Create([TimestampedValue(m.encode(), 1575937195) for m in "abcde"])
+            | PubSubToGCSAdaptive.GroupMessagesByAdaptiveShards(
+                window_size=1, max_shards=5, elements_per_shard=2
+            )
+            | Map(lambda kv: (kv[0], list(kv[1])))
+        )
+        assert_that(groups, check_shards)
+
+
+def test_add_adaptive_key():
+    for window_count, max_shard in [(1, 0), (2500, 2), (10**6, 4)]:
+        keys = {
+            PubSubToGCSAdaptive.add_adaptive_key("x", window_count, 1000, 5)[0]
+            for _ in range(200)
+        }
+        assert min(keys) >= 0
+        assert max(keys) == max_shard
+
+
+def test_encode_batch():
+    batch = [("a", "2019-12-10 00:19:55.000000"), ("b", "2019-12-10 00:20:25.000000")]
+    text = "a,2019-12-10 00:19:55.000000\nb,2019-12-10 00:20:25.000000\n".encode()
+
+    assert PubSubToGCSAdaptive.encode_batch(batch) == text
+    assert gzip.decompress(PubSubToGCSAdaptive.encode_batch(batch, "gzip")) == text
+
+    data = PubSubToGCSAdaptive.encode_batch(batch, "avro")
+    records = fastavro.reader(io.BytesIO(data))
+    assert [(r["message_body"], r["publish_time"]) for r in records] == batch
@@ -14,6 +14,7 @@
 
 import json
 import os
+from unittest import mock
 
 import pytest
 
@@ -54,3 +55,29 @@ def test_missing_upstream_url(client):
     )
     assert r.status_code == 500
     assert "EDITOR_UPSTREAM_RENDER_URL missing" in r.data.decode()
+
+
+def test_session_reused(monkeypatch):
+    import render
+
+    fetched = []
+
+    def fetch_id_token_credentials(audience, request):
+        fetched.append(audience)
+        return mock.Mock()
+
+    monkeypatch.setattr(
+        render.google.oauth2.id_token,
+        "fetch_id_token_credentials",
+        fetch_id_token_credentials,
+    )
+    monkeypatch.setattr(render, "_sessions", {})
+    monkeypatch.setenv("EDITOR_UPSTREAM_RENDER_URL", "http://testing.local")
+
+    session = render.get_session("http://testing.local")
+    session.post = mock.Mock(return_value=mock.Mock(content=b"<p>html</p>"))
+
+    assert render.new_request("markdown") == b"<p>html</p>"
+    assert render.new_request("markdown") == b"<p>html</p>"
+    assert fetched == ["http://testing.local"]
+    assert session.post.call_count == 2
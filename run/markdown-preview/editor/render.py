@@ -14,11 +14,39 @@
 
 # [START cloudrun_secure_request]
 import os
-import urllib
+import threading
 
 import google.auth.transport.requests
 import google.oauth2.id_token
 
+# Sessions by target audience, reused across requests.
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(target_audience):
+    """Returns an HTTP session with IAM ID Token credentials for an audience.
+
+    The session keeps its connections alive, and caches the ID token until
+    shortly before it expires.
+
+    Args:
+        target_audience: URL of the service to send requests to
+
+    Returns:
+        A requests.Session that adds the ID token to its requests
+    """
+    with _sessions_lock:
+        session = _sessions.get(target_audience)
+        if session is None:
+            auth_req = google.auth.transport.requests.Request()
+            credentials = google.oauth2.id_token.fetch_id_token_credentials(
+                target_audience, auth_req
+            )
+            session = google.auth.transport.requests.AuthorizedSession(credentials)
+            _sessions[target_audience] = session
+        return session
+
 
 def new_request(data):
     """Creates a new HTTP request with IAM ID Token credential.
@@ -35,15 +63,9 @@ def new_request(data):
     if not url:
         raise Exception("EDITOR_UPSTREAM_RENDER_URL missing")
 
-    req = urllib.request.Request(url, data=data.encode())
-    auth_req = google.auth.transport.requests.Request()
-    target_audience = url
-
-    id_token = google.oauth2.id_token.fetch_id_token(auth_req, target_audience)
-    req.add_header("Authorization", f"Bearer {id_token}")
-
-    response = urllib.request.urlopen(req)
-    return response.read()
+    response = get_session(url).post(url, data=data.encode())
+    response.raise_for_status()
+    return response.content
 
 
 # [END cloudrun_secure_request]
@@ -12,29 +12,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+import hashlib
 import os
+import threading
 
 import bleach
 from flask import Flask, request
 import markdown
 
-
 app = Flask(__name__)
 
+# Number of rendered documents kept in memory.
+CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", 1024))
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
 
-@app.route("/", methods=["POST"])
-def index():
-    """Parses the markdown and outputs the formatted HTML"""
-    data = request.get_data(as_text=True)
+
+def render(data):
+    """Converts markdown to sanitized HTML."""
     html = markdown.markdown(data)
 
     # Keep the paragraph tags
     allowed_tags = list(bleach.sanitizer.ALLOWED_TAGS) + ["p"]
     # Sanitize and return
-    clean = bleach.clean(html, strip=True, tags=allowed_tags)
+    return bleach.clean(html, strip=True, tags=allowed_tags)
+
+
+def cached_render(data):
+    """Renders markdown, reusing the HTML of recently rendered documents."""
+    key = hashlib.sha256(data.encode()).digest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    clean = render(data)
+    with _cache_lock:
+        _cache[key] = clean
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
     return clean
 
 
+@app.route("/", methods=["POST"])
+def index():
+    """Parses the markdown and outputs the formatted HTML"""
+    data = request.get_data(as_text=True)
+    return cached_render(data)
+
+
 if __name__ == "__main__":
     PORT = int(os.getenv("PORT")) if os.getenv("PORT") else 8080
 
@@ -35,3 +35,20 @@ def test_markdown_handler(client):
     r = client.post("/", data=data_input)
     assert r.status_code == 200
     assert expect in r.data.decode()
+
+
+def test_cached_render(client, monkeypatch):
+    renders = []
+    render = main.render
+
+    def counting_render(data):
+        renders.append(data)
+        return render(data)
+
+    monkeypatch.setattr(main, "render", counting_render)
+    monkeypatch.setattr(main, "_cache", main.OrderedDict())
+
+    for _ in range(2):
+        r = client.post("/", data="*cached text*")
+        assert r.data.decode() == "<p><em>cached text</em></p>"
+    assert renders == ["*cached text*"]
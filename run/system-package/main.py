@@ -12,26 +12,161 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import OrderedDict
+from concurrent.futures import Future
+import hashlib
 import os
 import subprocess
+import tempfile
+import threading
 
 from flask import Flask, make_response, request
 
-
 app = Flask(__name__)
 
 
 # [START cloudrun_system_package_handler]
+# Maximum size of the rendered diagrams kept in memory.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Optional directory for a second cache tier, like a local disk or a
+# Cloud Storage bucket mounted as a volume, shared by all the instances.
+CACHE_DIR = os.getenv("CACHE_DIR")
+# Diagrams only depend on their DOT source, so clients can cache them.
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", 24 * 60 * 60))
+
+# Number of requests served at once, as set by `--threads` in the Dockerfile.
+THREADS = int(os.getenv("THREADS", 8))
+# By default, renders use at most half of the threads, so that the others
+# still serve cached diagrams while the instance is overloaded.
+MAX_RENDERS = max(THREADS // 2, 1)
+# Number of `dot` processes running at once.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", min(os.cpu_count() or 1, MAX_RENDERS)))
+# Number of renders waiting for a worker before new requests are rejected.
+RENDER_QUEUE_SIZE = int(
+    os.getenv("RENDER_QUEUE_SIZE", max(MAX_RENDERS - RENDER_WORKERS, 0))
+)
+
+
+class OverloadedError(Exception):
+    pass
+
+
+class DiagramCache:
+    """LRU cache of rendered diagrams, keyed by the hash of their DOT source.
+
+    Diagrams evicted from memory are still found in `directory`, if set.
+    """
+
+    def __init__(self, max_bytes, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+        if self.directory:
+            try:
+                with open(os.path.join(self.directory, f"{key}.png"), "rb") as f:
+                    image = f.read()
+            except FileNotFoundError:
+                return None
+            self._put_in_memory(key, image)
+        return image
+
+    def put(self, key, image):
+        self._put_in_memory(key, image)
+        if self.directory:
+            # Write to a temporary file first, so readers never get a partial file.
+            fd, temp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(image)
+            os.replace(temp_path, os.path.join(self.directory, f"{key}.png"))
+
+    def _put_in_memory(self, key, image):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._size -= len(self._images.pop(key))
+            self._images[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class RenderPool:
+    """Runs up to `workers` renders at once, with up to `queue_size` renders
+    waiting. Concurrent renders of the same diagram are only run once.
+    """
+
+    def __init__(self, workers, queue_size):
+        self.max_pending = workers + queue_size
+        self._workers = threading.Semaphore(workers)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def render(self, key, dot):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                if len(self._pending) >= self.max_pending:
+                    raise OverloadedError("too many diagrams waiting to be rendered")
+                future = self._pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            with self._workers:
+                future.set_result(create_diagram(dot))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._pending[key]
+        return future.result()
+
+
+cache = DiagramCache(CACHE_MAX_BYTES, CACHE_DIR)
+render_pool = RenderPool(RENDER_WORKERS, RENDER_QUEUE_SIZE)
+
+
+def get_diagram(dot):
+    """Returns the rendered diagram of a DOT source and its cache key."""
+    key = hashlib.sha256((dot or "").encode("utf-8")).hexdigest()
+    image = cache.get(key)
+    if image is None:
+        image = render_pool.render(key, dot)
+        cache.put(key, image)
+    return image, key
+
+
 @app.route("/diagram.png", methods=["GET"])
 def index():
     """Takes an HTTP GET request with query param dot and
     returns a png with the rendered DOT diagram in a HTTP response.
     """
     try:
-        image = create_diagram(request.args.get("dot"))
+        image, key = get_diagram(request.args.get("dot"))
         response = make_response(image)
         response.headers.set("Content-Type", "image/png")
-        return response
+        response.headers.set("Cache-Control", f"public, max-age={CACHE_MAX_AGE}")
+        response.set_etag(key)
+        # Returns 304 Not Modified if the client has this diagram already.
+        return response.make_conditional(request)
+
+    except OverloadedError as e:
+        print(f"error: {e}")
+        return "Service Unavailable", 503, {"Retry-After": "1"}
 
     except Exception as e:
         print(f"error: {e}")
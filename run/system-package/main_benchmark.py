@@ -0,0 +1,65 @@
+# Copyright 2019 Google, LLC.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares the latency of cached and uncached diagram requests.
+
+Requests are sent concurrently to the app with the Flask test client, so
+the `dot` binary from Graphviz must be installed.
+
+    python main_benchmark.py --requests 200 --concurrency 8
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+
+import main
+
+DOT = "digraph G {{ A -> {{B, C, D}} -> {{F}} -> N{} }}"
+
+
+def timed_get(client, url):
+    start = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - start
+    return elapsed, response.status_code
+
+
+def benchmark(name, urls, concurrency):
+    client = main.app.test_client()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: timed_get(client, url), urls))
+    latencies = [elapsed * 1000 for elapsed, status in results if status == 200]
+    percentiles = statistics.quantiles(latencies, n=100)
+    rejected = sum(1 for _, status in results if status == 503)
+    print(
+        f"{name:<10} p50={percentiles[49]:7.2f}ms  p99={percentiles[98]:7.2f}ms  "
+        f"rejected={rejected}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    # Every request renders a different diagram.
+    uncached = [f"/diagram.png?dot={DOT.format(i)}" for i in range(args.requests)]
+    # Every request gets the same diagram, rendered once.
+    cached = [f"/diagram.png?dot={DOT.format('cached')}"] * args.requests
+
+    benchmark("uncached", uncached, args.concurrency)
+    benchmark("cached", cached, args.concurrency)
@@ -14,6 +14,9 @@
 
 # NOTE:
 # To pass these tests locally, run `brew install graphviz`
+import subprocess
+import threading
+
 import pytest
 
 import main
@@ -43,3 +46,110 @@ def test_bad_dot_parameter(client):
 def test_good_dot_parameter(client):
     r = client.get("/diagram.png?dot=digraph G { A -> {B, C, D} -> {F} }")
     assert r.content_type == "image/png"
+
+
+@pytest.fixture
+def fake_dot(monkeypatch):
+    renders = []
+
+    def run(args, input, stdout):
+        renders.append(input)
+        return subprocess.CompletedProcess(args, 0, stdout=b"PNG" + input)
+
+    monkeypatch.setattr(main.subprocess, "run", run)
+    monkeypatch.setattr(main, "cache", main.DiagramCache(1024))
+    return renders
+
+
+def test_cached_diagram(client, fake_dot):
+    r = client.get("/diagram.png?dot=digraph G { A -> B }")
+    assert r.status_code == 200
+    assert r.headers["Cache-Control"].startswith("public, max-age=")
+    etag = r.headers["ETag"]
+
+    r = client.get("/diagram.png?dot=digraph G { A -> B }")
+    assert r.data == b"PNGdigraph G { A -> B }"
+    assert len(fake_dot) == 1
+
+    r = client.get(
+        "/diagram.png?dot=digraph G { A -> B }", headers={"If-None-Match": etag}
+    )
+    assert r.status_code == 304
+
+
+def test_cache_eviction_and_directory(tmp_path):
+    cache = main.DiagramCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"123456")
+    assert cache.get("a") is None
+    assert cache.get("b") == b"123456"
+
+    # Evicted diagrams are still found in the directory.
+    cache = main.DiagramCache(max_bytes=10, directory=str(tmp_path))
+    cache.put("a", b"12345")
+    cache.put("b", b"123456")
+    assert cache.get("a") == b"12345"
+
+
+def test_overloaded(client, fake_dot, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_create_diagram(dot):
+        started.set()
+        release.wait()
+        return b"PNG"
+
+    monkeypatch.setattr(main, "create_diagram", slow_create_diagram)
+    monkeypatch.setattr(main, "render_pool", main.RenderPool(workers=1, queue_size=0))
+    thread = threading.Thread(target=client.get, args=("/diagram.png?dot=A",))
+    thread.start()
+    started.wait()
+
+    r = client.get("/diagram.png?dot=B")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+    release.set()
+    thread.join()
+
+
+def test_overloaded_by_default(client, fake_dot, monkeypatch):
+    release = threading.Event()
+
+    def slow_create_diagram(dot):
+        release.wait()
+        return b"PNG"
+
+    # The default pool rejects renders before all the server threads are busy.
+    render_pool = main.RenderPool(main.RENDER_WORKERS, main.RENDER_QUEUE_SIZE)
+    assert render_pool.max_pending < main.THREADS
+    monkeypatch.setattr(main, "create_diagram", slow_create_diagram)
+    monkeypatch.setattr(main, "render_pool", render_pool)
+
+    responses = []
+    rejected = threading.Semaphore(0)
+
+    def get(url):
+        r = client.get(url)
+        responses.append(r)
+        if r.status_code == 503:
+            rejected.release()
+
+    threads = [
+        threading.Thread(target=get, args=(f"/diagram.png?dot={i}",))
+        for i in range(main.THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    overflow = main.THREADS - render_pool.max_pending
+    for _ in range(overflow):
+        assert rejected.acquire(timeout=10)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200] * render_pool.max_pending + [503] * overflow
+    for r in responses:
+        if r.status_code == 503:
+            assert r.headers["Retry-After"] == "1"
@@ -0,0 +1,270 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Transcribes many Cloud Storage files with concurrent batch recognitions.
+
+The files are split into requests of at most MAX_FILES_PER_REQUEST files,
+several of which are processed at once. The operations are polled for the
+files they have finished, whose transcripts are downloaded and parsed in
+parallel, and printed as soon as each file is ready, followed by a
+histogram of the latency of each file.
+
+    python transcribe_batch_many_files_v2.py PROJECT_ID gs://BUCKET/OUTPUT \
+        --manifest uris.txt --max-operations 4
+"""
+
+import argparse
+import bisect
+from concurrent.futures import Future, ThreadPoolExecutor
+import queue
+import re
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence
+
+from google.cloud import storage
+from google.cloud.speech_v2 import SpeechClient
+from google.cloud.speech_v2.types import cloud_speech
+
+# The maximum number of files in a BatchRecognizeRequest.
+MAX_FILES_PER_REQUEST = 15
+
+
+class FileTranscript(NamedTuple):
+    uri: str
+    transcript: str
+    # Seconds from the start of the recognition of the file to its transcript.
+    latency: float
+    error: Optional[str] = None
+
+
+class LatencyHistogram:
+    """Counts latencies in buckets, from under a second to over 30 minutes."""
+
+    BOUNDS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+
+    def __str__(self) -> str:
+        total = sum(self.counts) or 1
+        labels = [f"<= {bound}s" for bound in self.BOUNDS] + [f"> {self.BOUNDS[-1]}s"]
+        return "\n".join(
+            f"{label:>9} {count:>6} {'#' * round(40 * count / total)}"
+            for label, count in zip(labels, self.counts)
+            if count
+        )
+
+
+def shard_uris(gcs_uris: Sequence[str], shard_size: int) -> List[List[str]]:
+    return [
+        list(gcs_uris[i : i + shard_size]) for i in range(0, len(gcs_uris), shard_size)
+    ]
+
+
+def batch_recognize(
+    client: SpeechClient,
+    project_id: str,
+    gcs_uris: List[str],
+    gcs_output_path: str,
+    timeout: float,
+    on_file_done: Callable[[str, str, str], None],
+    poll_interval: float = 10,
+) -> None:
+    """Runs a batch recognition, and calls `on_file_done(uri, output_uri, error)`
+    once for each file, as soon as the operation has finished it."""
+    config = cloud_speech.RecognitionConfig(
+        auto_decoding_config=cloud_speech.AutoDetectDecodingConfig(),
+        language_codes=["en-US"],
+        model="long",
+    )
+    request = cloud_speech.BatchRecognizeRequest(
+        recognizer=f"projects/{project_id}/locations/global/recognizers/_",
+        config=config,
+        files=[cloud_speech.BatchRecognizeFileMetadata(uri=uri) for uri in gcs_uris],
+        recognition_output_config=cloud_speech.RecognitionOutputConfig(
+            gcs_output_config=cloud_speech.GcsOutputConfig(uri=gcs_output_path),
+        ),
+    )
+    deadline = time.monotonic() + timeout
+    operation = client.batch_recognize(request=request)
+
+    done = set()
+    # The metadata of the operation has the output URI of each finished file.
+    while not operation.done():
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Operation did not complete within {timeout}s")
+        metadata = operation.metadata
+        if metadata is not None:
+            for uri, file_metadata in metadata.transcription_metadata.items():
+                finished = file_metadata.uri or file_metadata.error.message
+                if uri not in done and finished:
+                    done.add(uri)
+                    on_file_done(uri, file_metadata.uri, file_metadata.error.message)
+        time.sleep(poll_interval)
+
+    response = operation.result(timeout=max(deadline - time.monotonic(), 0))
+    for uri in gcs_uris:
+        if uri in done:
+            continue
+        done.add(uri)
+        if uri in response.results:
+            file_result = response.results[uri]
+            on_file_done(uri, file_result.uri, file_result.error.message)
+        else:
+            on_file_done(uri, "", "No result for file")
+
+
+def fetch_transcript(storage_client: storage.Client, output_uri: str) -> str:
+    """Downloads and parses the results of a file, and returns its transcript."""
+    output_bucket, output_object = re.match(r"gs://([^/]+)/(.*)", output_uri).group(
+        1, 2
+    )
+    blob = storage_client.bucket(output_bucket).blob(output_object)
+    results = cloud_speech.BatchRecognizeResults.from_json(
+        blob.download_as_bytes(), ignore_unknown_fields=True
+    )
+    return " ".join(
+        result.alternatives[0].transcript
+        for result in results.results
+        if result.alternatives
+    )
+
+
+def transcribe_batch_many_files_v2(
+    project_id: str,
+    gcs_uris: Sequence[str],
+    gcs_output_path: str,
+    max_operations: int = 4,
+    max_downloads: int = 16,
+    shard_size: int = MAX_FILES_PER_REQUEST,
+    timeout: float = 3600,
+    poll_interval: float = 10,
+    client: Optional[SpeechClient] = None,
+    storage_client: Optional[storage.Client] = None,
+) -> Iterator[FileTranscript]:
+    """Transcribes audio files from Google Cloud Storage, yielding each transcript
+    as soon as it is ready.
+
+    Args:
+        project_id: The Google Cloud project ID.
+        gcs_uris: The Google Cloud Storage URIs to transcribe.
+        gcs_output_path: The Cloud Storage URI to which to write the transcripts.
+        max_operations: The maximum number of batch recognitions running at once.
+        max_downloads: The maximum number of transcripts downloaded at once.
+        shard_size: The maximum number of files per batch recognition.
+        timeout: The maximum number of seconds to wait for a batch recognition.
+        poll_interval: The number of seconds between checks of the files
+            finished by a batch recognition.
+
+    Yields:
+        A FileTranscript per file, in the order they are ready.
+    """
+    if client is None:
+        client = SpeechClient()
+    if storage_client is None:
+        # A single client, and its connection pool, is shared by all downloads.
+        storage_client = storage.Client()
+
+    # Transcripts are put in this queue by the other threads as they are ready.
+    transcripts: queue.Queue = queue.Queue()
+
+    def recognize_shard(shard: List[str], downloads: ThreadPoolExecutor) -> None:
+        start_time = time.monotonic()
+        reported = set()
+
+        def on_fetched(uri: str, fetch: Future) -> None:
+            latency = time.monotonic() - start_time
+            if fetch.exception() is not None:
+                transcripts.put(
+                    FileTranscript(uri, "", latency, str(fetch.exception()))
+                )
+            else:
+                transcripts.put(FileTranscript(uri, fetch.result(), latency))
+
+        def on_file_done(uri: str, output_uri: str, error: str) -> None:
+            reported.add(uri)
+            if error:
+                latency = time.monotonic() - start_time
+                transcripts.put(FileTranscript(uri, "", latency, error))
+                return
+            fetch = downloads.submit(fetch_transcript, storage_client, output_uri)
+            fetch.add_done_callback(lambda fetch: on_fetched(uri, fetch))
+
+        try:
+            batch_recognize(
+                client,
+                project_id,
+                shard,
+                gcs_output_path,
+                timeout,
+                on_file_done,
+                poll_interval,
+            )
+        except Exception as e:
+            # The files of a failed operation report how long it ran.
+            latency = time.monotonic() - start_time
+            for uri in dict.fromkeys(shard):
+                if uri not in reported:
+                    transcripts.put(FileTranscript(uri, "", latency, str(e)))
+
+    shards = shard_uris(gcs_uris, shard_size)
+    with ThreadPoolExecutor(max_operations) as operations, ThreadPoolExecutor(
+        max_downloads
+    ) as downloads:
+        # Only max_operations recognitions run at once, the others are queued.
+        for shard in shards:
+            operations.submit(recognize_shard, shard, downloads)
+        for _ in range(sum(len(set(shard)) for shard in shards)):
+            yield transcripts.get()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("project_id", help="GCP Project ID")
+    parser.add_argument(
+        "gcs_output_path", help="GCS URI to which to write the transcripts"
+    )
+    parser.add_argument("gcs_uri", nargs="*", help="URI to GCS file")
+    parser.add_argument("--manifest", help="File listing one GCS URI per line")
+    parser.add_argument("--max-operations", type=int, default=4)
+    parser.add_argument("--max-downloads", type=int, default=16)
+    args = parser.parse_args()
+
+    gcs_uris = list(args.gcs_uri)
+    if args.manifest:
+        with open(args.manifest) as f:
+            gcs_uris += [line.strip() for line in f if line.strip()]
+
+    histogram = LatencyHistogram()
+    start_time = time.monotonic()
+    for file_transcript in transcribe_batch_many_files_v2(
+        args.project_id,
+        gcs_uris,
+        args.gcs_output_path,
+        max_operations=args.max_operations,
+        max_downloads=args.max_downloads,
+    ):
+        histogram.add(file_transcript.latency)
+        if file_transcript.error:
+            print(f"{file_transcript.uri}: Error: {file_transcript.error}")
+        else:
+            print(f"{file_transcript.uri}: {file_transcript.transcript}")
+    print(f"\n{len(gcs_uris)} files in {time.monotonic() - start_time:.1f}s")
+    print("Latency per file:")
+    print(histogram)
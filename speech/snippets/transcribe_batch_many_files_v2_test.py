@@ -0,0 +1,162 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from unittest import mock
+
+from google.cloud.speech_v2.types import cloud_speech
+
+import transcribe_batch_many_files_v2
+
+
+def fake_speech_client() -> mock.Mock:
+    client = mock.Mock()
+
+    def batch_recognize(request: cloud_speech.BatchRecognizeRequest) -> mock.Mock:
+        results = {}
+        for file in request.files:
+            if file.uri.endswith("bad.flac"):
+                results[file.uri] = {"error": {"code": 3, "message": "Bad audio"}}
+            else:
+                results[file.uri] = {"uri": file.uri.replace("input", "output")}
+        response = cloud_speech.BatchRecognizeResponse(results=results)
+        return mock.Mock(result=mock.Mock(return_value=response))
+
+    client.batch_recognize.side_effect = batch_recognize
+    return client
+
+
+def fake_storage_client() -> mock.Mock:
+    client = mock.Mock()
+
+    def blob(name: str) -> mock.Mock:
+        results = cloud_speech.BatchRecognizeResults(
+            results=[
+                {"alternatives": [{"transcript": name}]},
+                {"alternatives": [{"transcript": "end"}]},
+            ]
+        )
+        data = cloud_speech.BatchRecognizeResults.to_json(results).encode()
+        return mock.Mock(download_as_bytes=mock.Mock(return_value=data))
+
+    client.bucket.return_value.blob.side_effect = blob
+    return client
+
+
+def test_transcribe_batch_many_files_v2() -> None:
+    gcs_uris = [f"gs://bucket/input/{n}.flac" for n in range(19)]
+    gcs_uris.append("gs://bucket/input/bad.flac")
+    client = fake_speech_client()
+    storage_client = fake_storage_client()
+
+    transcripts = list(
+        transcribe_batch_many_files_v2.transcribe_batch_many_files_v2(
+            "project",
+            gcs_uris,
+            "gs://bucket/output",
+            client=client,
+            storage_client=storage_client,
+        )
+    )
+
+    # The 20 files are transcribed by 2 batch recognitions.
+    assert client.batch_recognize.call_count == 2
+    requests = [call.kwargs["request"] for call in client.batch_recognize.mock_calls]
+    assert [len(request.files) for request in requests] == [15, 5]
+    assert sorted(t.uri for t in transcripts) == sorted(gcs_uris)
+    by_uri = {t.uri: t for t in transcripts}
+    assert by_uri["gs://bucket/input/3.flac"].transcript == "output/3.flac end"
+    assert by_uri["gs://bucket/input/3.flac"].error is None
+    assert by_uri["gs://bucket/input/bad.flac"].error == "Bad audio"
+
+
+def test_transcribe_batch_many_files_v2_failed_operation() -> None:
+    gcs_uris = [f"gs://bucket/input/{n}.flac" for n in range(3)]
+    client = mock.Mock()
+
+    def result(timeout: float) -> None:
+        time.sleep(0.05)
+        raise TimeoutError("Operation timed out")
+
+    client.batch_recognize.return_value = mock.Mock(result=result)
+
+    transcripts = list(
+        transcribe_batch_many_files_v2.transcribe_batch_many_files_v2(
+            "project",
+            gcs_uris,
+            "gs://bucket/output",
+            client=client,
+            storage_client=fake_storage_client(),
+        )
+    )
+
+    # The failed files report how long the recognition ran before failing.
+    assert sorted(t.uri for t in transcripts) == gcs_uris
+    for transcript in transcripts:
+        assert transcript.error == "Operation timed out"
+        assert transcript.latency >= 0.05
+
+
+def test_transcribe_batch_many_files_v2_streams_files() -> None:
+    gcs_uris = ["gs://bucket/input/0.flac", "gs://bucket/input/1.flac"]
+    first_file_read = threading.Event()
+    operation = mock.Mock()
+    # The operation has only finished the first file until it has been read.
+    deadline = time.monotonic() + 5
+    operation.done.side_effect = (
+        lambda: first_file_read.is_set() or time.monotonic() > deadline
+    )
+    operation.metadata = cloud_speech.BatchRecognizeMetadata(
+        transcription_metadata={
+            gcs_uris[0]: {"progress_percent": 100, "uri": "gs://bucket/output/0"},
+            gcs_uris[1]: {"progress_percent": 50},
+        }
+    )
+    operation.result.return_value = cloud_speech.BatchRecognizeResponse(
+        results={uri: {"uri": uri.replace("input", "output")} for uri in gcs_uris}
+    )
+    client = mock.Mock()
+    client.batch_recognize.return_value = operation
+
+    transcripts = transcribe_batch_many_files_v2.transcribe_batch_many_files_v2(
+        "project",
+        gcs_uris,
+        "gs://bucket/output",
+        poll_interval=0.01,
+        client=client,
+        storage_client=fake_storage_client(),
+    )
+
+    # The first file is ready before the operation is done.
+    first = next(transcripts)
+    assert not operation.result.called
+    first_file_read.set()
+    assert first.uri == gcs_uris[0]
+    assert first.transcript == "output/0 end"
+    rest = list(transcripts)
+    assert [t.uri for t in rest] == [gcs_uris[1]]
+    assert rest[0].transcript == "output/1.flac end"
+
+
+def test_latency_histogram() -> None:
+    histogram = transcribe_batch_many_files_v2.LatencyHistogram()
+    for seconds in (0.5, 0.7, 45, 4000):
+        histogram.add(seconds)
+
+    assert str(histogram).splitlines() == [
+        "    <= 1s      2 " + "#" * 20,
+        "   <= 60s      1 " + "#" * 10,
+        "  > 1800s      1 " + "#" * 10,
+    ]
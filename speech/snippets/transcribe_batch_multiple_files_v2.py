@@ -67,6 +67,9 @@ def transcribe_batch_multiple_files_v2(
     print("Waiting for operation to complete...")
     response = operation.result(timeout=120)
 
+    # Instantiates a Cloud Storage client, shared by all the downloads
+    storage_client = storage.Client()
+
     print("Operation finished. Fetching results from:")
     for uri in gcs_uris:
         file_results = response.results[uri]
@@ -75,9 +78,6 @@ def transcribe_batch_multiple_files_v2(
             r"gs://([^/]+)/(.*)", file_results.uri
         ).group(1, 2)
 
-        # Instantiates a Cloud Storage client
-        storage_client = storage.Client()
-
         # Fetch results from Cloud Storage
         bucket = storage_client.bucket(output_bucket)
         blob = bucket.blob(output_object)
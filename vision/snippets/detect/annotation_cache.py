@@ -0,0 +1,189 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Caches Vision API annotations on disk, in a SQLite database.
+
+Annotations are keyed by the SHA-256 of the image bytes, or by the generation
+of gs:// objects, which is read from the object metadata without downloading
+it, together with the requested features, their model and the image context.
+Images from other URIs are not cached, as they may change without notice.
+
+All the annotation methods of ImageAnnotatorClient go through
+batch_annotate_images, which CachingImageAnnotatorClient overrides, so a
+caching client can be used wherever a client is passed, such as by the
+detect.py batch commands with --cache.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence
+
+from google.cloud import storage
+from google.cloud import vision
+
+DEFAULT_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "vision-detect", "annotations.sqlite3"
+)
+DEFAULT_MAX_BYTES = 1024**3
+
+# Changed when the way cached annotations are keyed or stored changes.
+CACHE_VERSION = "1"
+# The model used by Vision API features which don't request one.
+DEFAULT_MODEL = "builtin/stable"
+
+
+class AnnotationCache:
+    """A size bounded LRU cache of AnnotateImageResponses in a SQLite database."""
+
+    def __init__(
+        self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS annotations ("
+                "key TEXT PRIMARY KEY, response BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS annotations_accessed "
+                "ON annotations (accessed)"
+            )
+
+    def get(self, key: str) -> Optional[vision.AnnotateImageResponse]:
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT response FROM annotations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE annotations SET accessed = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        return vision.AnnotateImageResponse.deserialize(row[0])
+
+    def put(self, key: str, response: vision.AnnotateImageResponse) -> None:
+        data = vision.AnnotateImageResponse.serialize(response)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO annotations VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM annotations"
+        ).fetchone()
+        cursor = self._db.execute("SELECT key, size FROM annotations ORDER BY accessed")
+        evicted = []
+        for key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM annotations WHERE key = ?", evicted)
+
+
+class CachingImageAnnotatorClient(vision.ImageAnnotatorClient):
+    """An ImageAnnotatorClient which only requests the annotations not cached."""
+
+    def __init__(
+        self,
+        *args: object,
+        cache: AnnotationCache,
+        refresh: bool = False,
+        **kwargs: object,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+        self.refresh = refresh
+        self._storage_client = None
+
+    def _image_identity(self, image: vision.Image) -> Optional[str]:
+        if image.content:
+            return "sha256:" + hashlib.sha256(image.content).hexdigest()
+        uri = image.source.image_uri or image.source.gcs_image_uri
+        if not uri.startswith("gs://"):
+            return None
+        if self._storage_client is None:
+            self._storage_client = storage.Client()
+        try:
+            blob = storage.Blob.from_string(uri, client=self._storage_client)
+            # Only reads the object metadata.
+            blob.reload()
+        except Exception:
+            return None
+        return f"{uri}#{blob.generation}"
+
+    def cache_key(self, request: vision.AnnotateImageRequest) -> Optional[str]:
+        """Returns the cache key of a request, or None if it can't be cached."""
+        identity = self._image_identity(request.image)
+        if identity is None:
+            return None
+        features = sorted(
+            (int(f.type_), f.max_results, f.model or DEFAULT_MODEL)
+            for f in request.features
+        )
+        image_context = vision.ImageContext.to_json(
+            request.image_context, sort_keys=True, indent=None
+        )
+        key = json.dumps([CACHE_VERSION, identity, features, image_context])
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def batch_annotate_images(
+        self,
+        request: Optional[vision.BatchAnnotateImagesRequest] = None,
+        *,
+        requests: Optional[Sequence[vision.AnnotateImageRequest]] = None,
+        **kwargs: object,
+    ) -> vision.BatchAnnotateImagesResponse:
+        if request is not None:
+            requests = vision.BatchAnnotateImagesRequest(request).requests
+        requests = [vision.AnnotateImageRequest(r) for r in requests]
+
+        keys = [self.cache_key(r) for r in requests]
+        responses = [
+            None if key is None or self.refresh else self.cache.get(key) for key in keys
+        ]
+        misses = [i for i, response in enumerate(responses) if response is None]
+        if misses:
+            response = super().batch_annotate_images(
+                requests=[requests[i] for i in misses], **kwargs
+            )
+            for i, image_response in zip(misses, response.responses):
+                responses[i] = image_response
+                # Errors may be transient, so they are not cached.
+                if keys[i] is not None and not image_response.error.message:
+                    self.cache.put(keys[i], image_response)
+        return vision.BatchAnnotateImagesResponse(responses=responses)
+
+
+def caching_client(
+    path: str = DEFAULT_PATH,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    refresh: bool = False,
+) -> CachingImageAnnotatorClient:
+    """Creates a client which caches annotations in the database at path."""
+    return CachingImageAnnotatorClient(
+        cache=AnnotationCache(path, max_bytes), refresh=refresh
+    )
@@ -0,0 +1,139 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pathlib
+from typing import Iterator, Sequence
+from unittest import mock
+
+from google.cloud import storage
+from google.cloud import vision
+from google.cloud.vision_v1.services.image_annotator.client import (
+    ImageAnnotatorClient as BaseImageAnnotatorClient,
+)
+import pytest
+
+import annotation_cache
+import batch_detect
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "resources")
+
+
+@pytest.fixture
+def batch_annotate_images() -> Iterator[mock.Mock]:
+    def annotate(
+        requests: Sequence[vision.AnnotateImageRequest], **kwargs: object
+    ) -> vision.BatchAnnotateImagesResponse:
+        response = vision.AnnotateImageResponse(
+            label_annotations=[{"description": "Cat", "score": 0.9}]
+        )
+        return vision.BatchAnnotateImagesResponse(responses=[response] * len(requests))
+
+    with mock.patch.object(
+        BaseImageAnnotatorClient, "batch_annotate_images", side_effect=annotate
+    ) as batch_annotate_images:
+        yield batch_annotate_images
+
+
+def local_image(name: str) -> vision.Image:
+    return batch_detect.local_image(os.path.join(RESOURCES, name))
+
+
+def test_label_detection_cached(
+    batch_annotate_images: mock.Mock, tmp_path: pathlib.Path
+) -> None:
+    path = str(tmp_path / "cache.sqlite3")
+    client = annotation_cache.caching_client(path)
+
+    for _ in range(2):
+        response = client.label_detection(image=local_image("wakeupcat.jpg"))
+        assert response.label_annotations[0].description == "Cat"
+    assert batch_annotate_images.call_count == 1
+
+    # Other features are annotated, the same features of other images too.
+    client.text_detection(image=local_image("wakeupcat.jpg"))
+    client.label_detection(image=local_image("landmark.jpg"))
+    assert batch_annotate_images.call_count == 3
+
+    client = annotation_cache.caching_client(path, refresh=True)
+    client.label_detection(image=local_image("wakeupcat.jpg"))
+    assert batch_annotate_images.call_count == 4
+
+    # The default client class doesn't use the cache.
+    vision.ImageAnnotatorClient().label_detection(image=local_image("wakeupcat.jpg"))
+    assert batch_annotate_images.call_count == 5
+
+
+def test_label_detection_uri_keyed_on_generation(
+    batch_annotate_images: mock.Mock, tmp_path: pathlib.Path
+) -> None:
+    generation = "1"
+
+    def reload(blob: storage.Blob, **kwargs: object) -> None:
+        blob._set_properties({"generation": generation})
+
+    client = annotation_cache.caching_client(str(tmp_path / "cache.sqlite3"))
+    image = batch_detect.uri_image("gs://bucket/wakeupcat.jpg")
+    with mock.patch.object(storage.Blob, "reload", autospec=True, side_effect=reload):
+        client.label_detection(image=image)
+        client.label_detection(image=image)
+        assert batch_annotate_images.call_count == 1
+
+        generation = "2"
+        client.label_detection(image=image)
+        assert batch_annotate_images.call_count == 2
+
+    # Other URIs aren't cached.
+    image = batch_detect.uri_image("https://example.com/wakeupcat.jpg")
+    client.label_detection(image=image)
+    client.label_detection(image=image)
+    assert batch_annotate_images.call_count == 4
+
+
+def test_batch_annotate_local_cached(
+    batch_annotate_images: mock.Mock, tmp_path: pathlib.Path
+) -> None:
+    client = annotation_cache.caching_client(str(tmp_path / "cache.sqlite3"))
+    images = batch_detect.list_local_images(RESOURCES)
+
+    for output in ("first.jsonl", "second.jsonl"):
+        stats = batch_detect.batch_annotate_local(
+            RESOURCES, str(tmp_path / output), client=client
+        )
+        assert stats["images"] == len(images)
+    annotated = sum(
+        len(call.kwargs["requests"]) for call in batch_annotate_images.call_args_list
+    )
+    assert annotated == len(images)
+    with open(tmp_path / "second.jsonl") as f:
+        assert all("annotations" in json.loads(line) for line in f)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    response = vision.AnnotateImageResponse(
+        label_annotations=[{"description": "Cat", "score": 0.9}]
+    )
+    size = len(vision.AnnotateImageResponse.serialize(response))
+    cache = annotation_cache.AnnotationCache(
+        str(tmp_path / "cache.sqlite3"), max_bytes=3 * size
+    )
+
+    for key in ("a", "b", "c"):
+        cache.put(key, response)
+    assert cache.get("a") == response
+    cache.put("d", response)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == response for key in ("a", "c", "d"))
@@ -0,0 +1,288 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Annotates many images with several Vision API features at once.
+
+Images are sent up to MAX_IMAGES_PER_REQUEST and MAX_REQUEST_BYTES at a
+time with batch_annotate_images, with a bounded number of requests in flight,
+and the results are appended to a JSON Lines file, one line per image. Images which
+already have a result in that file are skipped, so that an interrupted run
+can be resumed by running the same command again.
+
+Example Usage:
+python detect.py batch ./resources results.jsonl --features labels,text
+python detect.py batch "./resources/*.jpg" results.jsonl
+python detect.py batch-uri manifest.txt results.jsonl --features faces
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import glob
+import json
+import os
+import time
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from google.cloud import vision
+
+# The maximum number of images per batch_annotate_images request.
+MAX_IMAGES_PER_REQUEST = 16
+# The maximum bytes of image content per request, under the request size limit.
+MAX_REQUEST_BYTES = 8 * 1024 * 1024
+
+IMAGE_EXTENSIONS = (".bmp", ".gif", ".ico", ".jpeg", ".jpg", ".png", ".webp")
+
+FEATURES = {
+    "crophints": vision.Feature.Type.CROP_HINTS,
+    "document": vision.Feature.Type.DOCUMENT_TEXT_DETECTION,
+    "faces": vision.Feature.Type.FACE_DETECTION,
+    "labels": vision.Feature.Type.LABEL_DETECTION,
+    "landmarks": vision.Feature.Type.LANDMARK_DETECTION,
+    "logos": vision.Feature.Type.LOGO_DETECTION,
+    "object-localization": vision.Feature.Type.OBJECT_LOCALIZATION,
+    "properties": vision.Feature.Type.IMAGE_PROPERTIES,
+    "safe-search": vision.Feature.Type.SAFE_SEARCH_DETECTION,
+    "text": vision.Feature.Type.TEXT_DETECTION,
+    "web": vision.Feature.Type.WEB_DETECTION,
+}
+
+
+def parse_features(names: str) -> list:
+    """Returns the Vision features of a comma separated list of names."""
+    try:
+        return [FEATURES[name.strip()] for name in names.split(",")]
+    except KeyError as e:
+        raise ValueError(
+            f"Unknown feature {e}, choose from: {', '.join(FEATURES)}"
+        ) from None
+
+
+def list_local_images(source: str) -> list:
+    """Lists the image files in a directory, matching a glob, or a single file."""
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+        ]
+    elif os.path.isfile(source):
+        return [source]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(
+        path
+        for path in paths
+        if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def read_manifest(manifest: str) -> list:
+    """Reads the image URIs of a manifest file, one gs:// or http(s) URI per line."""
+    with open(manifest) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def load_done(output: str) -> set:
+    """Returns the images which were annotated successfully in an output file."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be truncated if the previous run was killed.
+                continue
+            if "error" in result:
+                done.discard(result["image"])
+            else:
+                done.add(result["image"])
+    return done
+
+
+def local_image(path: str) -> vision.Image:
+    with open(path, "rb") as image_file:
+        return vision.Image(content=image_file.read())
+
+
+def local_image_size(path: str) -> int:
+    return os.path.getsize(path)
+
+
+def uri_image(uri: str) -> vision.Image:
+    return vision.Image(source=vision.ImageSource(image_uri=uri))
+
+
+def uri_image_size(uri: str) -> int:
+    # The images are read by the API, so they don't add to the request size.
+    return 0
+
+
+def annotate_batch(
+    client: vision.ImageAnnotatorClient,
+    batch: Sequence[str],
+    make_image: Callable[[str], vision.Image],
+    features: Sequence,
+) -> list:
+    """Annotates a batch of images in a single request, and returns their results."""
+    requests = [
+        vision.AnnotateImageRequest(
+            image=make_image(image),
+            features=[vision.Feature(type_=feature) for feature in features],
+        )
+        for image in batch
+    ]
+    try:
+        response = client.batch_annotate_images(requests=requests)
+    except Exception as e:
+        if len(batch) > 1:
+            # Annotate the images one at a time, so that an image which can't
+            # be annotated, e.g. because it is too large, only fails itself.
+            return [
+                result
+                for image in batch
+                for result in annotate_batch(client, [image], make_image, features)
+            ]
+        return [{"image": image, "error": {"message": str(e)}} for image in batch]
+
+    results = []
+    for image, image_response in zip(batch, response.responses):
+        if image_response.error.message:
+            results.append(
+                {"image": image, "error": {"message": image_response.error.message}}
+            )
+        else:
+            annotations = json.loads(
+                vision.AnnotateImageResponse.to_json(image_response, indent=None)
+            )
+            results.append({"image": image, "annotations": annotations})
+    return results
+
+
+def batches(
+    images: Iterable[str],
+    batch_size: int,
+    image_size: Callable[[str], int],
+    max_bytes: int = MAX_REQUEST_BYTES,
+) -> Iterator[list]:
+    """Groups images into batches of up to batch_size images and max_bytes bytes.
+
+    An image larger than max_bytes is in a batch of its own.
+    """
+    batch: list = []
+    batch_bytes = 0
+    for image in images:
+        size = image_size(image)
+        if batch and (len(batch) == batch_size or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(image)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def batch_annotate(
+    images: Sequence[str],
+    make_image: Callable[[str], vision.Image],
+    output: str,
+    features: Sequence,
+    max_in_flight: int = 4,
+    batch_size: int = MAX_IMAGES_PER_REQUEST,
+    client: Optional[vision.ImageAnnotatorClient] = None,
+    image_size: Callable[[str], int] = uri_image_size,
+    max_bytes: int = MAX_REQUEST_BYTES,
+) -> dict:
+    """Annotates images in batches, and appends their results to a JSONL file."""
+    if client is None:
+        client = vision.ImageAnnotatorClient()
+
+    done = load_done(output)
+    todo = [image for image in dict.fromkeys(images) if image not in done]
+    stats = {"images": 0, "errors": 0, "skipped": len(images) - len(todo)}
+
+    # Start on a new line if the previous run was killed while writing one.
+    truncated = False
+    if os.path.exists(output) and os.path.getsize(output):
+        with open(output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            truncated = f.read(1) != b"\n"
+
+    start_time = time.monotonic()
+    with open(output, "a") as out, ThreadPoolExecutor(max_in_flight) as executor:
+        if truncated:
+            out.write("\n")
+
+        def write_results(future: Future) -> None:
+            for result in future.result():
+                out.write(json.dumps(result) + "\n")
+                stats["images"] += 1
+                stats["errors"] += "error" in result
+            out.flush()
+
+        # Only max_in_flight batches are read and annotated at once, so that
+        # the images of a large directory aren't all loaded in memory.
+        in_flight: deque = deque()
+        for batch in batches(todo, batch_size, image_size, max_bytes):
+            if len(in_flight) == max_in_flight:
+                write_results(in_flight.popleft())
+            in_flight.append(
+                executor.submit(annotate_batch, client, batch, make_image, features)
+            )
+        while in_flight:
+            write_results(in_flight.popleft())
+
+    elapsed = time.monotonic() - start_time
+    stats["images_per_second"] = stats["images"] / elapsed if elapsed else 0.0
+    print(
+        f"Annotated {stats['images']} images ({stats['errors']} errors) in "
+        f"{elapsed:.1f}s, {stats['images_per_second']:.1f} images/s, "
+        f"skipped {stats['skipped']} already in {output}"
+    )
+    return stats
+
+
+def batch_annotate_local(
+    source: str,
+    output: str,
+    features: str = "labels",
+    max_in_flight: int = 4,
+    client: Optional[vision.ImageAnnotatorClient] = None,
+) -> dict:
+    """Annotates the images of a local directory or glob pattern in batches."""
+    images = list_local_images(source)
+    return batch_annotate(
+        images,
+        local_image,
+        output,
+        parse_features(features),
+        max_in_flight,
+        client=client,
+        image_size=local_image_size,
+    )
+
+
+def batch_annotate_uri(
+    manifest: str,
+    output: str,
+    features: str = "labels",
+    max_in_flight: int = 4,
+    client: Optional[vision.ImageAnnotatorClient] = None,
+) -> dict:
+    """Annotates the images listed in a manifest of gs:// or http(s) URIs in batches."""
+    images = read_manifest(manifest)
+    return batch_annotate(
+        images, uri_image, output, parse_features(features), max_in_flight, client
+    )
@@ -0,0 +1,154 @@
+# Copyright 2026 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import pathlib
+from typing import Sequence
+from unittest import mock
+
+from google.cloud import vision
+
+import batch_detect
+
+RESOURCES = os.path.join(os.path.dirname(__file__), "resources")
+
+
+def fake_batch_annotate_images(
+    requests: Sequence[vision.AnnotateImageRequest],
+) -> vision.BatchAnnotateImagesResponse:
+    responses = []
+    for request in requests:
+        if request.image.source.image_uri.endswith("missing.jpg"):
+            responses.append(
+                vision.AnnotateImageResponse(error={"message": "Not found"})
+            )
+        else:
+            responses.append(
+                vision.AnnotateImageResponse(
+                    label_annotations=[{"description": "Cat", "score": 0.9}]
+                )
+            )
+    return vision.BatchAnnotateImagesResponse(responses=responses)
+
+
+def test_batch_annotate_local(tmp_path: pathlib.Path) -> None:
+    client = mock.Mock(spec=vision.ImageAnnotatorClient)
+    client.batch_annotate_images.side_effect = fake_batch_annotate_images
+    images = batch_detect.list_local_images(RESOURCES)
+    output = str(tmp_path / "results.jsonl")
+
+    stats = batch_detect.batch_annotate(
+        images,
+        batch_detect.local_image,
+        output,
+        batch_detect.parse_features("labels,text"),
+        batch_size=4,
+        client=client,
+    )
+
+    assert stats["images"] == len(images)
+    assert client.batch_annotate_images.call_count == -(-len(images) // 4)
+    request = client.batch_annotate_images.call_args.kwargs["requests"][0]
+    assert len(request.features) == 2
+    with open(output) as f:
+        results = [json.loads(line) for line in f]
+    assert [result["image"] for result in results] == images
+    assert results[0]["annotations"]["labelAnnotations"][0]["description"] == "Cat"
+
+
+def test_batch_annotate_uri_resumes(tmp_path: pathlib.Path) -> None:
+    client = mock.Mock(spec=vision.ImageAnnotatorClient)
+    client.batch_annotate_images.side_effect = fake_batch_annotate_images
+    uris = [f"gs://bucket/image{n}.jpg" for n in range(5)] + ["gs://bucket/missing.jpg"]
+    output = tmp_path / "results.jsonl"
+    # A previous run annotated two images, and was killed while writing a third.
+    output.write_text(
+        json.dumps({"image": uris[0], "annotations": {}})
+        + "\n"
+        + json.dumps({"image": uris[1], "annotations": {}})
+        + '\n{"image": "gs://bu'
+    )
+    features = batch_detect.parse_features("labels")
+
+    stats = batch_detect.batch_annotate(
+        uris, batch_detect.uri_image, str(output), features, client=client
+    )
+
+    assert stats["skipped"] == 2
+    assert stats["images"] == 4
+    assert stats["errors"] == 1
+    annotated = [
+        r.image.source.image_uri
+        for r in client.batch_annotate_images.call_args.kwargs["requests"]
+    ]
+    assert annotated == uris[2:]
+    assert batch_detect.load_done(str(output)) == set(uris[:5])
+
+    # Only the image which failed is retried.
+    stats = batch_detect.batch_annotate(
+        uris, batch_detect.uri_image, str(output), features, client=client
+    )
+    assert stats["skipped"] == 5
+    assert stats["errors"] == 1
+
+
+def test_batch_annotate_local_request_bytes(tmp_path: pathlib.Path) -> None:
+    client = mock.Mock(spec=vision.ImageAnnotatorClient)
+    client.batch_annotate_images.side_effect = fake_batch_annotate_images
+    images = batch_detect.list_local_images(RESOURCES)
+    max_bytes = max(os.path.getsize(image) for image in images)
+
+    stats = batch_detect.batch_annotate(
+        images,
+        batch_detect.local_image,
+        str(tmp_path / "results.jsonl"),
+        batch_detect.parse_features("labels"),
+        client=client,
+        image_size=batch_detect.local_image_size,
+        max_bytes=max_bytes,
+    )
+
+    assert stats["images"] == len(images)
+    assert client.batch_annotate_images.call_count > 1
+    for call in client.batch_annotate_images.call_args_list:
+        contents = [r.image.content for r in call.kwargs["requests"]]
+        assert sum(len(content) for content in contents) <= max_bytes
+
+
+def test_batch_annotate_failed_batch_one_at_a_time(tmp_path: pathlib.Path) -> None:
+    def batch_annotate_images(
+        requests: Sequence[vision.AnnotateImageRequest],
+    ) -> vision.BatchAnnotateImagesResponse:
+        # The whole request fails if it contains the large image.
+        if any(r.image.source.image_uri.endswith("large.jpg") for r in requests):
+            raise Exception("Request payload size exceeds the limit")
+        return fake_batch_annotate_images(requests)
+
+    client = mock.Mock(spec=vision.ImageAnnotatorClient)
+    client.batch_annotate_images.side_effect = batch_annotate_images
+    uris = [f"gs://bucket/image{n}.jpg" for n in range(3)] + ["gs://bucket/large.jpg"]
+    output = str(tmp_path / "results.jsonl")
+
+    stats = batch_detect.batch_annotate(
+        uris,
+        batch_detect.uri_image,
+        output,
+        batch_detect.parse_features("labels"),
+        client=client,
+    )
+
+    assert stats["images"] == 4
+    assert stats["errors"] == 1
+    assert batch_detect.load_done(output) == set(uris[:3])
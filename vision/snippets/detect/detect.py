@@ -28,6 +28,13 @@ python detect.py ocr-uri gs://python-docs-samples-tests/HodgeConj.pdf \
 gs://BUCKET_NAME/PREFIX/
 python detect.py object-localization ./resources/puppies.jpg
 python detect.py object-localization-uri gs://...
+python detect.py batch ./resources results.jsonl --features labels,text
+python detect.py batch-uri manifest.txt results.jsonl --features faces
+python detect.py --cache batch ./resources results.jsonl
+python detect.py --cache --refresh batch ./resources results.jsonl
+
+With --cache, the batch commands cache annotations on disk, see
+annotation_cache.py.
 
 For more information, the documentation at
 https://cloud.google.com/vision/docs.
@@ -35,6 +42,9 @@ https://cloud.google.com/vision/docs.
 
 import argparse
 
+import annotation_cache
+import batch_detect
+
 
 # [START vision_face_detection]
 def detect_faces(path):
@@ -1036,6 +1046,15 @@ def localize_objects_uri(uri):
 # [END vision_localize_objects_gcs]
 
 
+def batch_client(args):
+    """Returns the client of the batch commands, caching annotations with --cache."""
+    if not args.cache:
+        return None
+    return annotation_cache.caching_client(
+        args.cache_path, args.cache_max_bytes, args.refresh
+    )
+
+
 def run_local(args):
     if args.command == "faces":
         detect_faces(args.path)
@@ -1061,6 +1080,14 @@ def run_local(args):
         web_entities_include_geo_results(args.path)
     elif args.command == "object-localization":
         localize_objects(args.path)
+    elif args.command == "batch":
+        batch_detect.batch_annotate_local(
+            args.path,
+            args.output,
+            args.features,
+            args.max_in_flight,
+            batch_client(args),
+        )
 
 
 def run_uri(args):
@@ -1090,12 +1117,35 @@ def run_uri(args):
         async_detect_document(args.uri, args.destination_uri)
     elif args.command == "object-localization-uri":
         localize_objects_uri(args.uri)
+    elif args.command == "batch-uri":
+        batch_detect.batch_annotate_uri(
+            args.manifest,
+            args.output,
+            args.features,
+            args.max_in_flight,
+            batch_client(args),
+        )
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the annotations of the batch commands on disk.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="With --cache, annotate the images again, and replace their cached "
+        "annotations.",
+    )
+    parser.add_argument("--cache-path", default=annotation_cache.DEFAULT_PATH)
+    parser.add_argument(
+        "--cache-max-bytes", type=int, default=annotation_cache.DEFAULT_MAX_BYTES
+    )
     subparsers = parser.add_subparsers(dest="command")
 
     detect_faces_parser = subparsers.add_parser("faces", help=detect_faces.__doc__)
@@ -1209,6 +1259,27 @@ if __name__ == "__main__":
     )
     object_localization_uri_parser.add_argument("uri")
 
+    batch_help = "Comma separated features to detect, from: " + ", ".join(
+        batch_detect.FEATURES
+    )
+    batch_parser = subparsers.add_parser(
+        "batch", help=batch_detect.batch_annotate_local.__doc__
+    )
+    batch_parser.add_argument("path", help="Directory, glob pattern or image file.")
+    batch_parser.add_argument("output", help="JSON Lines file to append results to.")
+    batch_parser.add_argument("--features", default="labels", help=batch_help)
+    batch_parser.add_argument("--max-in-flight", type=int, default=4)
+
+    batch_uri_parser = subparsers.add_parser(
+        "batch-uri", help=batch_detect.batch_annotate_uri.__doc__
+    )
+    batch_uri_parser.add_argument("manifest", help="File listing one URI per line.")
+    batch_uri_parser.add_argument(
+        "output", help="JSON Lines file to append results to."
+    )
+    batch_uri_parser.add_argument("--features", default="labels", help=batch_help)
+    batch_uri_parser.add_argument("--max-in-flight", type=int, default=4)
+
     args = parser.parse_args()
 
     if "uri" in args.command: